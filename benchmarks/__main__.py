@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# @package benchmarks
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Benchmark starter, e.g. `python -m benchmarks --vehicles 100 1000 --rules none default`
+'''
+
+import argparse
+import datetime
+import json
+from pathlib import Path
+
+import colmto.common.io
+
+from benchmarks import suite
+
+
+def main(args):
+    '''
+    main
+    :param args: cmdline args
+    '''
+
+    l_results = suite.run_suite(args.vehicles, args.rules, args.repeat, args.seed, args.vehicles_per_second)
+
+    for i_case in l_results.get('cases'):
+        print(
+            f'{i_case.get("vehicles"):>7} vehicles, rules {i_case.get("rules"):<16}'
+            f'{i_case.get("vehicle_steps_per_second"):>12.0f} vehicle-steps/s '
+            f'(simulate {i_case.get("seconds").get("simulate"):.2f} s, '
+            f'stand-in {i_case.get("seconds").get("standin"):.2f} s, '
+            f'statistics {i_case.get("seconds").get("statistics"):.2f} s, '
+            f'write {i_case.get("seconds").get("write"):.2f} s), '
+            f'peak RSS {i_case.get("peak_rss") / 2**20:.0f} MiB'
+        )
+
+    if args.compare is not None:
+        with open(args.compare) as f_reference:
+            l_reference = json.load(f_reference)
+        for i_vehicles, i_rules, i_rate, i_ratio in suite.compare(l_results, l_reference):
+            print(f'{i_vehicles:>7} vehicles, rules {i_rules:<16}{i_rate:>12.0f} vehicle-steps/s, {i_ratio:.2f}x reference')
+
+    l_output = args.output if args.output is not None else args.output_dir / (
+        f'benchmark-{l_results.get("colmto_version")}-{datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")}.json'
+    )
+    l_output.parent.mkdir(parents=True, exist_ok=True)
+    colmto.common.io.Writer(None).write_json_pretty(l_results, l_output)
+    print(f'Results written to {l_output}')
+
+
+if __name__ == '__main__':
+    l_parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark TraCI runs of CoLMTO driven by a TraCI stand-in, i.e. without SUMO.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    l_parser.add_argument(
+        '--vehicles', dest='vehicles', type=int, nargs='+', default=[100, 1000],
+        help='numbers of vehicles of benchmarked runs'
+    )
+    l_parser.add_argument(
+        '--rules', dest='rules', type=str, nargs='+', default=['none', 'default'], choices=tuple(suite.RULE_SETS),
+        help='rule sets of benchmarked runs'
+    )
+    l_parser.add_argument(
+        '--repeat', dest='repeat', type=int, default=1, help='number of repetitions of each case'
+    )
+    l_parser.add_argument(
+        '--seed', dest='seed', type=int, default=42, help='seed of PRNGs'
+    )
+    l_parser.add_argument(
+        '--vehicles-per-second', dest='vehicles_per_second', type=float, default=.5,
+        help='rate of departing vehicles'
+    )
+    l_parser.add_argument(
+        '--output-dir', dest='output_dir', type=Path, default=Path('~/.colmto/benchmarks').expanduser(),
+        help='directory results are written to as benchmark-<version>-<date>.json'
+    )
+    l_parser.add_argument(
+        '--output', dest='output', type=Path, default=None, help='JSON file results are written to'
+    )
+    l_parser.add_argument(
+        '--compare', dest='compare', type=Path, default=None,
+        help='JSON results of a reference benchmark, e.g. of a previous version, to compare to'
+    )
+
+    main(l_parser.parse_args())
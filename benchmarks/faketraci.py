@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+# @package benchmarks.faketraci
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+Deterministic stand-in for the TraCI API, i.e. the commands and subscriptions `Runtime.run_traci` uses, which moves
+synthetic vehicles along a 2+1 road without running SUMO.
+
+The road consists of a single lane entry section followed by a 2+1 section, whose second lane (the OTL) may be
+used by vehicles of an allowed vehicle class to overtake. Vehicles depart at their start time at the beginning of
+the road (one per time step, delayed while the entry is blocked), accelerate towards their maximum speed, follow
+their leader with a minimal gap and arrive at the end of the road.
+'''
+
+import time
+import types
+import typing
+
+import numpy
+
+from colmto.common.helper import Behaviour
+
+# subscription variables as served by TraCI, values as in traci.constants
+constants = types.SimpleNamespace(  # pylint: disable=invalid-name
+    LAST_STEP_OCCUPANCY=0x13,
+    VAR_SPEED=0x40,
+    VAR_MAXSPEED=0x41,
+    VAR_POSITION=0x42,
+    VAR_VEHICLECLASS=0x49,
+    VAR_LANE_INDEX=0x52,
+    VAR_TIME_STEP=0x70,
+    VAR_DEPARTED_VEHICLES_IDS=0x74,
+    VAR_ARRIVED_VEHICLES_IDS=0x7a,
+    VAR_MIN_EXPECTED_VEHICLES=0x7d
+)
+
+# vehicle states
+_PENDING, _ACTIVE, _ARRIVED = range(3)
+
+
+class FakeTraCI(object):  # pylint: disable=too-many-instance-attributes
+    '''
+    TraCI stand-in for one simulation run. Like the traci module it provides `start`, `simulationStep`, `close` and
+    the domains `simulation`, `lane`, `vehicle` and `polygon`, so it can be returned by `Runtime.backend`.
+    '''
+
+    def __init__(self, vehicles: typing.Iterable[typing.Tuple[str, float, float, float]],  # pylint: disable=too-many-arguments
+                 length: float, otl_start: float = 0., step_length: float = 1., accel: float = 2.6,
+                 min_gap: float = 2.5, lane_width: float = 3.2):
+        '''
+        Initialisation.
+
+        :param vehicles: (vehicle id, depart time, maximum speed, vehicle length) of each vehicle
+        :param length: length of road
+        :param otl_start: position of the start of the 2+1 section, i.e. length of the entry section
+        :param step_length: length of a time step in seconds
+        :param accel: acceleration of vehicles
+        :param min_gap: minimal gap of vehicles to their leader
+        :param lane_width: width of lanes, i.e. y-coordinates of vehicles are the centre of their lane
+        '''
+
+        self.__name__ = 'faketraci'
+        self.constants = constants
+
+        l_vehicles = tuple(vehicles)
+        self._ids = [str(i_vehicle[0]) for i_vehicle in l_vehicles]
+        self._index = {i_id: i_index for i_index, i_id in enumerate(self._ids)}
+        self._depart = numpy.array([i_vehicle[1] for i_vehicle in l_vehicles], dtype=float)
+        self._speed_max = numpy.array([i_vehicle[2] for i_vehicle in l_vehicles], dtype=float)
+        self._length = numpy.array([i_vehicle[3] for i_vehicle in l_vehicles], dtype=float)
+        self._order = numpy.argsort(self._depart, kind='stable')
+
+        self._road = {
+            'length': float(length),
+            'otl_start': float(otl_start),
+            'step_length': float(step_length),
+            'accel': float(accel),
+            'min_gap': float(min_gap),
+            'lane_width': float(lane_width)
+        }
+
+        self._reset()
+
+        self.simulation = types.SimpleNamespace(
+            subscribe=self._subscribe_simulation,
+            getSubscriptionResults=self._simulation_results
+        )
+        self.lane = types.SimpleNamespace(
+            subscribe=self._subscribe_lane,
+            getAllSubscriptionResults=self._lane_results
+        )
+        self.vehicle = types.SimpleNamespace(
+            subscribe=self._subscribe_vehicle,
+            getSubscriptionResults=self._vehicle_results,
+            getAllSubscriptionResults=self._all_vehicle_results,
+            setVehicleClass=self._set_vehicle_class,
+            setColor=lambda vehID, color: None,
+            changeLane=self._change_lane
+        )
+        self.polygon = types.SimpleNamespace(
+            add=lambda polygonID, shape, color, fill=False, **kwargs: None
+        )
+
+    @classmethod
+    def of(cls, vehicles: typing.Mapping[str, 'SUMOVehicle'], length: float, otl_start: float = 0., **kwargs) -> 'FakeTraCI':
+        '''
+        Create a stand-in for the vehicles of a run, as generated by `SumoConfig._create_vehicle_distribution`,
+        i.e. vehicles depart at their start time.
+
+        :param vehicles: named dictionary of vehicles
+        :param length: length of road
+        :param otl_start: position of the start of the 2+1 section
+        :param kwargs: further arguments (see `FakeTraCI.__init__`)
+        :return: stand-in
+        '''
+
+        return cls(
+            (
+                (i_vehicle_id, i_vehicle.start_time, i_vehicle.speed_max, i_vehicle.properties.get('length', 5.))
+                for i_vehicle_id, i_vehicle in vehicles.items()
+            ),
+            length,
+            otl_start,
+            **kwargs
+        )
+
+    def _reset(self):  # pylint: disable=attribute-defined-outside-init
+        '''
+        Reset to time 0 without any vehicle on the road.
+        '''
+
+        self._state = numpy.full(len(self._ids), _PENDING, dtype=numpy.int8)
+        self._position = numpy.zeros(len(self._ids))
+        self._speed = numpy.zeros(len(self._ids))
+        self._lane = numpy.zeros(len(self._ids), dtype=int)
+        self._keep_right_until = numpy.full(len(self._ids), -numpy.inf)
+        self._vehicle_class = [Behaviour.ALLOW.vclass] * len(self._ids)
+
+        self._time = 0.
+        self._next = 0  # index into departure order of next vehicle to insert
+        self._departed = ()
+        self._arrived = ()
+        self._subscriptions = {'simulation': (), 'lane': {}, 'vehicle': {}}
+        self._cache = None  # vehicle subscription results of current time step
+
+        # work done by the stand-in itself, i.e. to be told apart from the overhead of colmto
+        self.steps = 0
+        self.vehicle_steps = 0
+        self.elapsed = 0.
+
+    def start(self, cmd: typing.Sequence[str], port: typing.Optional[int] = None, label: str = 'default'):  # pylint: disable=unused-argument
+        '''
+        Start the run, i.e. reset to time 0 without any vehicle on the road. The command line is ignored.
+
+        :param cmd: SUMO command line
+        :param port: TraCI port
+        :param label: TraCI connection label
+        '''
+
+        self._reset()
+
+    def close(self):
+        '''Close the run.'''
+
+    def simulationStep(self, step: float = 0.):  # pylint: disable=invalid-name,unused-argument
+        '''
+        Advance by one time step: change lanes, move and remove arrived vehicles, then insert departing vehicles.
+
+        :param step: ignored, i.e. always one time step
+        '''
+
+        l_start = time.perf_counter()
+
+        l_active = numpy.flatnonzero(self._state == _ACTIVE)
+        self._change_lanes(l_active)
+        self._move(l_active)
+        self._time += self._road.get('step_length')
+        self._depart_vehicles()
+        self._cache = None
+
+        self.steps += 1
+        self.vehicle_steps += int(numpy.count_nonzero(self._state == _ACTIVE))
+        self.elapsed += time.perf_counter() - l_start
+
+    def _leaders(self, vehicles: numpy.ndarray, lanes: numpy.ndarray) -> typing.Tuple[numpy.ndarray, ...]:
+        '''
+        Find the vehicles right ahead of and behind the given vehicles on the given lanes, i.e. on their own lane
+        (vehicles are skipped themselves) or on a lane they are about to change to.
+
+        :param vehicles: indices of vehicles
+        :param lanes: lane of each vehicle to look at
+        :return: gap ahead, speed of vehicle ahead, gap behind, speed of vehicle behind (inf/0 if there is none)
+        '''
+
+        l_gap_ahead = numpy.full(len(vehicles), numpy.inf)
+        l_speed_ahead = numpy.zeros(len(vehicles))
+        l_gap_behind = numpy.full(len(vehicles), numpy.inf)
+        l_speed_behind = numpy.zeros(len(vehicles))
+
+        l_active = numpy.flatnonzero(self._state == _ACTIVE)
+        for i_lane in (0, 1):
+            l_query = numpy.flatnonzero(lanes == i_lane)
+            l_others = l_active[self._lane[l_active] == i_lane]
+            if not l_query.size or not l_others.size:
+                continue
+            l_others = l_others[numpy.argsort(self._position[l_others], kind='stable')]
+            l_vehicles = vehicles[l_query]
+            l_own = self._lane[l_vehicles] == i_lane
+
+            # vehicles on their own lane are found by their rank in order of position, vehicles at the same
+            # position as a vehicle on another lane count as being ahead of it
+            l_rank = numpy.empty(len(self._ids), dtype=int)
+            l_rank[l_others] = numpy.arange(len(l_others))
+            l_ahead = numpy.searchsorted(self._position[l_others], self._position[l_vehicles], side='left')
+            l_behind = l_ahead - 1
+            l_ahead[l_own] = l_rank[l_vehicles[l_own]] + 1
+            l_behind[l_own] = l_rank[l_vehicles[l_own]] - 1
+
+            l_has = l_ahead < len(l_others)
+            l_leader = l_others[l_ahead[l_has]]
+            l_gap_ahead[l_query[l_has]] = self._position[l_leader] - self._length[l_leader] \
+                - self._position[l_vehicles[l_has]]
+            l_speed_ahead[l_query[l_has]] = self._speed[l_leader]
+
+            l_has = l_behind >= 0
+            l_follower = l_others[l_behind[l_has]]
+            l_gap_behind[l_query[l_has]] = self._position[l_vehicles[l_has]] - self._length[l_vehicles[l_has]] \
+                - self._position[l_follower]
+            l_speed_behind[l_query[l_has]] = self._speed[l_follower]
+
+        return l_gap_ahead, l_speed_ahead, l_gap_behind, l_speed_behind
+
+    def _change_lanes(self, vehicles: numpy.ndarray):
+        '''
+        Change lanes of vehicles: Vehicles blocked by a slower leader overtake on the OTL if their vehicle class is
+        allowed and they are not told to keep right. Vehicles on the OTL return to the right lane once it is free
+        ahead or if they are not allowed to use the OTL (anymore). Lane changes need a gap on the target lane.
+
+        :param vehicles: indices of active vehicles
+        '''
+
+        if not vehicles.size:
+            return
+
+        l_min_gap = self._road.get('min_gap')
+        l_lanes = self._lane[vehicles]
+        l_allowed = (numpy.array([self._vehicle_class[i_vehicle] for i_vehicle in vehicles.tolist()])
+                     != Behaviour.DENY.vclass) \
+            & (self._keep_right_until[vehicles] <= self._time) \
+            & (self._position[vehicles] >= self._road.get('otl_start'))
+
+        l_gap_ahead, l_speed_ahead, _, _ = self._leaders(vehicles, l_lanes)
+        l_target_gap_ahead, _, l_target_gap_behind, l_target_speed_behind = self._leaders(vehicles, 1 - l_lanes)
+
+        l_fits = (l_target_gap_ahead >= l_min_gap) & (l_target_gap_behind >= l_min_gap + l_target_speed_behind)
+        l_blocked = (l_speed_ahead < self._speed_max[vehicles] - .1) \
+            & (l_gap_ahead < l_min_gap + 2 * self._speed_max[vehicles])
+        l_free = l_target_gap_ahead >= l_min_gap + 2 * self._speed_max[vehicles]
+
+        l_change = numpy.where(l_lanes == 0, l_allowed & l_blocked, ~l_allowed | l_free) & l_fits
+        self._lane[vehicles[l_change]] = 1 - l_lanes[l_change]
+
+    def _move(self, vehicles: numpy.ndarray):
+        '''
+        Move vehicles: accelerate towards maximum speed, keep the minimal gap to the leader and arrive at the end of
+        the road.
+
+        :param vehicles: indices of active vehicles
+        '''
+
+        if not vehicles.size:
+            self._arrived = ()
+            return
+
+        l_step_length = self._road.get('step_length')
+        l_gap_ahead, _, _, _ = self._leaders(vehicles, self._lane[vehicles])
+
+        self._speed[vehicles] = numpy.maximum(
+            numpy.minimum.reduce(
+                (
+                    self._speed_max[vehicles],
+                    self._speed[vehicles] + self._road.get('accel') * l_step_length,
+                    (l_gap_ahead - self._road.get('min_gap')) / l_step_length
+                )
+            ),
+            0.
+        )
+        self._position[vehicles] += self._speed[vehicles] * l_step_length
+
+        l_arrived = vehicles[self._position[vehicles] >= self._road.get('length')]
+        self._state[l_arrived] = _ARRIVED
+        self._arrived = tuple(self._ids[i_vehicle] for i_vehicle in l_arrived.tolist())
+        for i_vehicle_id in self._arrived:
+            self._subscriptions.get('vehicle').pop(i_vehicle_id, None)
+
+    def _depart_vehicles(self):
+        '''
+        Insert the next vehicle due to depart at the start of the road, if its entry is free.
+        '''
+
+        self._departed = ()
+        if self._next >= len(self._order) or self._depart[self._order[self._next]] > self._time:
+            return
+
+        # vehicles depart with their back at the start of the road, i.e. like departPos="base" of SUMO
+        l_vehicle = self._order[self._next]
+        l_entry = numpy.flatnonzero((self._state == _ACTIVE) & (self._lane == 0))
+        l_space = numpy.min(self._position[l_entry] - self._length[l_entry]) - self._length[l_vehicle] \
+            if l_entry.size else numpy.inf
+
+        if l_space < self._road.get('min_gap'):
+            return
+
+        self._state[l_vehicle] = _ACTIVE
+        self._position[l_vehicle] = self._length[l_vehicle]
+        self._lane[l_vehicle] = 0
+        self._speed[l_vehicle] = min(self._speed_max[l_vehicle], l_space - self._road.get('min_gap'))
+        self._departed = (self._ids[l_vehicle],)
+        self._next += 1
+
+    def _subscribe_simulation(self, varIDs: typing.Iterable[int]):  # pylint: disable=invalid-name
+        '''Subscribe to simulation variables.'''
+        self._subscriptions['simulation'] = tuple(varIDs)
+
+    def _simulation_results(self) -> typing.Dict[int, typing.Any]:
+        '''
+        :return: results of simulation subscription
+        '''
+
+        l_results = {
+            constants.VAR_TIME_STEP: int(round(self._time * 1000)),
+            constants.VAR_DEPARTED_VEHICLES_IDS: self._departed,
+            constants.VAR_ARRIVED_VEHICLES_IDS: self._arrived,
+            constants.VAR_MIN_EXPECTED_VEHICLES: int(numpy.count_nonzero(self._state != _ARRIVED))
+        }
+        return {i_var: l_results.get(i_var) for i_var in self._subscriptions.get('simulation')}
+
+    def _subscribe_lane(self, objectID: str, varIDs: typing.Iterable[int]):  # pylint: disable=invalid-name
+        '''Subscribe to variables of a lane, lanes are identified by their index suffix, e.g. 21edge_1.'''
+        self._subscriptions.get('lane')[objectID] = tuple(varIDs)
+
+    def _lane_results(self) -> typing.Dict[str, typing.Dict[int, float]]:
+        '''
+        :return: results of lane subscriptions, i.e. occupancy of lanes of the 2+1 section
+        '''
+
+        l_results = {}
+        l_active = numpy.flatnonzero(
+            (self._state == _ACTIVE) & (self._position >= self._road.get('otl_start'))
+        )
+        for i_lane_id, i_vars in self._subscriptions.get('lane').items():
+            l_occupancy = min(
+                numpy.sum(self._length[l_active[self._lane[l_active] == int(i_lane_id.rsplit('_', 1)[-1])]])
+                / (self._road.get('length') - self._road.get('otl_start')),
+                1.
+            )
+            l_results[i_lane_id] = {
+                i_var: float(l_occupancy) for i_var in i_vars if i_var == constants.LAST_STEP_OCCUPANCY
+            }
+        return l_results
+
+    def _subscribe_vehicle(self, objectID: str, varIDs: typing.Iterable[int]):  # pylint: disable=invalid-name
+        '''Subscribe to variables of a vehicle on the road.'''
+        self._subscriptions.get('vehicle')[objectID] = tuple(varIDs)
+        self._cache = None
+
+    def _vehicle_results(self, objectID: str) -> typing.Dict[int, typing.Any]:  # pylint: disable=invalid-name
+        '''
+        :return: results of subscription of a vehicle
+        '''
+        return self._all_vehicle_results().get(objectID, {})
+
+    def _all_vehicle_results(self) -> typing.Dict[str, typing.Dict[int, typing.Any]]:
+        '''
+        :return: results of subscriptions of all vehicles on the road
+        '''
+
+        if self._cache is not None:
+            return self._cache
+
+        l_start = time.perf_counter()
+
+        l_vehicle_ids = tuple(self._subscriptions.get('vehicle'))
+        l_vehicles = [self._index.get(i_vehicle_id) for i_vehicle_id in l_vehicle_ids]
+        l_columns = {
+            constants.VAR_POSITION: tuple(
+                zip(
+                    self._position[l_vehicles].tolist(),
+                    ((self._lane[l_vehicles] + .5) * self._road.get('lane_width')).tolist()
+                )
+            ),
+            constants.VAR_LANE_INDEX: self._lane[l_vehicles].tolist(),
+            constants.VAR_VEHICLECLASS: [self._vehicle_class[i_vehicle] for i_vehicle in l_vehicles],
+            constants.VAR_MAXSPEED: self._speed_max[l_vehicles].tolist(),
+            constants.VAR_SPEED: self._speed[l_vehicles].tolist()
+        }
+        self._cache = {
+            i_vehicle_id: {i_var: l_columns.get(i_var)[i_row] for i_var in self._subscriptions.get('vehicle').get(i_vehicle_id)}
+            for i_row, i_vehicle_id in enumerate(l_vehicle_ids)
+        }
+
+        self.elapsed += time.perf_counter() - l_start
+        return self._cache
+
+    def _set_vehicle_class(self, vehID: str, clazz: str):  # pylint: disable=invalid-name
+        '''Set vehicle class of a vehicle, vehicles of class Behaviour.DENY must not use the OTL.'''
+        self._vehicle_class[self._index.get(vehID)] = str(clazz)
+
+    def _change_lane(self, vehID: str, laneIndex: int, duration: float):  # pylint: disable=invalid-name
+        '''Tell a vehicle to keep right (lane 0) for a duration, or release it (any other lane or duration 0).'''
+        self._keep_right_until[self._index.get(vehID)] = self._time + duration if laneIndex == 0 else self._time
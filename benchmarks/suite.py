@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# @package benchmarks.suite
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+End-to-end benchmarks of a TraCI run, i.e. vehicle generation, `Runtime.run_traci` with `SumoCSE`, statistics and
+writing of results, driven by the TraCI stand-in of `benchmarks.faketraci` instead of SUMO.
+'''
+
+import argparse
+import concurrent.futures
+import datetime
+import multiprocessing
+import os
+from pathlib import Path
+import platform
+import resource
+import sys
+import tempfile
+import time
+import typing
+
+import numpy
+
+import colmto
+import colmto.common.io
+import colmto.common.statistics
+import colmto.common.timing
+import colmto.cse.cse
+from colmto.common.helper import Distribution
+from colmto.common.helper import InitialSorting
+from colmto.common.helper import VehicleDisposition
+from colmto.sumo.sumocfg import SumoConfig
+
+from benchmarks import faketraci
+
+try:
+    import colmto.sumo.runtime
+except ImportError:
+    # no SUMO installation: serve `import traci` of the runtime with the stand-in, it is never started
+    sys.modules['traci'] = faketraci
+    import colmto.sumo.runtime
+
+# scenario of all benchmark runs
+SCENARIO = 'NI-B210'
+
+# rule sets to benchmark, 'default' refers to the rules of the default run configuration
+RULE_SETS = {
+    'none': (),
+    'default': None,
+    'dissatisfaction': (
+        {
+            'type': 'ExtendableSUMOPositionRule',
+            'args': {
+                'bounding_box': ((1350., -2.), (2500., 2.)),
+                'subrule_operator': 'all',
+                'subrules': [
+                    {
+                        'type': 'SUMOVehicleDissatisfactionRule',
+                        'args': {
+                            'dissatisfaction_range': (0., .5)
+                        }
+                    }
+                ]
+            }
+        },
+    ),
+    'occupancy': (
+        {
+            'type': 'SUMOOccupancyRule',
+            'args': {
+                'occupancy_range': (0., .1),
+                'lane_id': '21edge_1',
+                'outside': True
+            }
+        },
+    )
+}
+
+
+class StandInRuntime(colmto.sumo.runtime.Runtime):
+    '''Runtime running simulations with a TraCI stand-in.'''
+
+    def __init__(self, args, sumo_config: SumoConfig, traci: faketraci.FakeTraCI):
+        '''
+        Initialisation.
+
+        :param args: argparse configuration
+        :param sumo_config: SUMO configuration
+        :param traci: TraCI stand-in
+        '''
+        super().__init__(args, sumo_config, 'sumo')
+        self._traci = traci
+
+    def backend(self) -> faketraci.FakeTraCI:
+        '''
+        :return: TraCI stand-in
+        '''
+        return self._traci
+
+
+def run_case(vehicles: int, rules: str = 'default', seed: int = 42, vehicles_per_second: float = .5) -> dict:
+    '''
+    Run one benchmark case, i.e. one run of the benchmark scenario with random initial sorting, and measure the
+    time of each of its phases.
+
+    :param vehicles: number of vehicles
+    :param rules: name of rule set (see `RULE_SETS`)
+    :param seed: seed of PRNGs, i.e. runs of the same case are identical
+    :param vehicles_per_second: rate of departing vehicles
+    :return: case, timings in seconds, also per phase of the time steps (see `PhaseTimer`), vehicle-steps,
+        vehicle-steps per second and peak memory (RSS in bytes)
+    '''
+
+    with tempfile.TemporaryDirectory() as f_tmpdir:
+        l_args = argparse.Namespace(
+            loglevel='WARNING',
+            quiet=True,
+            logfile=Path(f_tmpdir) / 'colmto.log',
+            output_dir=Path(f_tmpdir),
+            scenario_dir=Path(f_tmpdir),
+            runconfigfile=Path(f_tmpdir) / 'runconfig.yaml',
+            scenarioconfigfile=Path(f_tmpdir) / 'scenarioconfig.yaml',
+            vtypesconfigfile=Path(f_tmpdir) / 'vtypesconfig.yaml',
+            results_hdf5_file=None,
+            freshconfigs=True,
+            headless=True,
+            gui=False,
+            onlyoneotlsegment=False,
+            cse_enabled=True,
+            runs=1,
+            scenarios=[SCENARIO],
+            run_prefix='benchmark',
+            forcerebuildscenarios=False,
+            initialsortings=['random'],
+            cooperation_probability=None,
+            writefulloccupancies=False
+        )
+
+        for i_prng in (Distribution._prng, InitialSorting._prng, VehicleDisposition._prng):  # pylint: disable=protected-access
+            i_prng.value.seed(seed)
+
+        l_sumo_config = SumoConfig(l_args, None, None)
+        l_sumo_config._prng.seed(seed)  # pylint: disable=protected-access
+        l_sumo_config._run_config['vehiclespersecond'] = {  # pylint: disable=protected-access
+            'enabled': True,
+            'value': vehicles_per_second
+        }
+        l_rules = RULE_SETS.get(rules) if RULE_SETS.get(rules) is not None else l_sumo_config.run_config.get('rules')
+
+        l_vtypes, l_vtypefractions = zip(
+            *(
+                (i_vtype, i_vtype_config.get('fraction', 0))
+                for i_vtype, i_vtype_config in l_sumo_config.run_config.get('vtypedistribution').items()
+            )
+        )
+        l_parameters = l_sumo_config.scenario_config.get(SCENARIO).get('parameters')
+        # road as generated by SumoConfig: entry and exit lane of `entrylanepercent` of a segment, 2+1 section
+        l_entry = l_sumo_config.run_config.get('entrylanepercent') / 100. \
+            * l_parameters.get('length') / (l_parameters.get('switches') + 1)
+
+        l_timings = {}
+        l_rss = _peak_rss()
+
+        l_start = time.perf_counter()
+        l_vehicles = l_sumo_config._create_vehicle_distribution(  # pylint: disable=protected-access
+            numpy.random.RandomState(seed).choice(l_vtypes, size=vehicles, p=l_vtypefractions),
+            l_sumo_config.aadt({'scenarioname': SCENARIO}),
+            InitialSorting.RANDOM,
+            SCENARIO
+        )
+        l_timings['generate'] = time.perf_counter() - l_start
+
+        l_traci = faketraci.FakeTraCI.of(l_vehicles, l_parameters.get('length') + 2 * l_entry, l_entry)
+        l_cse = colmto.cse.cse.SumoCSE(
+            l_args, observation_window=l_sumo_config.run_config.get('observationwindow', 60)
+        ).add_rules_from_cfg(l_rules)
+
+        l_timer = colmto.common.timing.PhaseTimer()
+        l_start = time.perf_counter()
+        l_accumulator = StandInRuntime(l_args, l_sumo_config, l_traci).run_traci(
+            {
+                'scenarioname': SCENARIO,
+                'runnumber': 0,
+                'vehicles': l_vehicles,
+                'initialsorting': InitialSorting.RANDOM.name.lower()
+            },
+            l_cse,
+            timer=l_timer
+        )
+        l_timings['simulate'] = time.perf_counter() - l_start
+        l_timings['standin'] = l_traci.elapsed
+
+        l_statistics = colmto.common.statistics.Statistics(l_args)
+        l_start = time.perf_counter()
+        l_results = l_statistics.global_stats(l_statistics.merge_vehicle_series(0, l_accumulator))
+        l_timings['statistics'] = time.perf_counter() - l_start
+
+        l_start = time.perf_counter()
+        colmto.common.io.Writer(l_args).write_hdf5(
+            l_results,
+            hdf5_file=Path(f_tmpdir) / 'benchmark.hdf5',
+            hdf5_base_path=os.path.join(SCENARIO, 'random', '0'),
+            **colmto.common.io.HDF5_DATASET_OPTIONS
+        )
+        l_timings['write'] = time.perf_counter() - l_start
+
+    return {
+        'vehicles': vehicles,
+        'rules': rules,
+        'seed': seed,
+        'vehicles_per_second': vehicles_per_second,
+        'steps': l_traci.steps,
+        'vehicle_steps': l_traci.vehicle_steps,
+        'seconds': l_timings,
+        # seconds per phase of the time steps of the simulation, 'sumo' being the stand-in
+        'phases': {i_phase: i_summary.get('total') for i_phase, i_summary in l_timer.summary().items()},
+        # colmto's share of the simulation, i.e. without the work of the stand-in
+        'vehicle_steps_per_second': l_traci.vehicle_steps / max(l_timings.get('simulate') - l_traci.elapsed, 1e-9),
+        'vehicle_steps_per_second_total': l_traci.vehicle_steps / max(l_timings.get('simulate'), 1e-9),
+        'commands': {i_key: int(i_value) for i_key, i_value in l_cse.commands.items()},
+        'baseline_rss': l_rss,
+        'peak_rss': _peak_rss()
+    }
+
+
+def run_suite(vehicle_counts: typing.Iterable[int], rule_sets: typing.Iterable[str], repeat: int = 1,
+              seed: int = 42, vehicles_per_second: float = .5) -> dict:
+    '''
+    Run benchmark cases for all combinations of vehicle counts and rule sets. Each case runs in a fresh process, so
+    its peak memory is not affected by other cases.
+
+    :param vehicle_counts: numbers of vehicles
+    :param rule_sets: names of rule sets (see `RULE_SETS`)
+    :param repeat: number of repetitions of each case
+    :param seed: seed of PRNGs
+    :param vehicles_per_second: rate of departing vehicles
+    :return: environment of benchmark and results of cases
+    '''
+
+    l_cases = []
+    for i_vehicles in vehicle_counts:
+        for i_rules in rule_sets:
+            if i_rules not in RULE_SETS:
+                raise KeyError(f'Unknown rule set {i_rules}, choose from {", ".join(RULE_SETS)}.')
+            for _ in range(repeat):
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context('spawn')
+                ) as f_executor:
+                    l_cases.append(
+                        f_executor.submit(run_case, i_vehicles, i_rules, seed, vehicles_per_second).result()
+                    )
+
+    return {
+        'colmto_version': colmto.package_version() or colmto.__version__,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'cases': l_cases
+    }
+
+
+def compare(results: dict, reference: dict) -> typing.List[typing.Tuple[int, str, float, float]]:
+    '''
+    Compare vehicle-steps per second of the cases of two benchmarks, e.g. of two versions of colmto. Repetitions of
+    a case are represented by their best result.
+
+    :param results: results of benchmark (see `run_suite`)
+    :param reference: results of reference benchmark
+    :return: (vehicles, rule set, vehicle-steps per second, ratio to reference) of cases present in both
+    '''
+
+    def _best(cases: typing.Iterable[dict]) -> typing.Dict[typing.Tuple[int, str], float]:
+        l_best = {}
+        for i_case in cases:
+            l_key = (i_case.get('vehicles'), i_case.get('rules'))
+            l_best[l_key] = max(l_best.get(l_key, 0.), i_case.get('vehicle_steps_per_second'))
+        return l_best
+
+    l_reference = _best(reference.get('cases'))
+    return [
+        (i_vehicles, i_rules, i_rate, i_rate / l_reference.get((i_vehicles, i_rules)))
+        for (i_vehicles, i_rules), i_rate in _best(results.get('cases')).items()
+        if l_reference.get((i_vehicles, i_rules))
+    ]
+
+
+def _peak_rss() -> int:
+    '''
+    :return: peak resident set size of this process in bytes
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
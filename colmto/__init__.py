@@ -1,4 +1,62 @@
 '''Colmto init.'''
-from colmto._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+import typing
+
+
+def package_version() -> typing.Optional[str]:
+    '''
+    Version of the installed colmto package, read from its metadata, i.e. without calling git.
+
+    :return: version, None if colmto is not installed (e.g. run from a source tree)
+    '''
+
+    try:
+        from importlib import metadata  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover, Python < 3.8
+        return None
+    try:
+        return metadata.version('colmto')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def git_commit() -> typing.Optional[str]:
+    '''
+    Commit id of the git checkout colmto is run from, read from its `.git` directory, i.e. without calling git.
+
+    :return: commit id, None if colmto is not run from a git checkout
+    '''
+
+    from pathlib import Path  # pylint: disable=import-outside-toplevel
+
+    l_git = Path(__file__).resolve().parent.parent / '.git'
+    try:
+        if l_git.is_file():  # worktree or submodule: "gitdir: <path>"
+            l_git = l_git.parent / l_git.read_text().partition('gitdir:')[2].strip()
+        l_head = (l_git / 'HEAD').read_text().strip()
+        if not l_head.startswith('ref:'):  # detached HEAD
+            return l_head
+        l_ref = l_head.partition('ref:')[2].strip()
+        if (l_git / l_ref).is_file():
+            return (l_git / l_ref).read_text().strip()
+        for i_line in (l_git / 'packed-refs').read_text().splitlines():
+            if i_line.endswith(f' {l_ref}'):
+                return i_line.split(' ')[0]
+    except OSError:
+        pass
+    return None
+
+
+def __getattr__(name: str):
+    '''
+    Resolve `__version__` on first access: from package metadata if installed, from versioneer otherwise (which may
+    call git), so importing colmto does not start any processes.
+    '''
+
+    if name == '__version__':
+        l_version = package_version()
+        if l_version is None:
+            from colmto._version import get_versions  # pylint: disable=import-outside-toplevel
+            l_version = get_versions()['version']
+        globals()['__version__'] = l_version
+        return l_version
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
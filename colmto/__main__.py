@@ -28,9 +28,18 @@ import datetime
 
 from pathlib import Path
 
-import colmto.common.configuration
 import colmto.common.log
-import colmto.sumo.sumosim
+
+
+def _run_numbers(value: str) -> list:
+    '''
+    :param value: comma separated run numbers, e.g. '0,17,500'
+    :return: list of run numbers
+    '''
+    try:
+        return [int(i_run) for i_run in value.split(',') if i_run.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid run numbers: {value!r}, expected e.g. 0,17,500') from None
 
 
 class Colmto(object):
@@ -83,6 +92,30 @@ class Colmto(object):
             '--output-hdf5-file', dest='results_hdf5_file', type=Path,
             default=None, help='target HDF5 file results will be written to'
         )
+        l_parser.add_argument(
+            '--results-layout', dest='resultslayout', type=str, choices=('groups', 'runaxis'),
+            default=None, help='HDF5 results layout: one group per run (groups) '
+                               'or one dataset with a run axis per scenario, AADT, sorting and vehicle type (runaxis)'
+        )
+        l_parser.add_argument(
+            '--sketches', dest='sketch_epsilon', type=float, nargs='?', const=0.01,
+            default=None, help='fold grid-based metrics of all runs into quantile sketches with given rank error bound '
+                               '(default: %(const)s) and write their approximate quartiles to <run_prefix>.sketches.hdf5'
+        )
+        l_parser.add_argument(
+            '--timing', dest='timing', action='store_true',
+            default=None, help='time the phases of each time step of TraCI runs, log a summary per run and write '
+                               'per-phase histograms to <run_prefix>.timing.json'
+        )
+        l_parser.add_argument(
+            '--profile-runs', dest='profile_runs', type=_run_numbers,
+            default=None, help='profile given runs, e.g. 0,17,500, with cProfile and a stack sampler, and write '
+                               'profile-<scenario>-<sorting>-<run>.prof and .collapsed files to the results dir'
+        )
+        l_parser.add_argument(
+            '--profile-ratio', dest='profile_ratio', type=float,
+            default=None, help='profile an evenly spaced fraction of runs, e.g. 0.01 for every 100th run'
+        )
         l_parser.add_argument(
             '--scenarios', dest='scenarios', type=str, nargs='*',
             default=None
@@ -99,6 +132,14 @@ class Colmto(object):
             '--runs', dest='runs', type=int,
             default=None
         )
+        l_parser.add_argument(
+            '--jobs', dest='jobs', type=int,
+            default=None, help='number of runs to simulate in parallel worker processes'
+        )
+        l_parser.add_argument(
+            '--pregenerate', dest='pregenerate', type=int,
+            default=None, help='number of run configurations generated ahead while runs simulate (0 disables)'
+        )
         l_parser.add_argument(
             '--run_prefix', dest='run_prefix', type=str,
             default=datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
@@ -170,6 +211,10 @@ class Colmto(object):
 
     def run(self):
         '''Run CoLMTO'''
+        # imported here, i.e. after parsing arguments, to keep the startup of e.g. `colmto --help` fast
+        import colmto.common.configuration  # pylint: disable=import-outside-toplevel
+        import colmto.sumo.sumosim  # pylint: disable=import-outside-toplevel
+
         self._log.info('---- Starting CoLMTO ----')
         l_configuration = colmto.common.configuration.Configuration(self._args)
         self._log.debug('Initial loading of configuration done')
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# @package colmto.common.cache
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''Content-addressed cache of build artifacts, e.g. SUMO scenario files.'''
+
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import typing
+
+import colmto.common.log
+
+
+class ArtifactCache(object):
+    '''
+    Content-addressed cache of build artifacts shared across run prefixes and processes.
+
+    Each entry is a directory of artifacts named by a hash of all inputs they were built from (see `key`).
+    Artifacts are built into a staging directory and published by renaming it, so readers never see partially
+    written entries and concurrent builds of the same entry resolve to one of them. Entries are evicted least
+    recently used first (by modification time, which `get` updates) once their total size exceeds `max_bytes`.
+    '''
+
+    def __init__(self, directory: typing.Union[str, Path] = Path('~/.colmto/cache'), max_bytes: int = 2**28,
+                 args=None):
+        '''
+        Initialisation.
+
+        :param directory: cache directory
+        :param max_bytes: upper bound of total size of all entries in bytes
+        :param args: arguments of logger (loglevel, quiet, logfile)
+        '''
+
+        if args is not None:
+            self._log = colmto.common.log.logger(__name__, args.loglevel, args.quiet, args.logfile)
+        else:
+            self._log = colmto.common.log.logger(__name__)
+
+        self._directory = Path(directory).expanduser()
+        self._max_bytes = int(max_bytes)
+
+    @property
+    def directory(self) -> Path:
+        '''
+        :return: cache directory
+        '''
+        return self._directory
+
+    @staticmethod
+    def key(*inputs: typing.Union[str, bytes]) -> str:
+        '''
+        Key of an entry, i.e. SHA-256 hash of its (length prefixed) inputs.
+
+        :param inputs: inputs, e.g. contents of input files and tool versions
+        :return: hex digest
+        '''
+
+        l_hash = hashlib.sha256()
+        for i_input in inputs:
+            l_bytes = i_input if isinstance(i_input, bytes) else str(i_input).encode('utf8')
+            l_hash.update(len(l_bytes).to_bytes(8, 'little'))
+            l_hash.update(l_bytes)
+        return l_hash.hexdigest()
+
+    def get(self, key: str, names: typing.Iterable[str]) -> typing.Optional[Path]:
+        '''
+        Look up an entry containing all given artifacts and mark it as recently used.
+
+        :param key: key of entry
+        :param names: file names of artifacts
+        :return: directory of entry, None if missing or incomplete
+        '''
+
+        l_entry = self._directory / key
+        try:
+            if not all((l_entry / i_name).is_file() for i_name in names):
+                return None
+            os.utime(l_entry)
+        except FileNotFoundError:
+            return None
+
+        self._log.debug('cache hit %s', key)
+        return l_entry
+
+    def put(self, key: str, build: typing.Callable[[Path], None]) -> Path:
+        '''
+        Build artifacts of an entry into a staging directory and publish it. An existing entry holding all built
+        artifacts is kept, as its content is the same by key, e.g. if it got published concurrently. Incomplete
+        entries are moved aside before publishing and deleted afterwards, so readers never see a partially deleted
+        entry. Evicts least recently used entries afterwards.
+
+        :param key: key of entry
+        :param build: callable writing artifacts into the directory passed to it
+        :return: directory of entry
+        '''
+
+        self._log.debug('cache miss %s', key)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        l_entry = self._directory / key
+        l_staging = Path(tempfile.mkdtemp(prefix=f'.{key}.', dir=self._directory))
+        l_replaced = l_staging.with_name(f'{l_staging.name}.old')
+        try:
+            build(l_staging)
+            if all((l_entry / i_file.name).is_file() for i_file in l_staging.iterdir()):
+                self._log.debug('entry %s already published', key)
+            else:
+                try:
+                    os.replace(l_entry, l_replaced)
+                except FileNotFoundError:
+                    pass
+                try:
+                    os.replace(l_staging, l_entry)
+                except OSError:
+                    # entry got published concurrently in the meantime
+                    self._log.debug('entry %s published concurrently', key)
+        finally:
+            shutil.rmtree(l_staging, ignore_errors=True)
+            shutil.rmtree(l_replaced, ignore_errors=True)
+
+        self.evict(keep=(key,))
+        return l_entry
+
+    def evict(self, keep: typing.Iterable[str] = ()) -> typing.List[str]:
+        '''
+        Evict least recently used entries until their total size is within bound.
+
+        :param keep: keys of entries not to evict, e.g. just published ones
+        :return: keys of evicted entries
+        '''
+
+        l_entries = []
+        for i_entry in self._directory.iterdir() if self._directory.is_dir() else ():
+            if i_entry.name.startswith('.') or not i_entry.is_dir():
+                continue
+            try:
+                l_entries.append(
+                    (
+                        i_entry.stat().st_mtime,
+                        sum(i_file.stat().st_size for i_file in i_entry.iterdir() if i_file.is_file()),
+                        i_entry
+                    )
+                )
+            except FileNotFoundError:
+                continue
+
+        l_keep = set(keep)
+        l_size = sum(i_size for _, i_size, _ in l_entries)
+        l_evicted = []
+        for _, i_size, i_entry in sorted(l_entries, key=lambda i_item: i_item[0]):
+            if l_size <= self._max_bytes:
+                break
+            if i_entry.name in l_keep:
+                continue
+            self._log.debug('evicting %s (%d bytes)', i_entry.name, i_size)
+            shutil.rmtree(i_entry, ignore_errors=True)
+            l_size -= i_size
+            l_evicted.append(i_entry.name)
+
+        return l_evicted
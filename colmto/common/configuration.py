@@ -26,8 +26,8 @@
 import copy
 from pathlib import Path
 from types import MappingProxyType
-import sh
 
+import colmto
 import colmto.common.io
 import colmto.common.log
 
@@ -47,6 +47,28 @@ _DEFAULT_CONFIG_RUN = {
     'onlyoneotlsegment': False,
     'entrylanepercent': 5,
     'runs': 1000,
+    'jobs': 1,
+    'pregenerate': 2,    # number of run configurations generated ahead while runs simulate, 0 disables
+    'writerqueue': 4,    # number of run results queued for the background HDF5 writer
+    'resultslayout': 'groups',    # groups (scenario/aadt/sorting/run/...) or runaxis (datasets with run axis)
+    'routes': 'direct',    # direct: write routes of single path networks directly, duarouter: route all trips
+    'compressxml': False,    # write trip and route files gzipped (.xml.gz), SUMO reads them natively
+    'scenariocache': {    # content-addressed cache of scenario files (nod/edg/net/settings xml), opt-in
+        'enabled': False,
+        'directory': '~/.colmto/cache',
+        'maxbytes': 268435456    # evict least recently used scenarios beyond 256 MiB
+    },
+    'sketches': {    # quantile sketches of grid-based metrics across runs, written to <run_prefix>.sketches.hdf5
+        'enabled': False,
+        'epsilon': 0.01,    # rank error bound of approximate quantiles
+        'seed': 0    # seed of the sketches' choices of values to keep, i.e. for reproducible estimates
+    },
+    'timing': False,    # per-phase timing of TraCI runs, written to <run_prefix>.timing.json
+    'profiling': {    # profile selected runs, written to results/profile-<scenario>-<sorting>-<run>.prof/.collapsed
+        'runs': [],    # run numbers to profile
+        'ratio': 0.,    # fraction of runs to profile, evenly spaced
+        'interval': 0.001    # sampling interval of collapsed stacks in seconds
+    },
     'scenarios': ['NI-B210'],
     'simtimeinterval': [0, 1800],
     'starttimedistribution': 'poisson',
@@ -68,7 +90,9 @@ _DEFAULT_CONFIG_RUN = {
         }
     ],
     'gridcellwidth': 4,    # unit: meter
+    'observationwindow': 60,    # unit: time steps (i.e. seconds) the CSE bases observed traffic on
     'sumo': {
+        'backend': 'traci',    # traci (socket) or libsumo (in-process)
         'enabled': True,
         'gui-delay': 200,
         'headless': True,
@@ -333,17 +357,9 @@ class Configuration(object):
         else:
             self._vtypes_config = self._reader.read_yaml(self._args.vtypesconfigfile)
 
-        # store currently running version
-        # inferred from current HEAD if located inside a git project.
-        # otherwise set version to 'UNKNOWN'
-        try:
-            l_git_commit_id = sh.Command('git')(['rev-parse', 'HEAD'])
-            self._run_config['colmto_version'] = str(l_git_commit_id).replace('\n', '')
-        except sh.ErrorReturnCode:
-            self._run_config['colmto_version'] = 'UNKNOWN'
-        except sh.CommandNotFound:
-            self._log.debug('Git command not found in PATH. Setting commit id to UNKNOWN.')
-            self._run_config['colmto_version'] = 'UNKNOWN'
+        # store currently running version from package metadata (versioneer's, i.e. including the git commit id),
+        # otherwise, e.g. if run from a source checkout, the git commit id, or set version to 'UNKNOWN'
+        self._run_config['colmto_version'] = colmto.package_version() or colmto.git_commit() or 'UNKNOWN'
 
         # make sure vtype_lise exists and is dict
         if self._run_config.get('vtype_list') is None \
@@ -365,6 +381,22 @@ class Configuration(object):
             self._run_config['cse-enabled'] = True
         if self._args.runs is not None:
             self._run_config['runs'] = self._args.runs
+        if getattr(self._args, 'jobs', None) is not None:
+            self._run_config['jobs'] = self._args.jobs
+        if getattr(self._args, 'pregenerate', None) is not None:
+            self._run_config['pregenerate'] = self._args.pregenerate
+        if getattr(self._args, 'resultslayout', None) is not None:
+            self._run_config['resultslayout'] = self._args.resultslayout
+        if getattr(self._args, 'sketch_epsilon', None) is not None:
+            self._run_config['sketches'] = dict(
+                self._run_config.get('sketches', {}), enabled=True, epsilon=self._args.sketch_epsilon
+            )
+        if getattr(self._args, 'timing', None):
+            self._run_config['timing'] = True
+        if getattr(self._args, 'profile_runs', None) is not None:
+            self._run_config['profiling'] = dict(self._run_config.get('profiling', {}), runs=self._args.profile_runs)
+        if getattr(self._args, 'profile_ratio', None) is not None:
+            self._run_config['profiling'] = dict(self._run_config.get('profiling', {}), ratio=self._args.profile_ratio)
         if self._args.scenarios is not None:
             if self._args.scenarios != ['all']:
                 self._run_config['scenarios'] = self._args.scenarios
@@ -26,11 +26,12 @@
 from __future__ import annotations
 from collections import namedtuple
 from dataclasses import dataclass
+import functools
 import typing
 import enum
-import matplotlib.pyplot as plt
 import numpy
-import pandas
+if typing.TYPE_CHECKING:
+    import pandas  # pylint: disable=unused-import
 
 @dataclass(frozen=True)
 class Colour:
@@ -52,6 +53,13 @@ class Colour:
         '''
         return iter((self.red, self.green, self.blue, self.alpha))
 
+    def __reduce__(self):
+        '''
+        Pickle support for frozen, slotted instances, e.g. when passing vehicles to worker processes.
+        :return: constructor and arguments
+        '''
+        return self.__class__, tuple(self)
+
     def __mul__(self, value):
         '''
         Scalars can be attribute-wise multiplied to a Colour.
@@ -79,7 +87,26 @@ class Colour:
         :return: Colour
 
         '''
-        return Colour(*plt.get_cmap(name=name, lut=int(max_value))(int(value)))
+        return Colour(*Colour.lut(name, max_value)[min(max(int(value), 0), int(max_value) - 1)])
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def lut(name: str, max_value: int) -> numpy.ndarray:
+        '''
+        Lookup table of given colourmap with max_value entries, i.e. the colours `map` picks from.
+        Tables are created once per colourmap and size, so colours of many values can be looked up at once, e.g.
+        `Colour.lut('plasma', 30)[speeds.astype(int)]`. Values out of range need to be clipped to [0, max_value-1]
+        (the colourmap's under/over colours).
+
+        :param name: colourmap name (needs to be supported by matplotlib, e.g. plasma)
+        :param max_value: maximum value, i.e. number of entries
+        :return: read-only array of shape (max_value, 4) with RGBa colours
+
+        '''
+        import matplotlib.pyplot as plt  # pylint: disable=import-outside-toplevel
+        l_lut = numpy.asarray(plt.get_cmap(name=name, lut=int(max_value))(numpy.arange(int(max_value))))
+        l_lut.setflags(write=False)
+        return l_lut
 
     def as_tuple(self) -> typing.Tuple[float, float, float, float]:
         '''
@@ -191,6 +218,13 @@ class Range:
         '''
         return iter((self.min, self.max))
 
+    def __reduce__(self):
+        '''
+        Pickle support for frozen, slotted instances.
+        :return: constructor and arguments
+        '''
+        return self.__class__, tuple(self)
+
     def contains(self, value: float) -> bool:
         '''
         Checks whether value lies between min and max (including).
@@ -281,6 +315,27 @@ class Distribution(enum.Enum):
         assert self is Distribution.LINEAR
         return prev_start_time + 1 / lamb # i.e. Distribution.LINEAR
 
+    def timesteps(self, lamb: float, size: int, prev_start_time: float = 0.) -> numpy.ndarray:
+        '''
+        Calculate `size` consecutive time steps at once, i.e. the same as chaining `size` calls of `next_timestep`,
+        each getting the previous result as prev_start_time.
+
+        :param lamb: lambda
+        :param size: number of time steps
+        :param prev_start_time: start time before the first time step
+        :return: array of time steps
+
+        '''
+
+        if self is Distribution.POISSON:
+            l_intervals = self._prng.value.exponential(scale=1/lamb, size=int(size))
+        else:
+            assert self is Distribution.LINEAR
+            l_intervals = numpy.full(int(size), 1 / lamb)
+
+        # cumsum adds sequentially, i.e. yields the same values as chained calls of next_timestep
+        return numpy.cumsum(numpy.concatenate(((float(prev_start_time),), l_intervals)))[1:]
+
 
 @enum.unique
 class InitialSorting(enum.Enum):
@@ -303,15 +358,30 @@ class InitialSorting(enum.Enum):
 
         '''
 
+        vehicles[:] = [
+            vehicles[i_index] for i_index in self.argsort(
+                numpy.fromiter((i_v.speed_max for i_v in vehicles), dtype=float, count=len(vehicles))
+            )
+        ]
+
+    def argsort(self, speeds: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Indices which bring vehicles with given maximum speeds into required order (BEST, RANDOM, WORST).
+        Vehicles of equal speed keep their order.
+
+        :param speeds: maximum speeds of vehicles
+        :return: array of indices
+
+        '''
+
         if self is InitialSorting.BEST:
-            vehicles.sort(key=lambda i_v: i_v.speed_max, reverse=True)
-        elif self is InitialSorting.RANDOM:
-            self._prng.value.shuffle(vehicles)
-        elif self is InitialSorting._prng:
+            return numpy.argsort(-numpy.asarray(speeds, dtype=float), kind='stable')
+        if self is InitialSorting.RANDOM:
+            return self._prng.value.permutation(len(speeds))
+        if self is InitialSorting._prng:
             raise KeyError('Can\'t order vehicles on prng')
-        else:
-            assert self is InitialSorting.WORST
-            vehicles.sort(key=lambda i_v: i_v.speed_max)
+        assert self is InitialSorting.WORST
+        return numpy.argsort(numpy.asarray(speeds, dtype=float), kind='stable')
 
 
 @enum.unique
@@ -329,6 +399,18 @@ class VehicleType(enum.Enum):
     VAN = 'van'
     UNDEFINED = 'undefined'
 
+    @property
+    def code(self) -> int:
+        '''
+        Integer code of vehicle type, e.g. for vectorised comparisons in NumPy arrays
+
+        :return: code
+        '''
+        return _VEHICLE_TYPE_CODES[self]
+
+
+_VEHICLE_TYPE_CODES = {i_vtype: i_code for i_code, i_vtype in enumerate(VehicleType)}
+
 
 @enum.unique
 class Metric(enum.Enum):
@@ -454,6 +536,16 @@ class RuleOperator(enum.Enum):
 
         return self.value(args)  # pylint: disable=too-many-function-args
 
+    def evaluate_masks(self, masks: typing.Iterable[numpy.ndarray]) -> numpy.ndarray:
+        '''
+        element-wise evaluate iterable of boolean arrays of equal shape
+
+        :param masks: iterable of boolean arrays
+        :return: boolean array, element-wise all/any of masks depending on RuleOperator
+        '''
+
+        return (numpy.logical_and if self is RuleOperator.ALL else numpy.logical_or).reduce(tuple(masks))
+
     @staticmethod
     def ruleoperator_from_string(rule_operator: str) -> RuleOperator:
         '''
@@ -483,17 +575,20 @@ class VehicleDisposition(enum.Enum):
     _prng = numpy.random.RandomState()  # pylint: disable=no-member
 
     @staticmethod
-    def choose(cooperation_probability: float = 0.5) -> VehicleDisposition:
+    def choose(cooperation_probability: float = 0.5,
+               size: typing.Optional[int] = None) -> typing.Union[VehicleDisposition, numpy.ndarray]:
         '''
         Pick a random disposition by given probability (default 50/50)
 
         :param cooperation_probability: probability p=[0,1] (default: 0.5)
-        :return: VehicleDisposition.COOPERATIVE | VehicleDisposition.UNCOOPERATIVE
+        :param size: (optional) number of dispositions to pick at once
+        :return: VehicleDisposition.COOPERATIVE | VehicleDisposition.UNCOOPERATIVE, array of them if size is given
 
         '''
 
         return VehicleDisposition._prng.value.choice(
             (VehicleDisposition.COOPERATIVE, VehicleDisposition.UNCOOPERATIVE),
+            size=size,
             p=(cooperation_probability, 1-cooperation_probability)
         )
 
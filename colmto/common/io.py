@@ -24,8 +24,14 @@
 '''I/O module'''
 # pylint: disable=no-member
 
+from __future__ import annotations
 import csv
 import gzip
+import queue
+import signal
+import threading
+import time
+import typing
 from pathlib import Path
 
 import json
@@ -38,10 +44,18 @@ except ImportError:  # pragma: no cover
 
 import yaml
 
-import h5py
-
 import colmto.common.log
 
+if typing.TYPE_CHECKING:
+    import h5py
+
+# options of result datasets, e.g. as written by SumoSim
+HDF5_DATASET_OPTIONS = {
+    'compression': 'gzip',
+    'compression_opts': 9,
+    'fletcher32': True
+}
+
 
 class Reader(object):  # pylint: disable=too-few-public-methods
     '''Read xml, json and yaml files.'''
@@ -104,6 +118,25 @@ class Writer(object):
                 default_flow_style=default_flow_style
             )
 
+    def write_xml(self, root: str, elements: typing.Iterable, filename: Path):
+        '''
+        Stream xml elements below a root element to file, compress file with gzip if filename ends with .gz.
+        Elements are written one by one as they are generated, i.e. the tree is never held in memory as a whole.
+
+        :param root: tag of root element
+        :param elements: iterable of elements (lxml.etree.Element) to write below root
+        :param filename: file name
+        '''
+
+        self._log.debug('Writing %s', filename)
+        import lxml.etree  # pylint: disable=import-outside-toplevel
+        with gzip.open(filename, 'wb', compresslevel=6) if Path(filename).suffix.lower() == '.gz' \
+                else open(filename, mode='wb') as f_xml, lxml.etree.xmlfile(f_xml, encoding='utf-8') as f_xmlfile:
+            with f_xmlfile.element(root):
+                f_xmlfile.write('\n')
+                for i_element in elements:
+                    f_xmlfile.write(i_element, pretty_print=True)
+
     def write_csv(self, fieldnames, rowdict, filename: Path):
         '''Write row dictionary with provided fieldnames as csv with headers.'''
 
@@ -130,63 +163,279 @@ class Writer(object):
         if not isinstance(object_dict, dict):
             raise TypeError('objectdict is not a dictionary')
 
+        import h5py  # pylint: disable=import-outside-toplevel
+        with h5py.File(hdf5_file, mode='a') as f_hdf5:
+            self._write_hdf5_group(f_hdf5, object_dict, hdf5_base_path, **kwargs)
+
+    def write_hdf5_run(self, object_dict: dict, hdf5_file: str, hdf5_base_path: str, run: int, **kwargs):
+        r'''
+        Write the objects of one run into run-axis datasets below `hdf5_base_path`, i.e. each object path becomes one
+        resizable dataset with the run as first axis (see `_write_hdf5_run`).
+
+        :param object_dict: Object(s) of one run to be stored in a named dictionary structure
+            ([name] -> numeric value|list|numpy)
+        :param hdf5_file: The file name
+        :param hdf5_base_path: Destination path in HDF5 structure, will be created if not existent.
+        :param run: run number, i.e. index along the run axis
+        :param \*\*kwargs: Optional arguments passed to create_dataset
+        '''
+
+        self._log.debug('Writing run %d to %s', run, hdf5_file)
+
+        if not isinstance(object_dict, dict):
+            raise TypeError('objectdict is not a dictionary')
+
+        import h5py  # pylint: disable=import-outside-toplevel
         with h5py.File(hdf5_file, mode='a') as f_hdf5:
+            self._write_hdf5_run(f_hdf5, object_dict, hdf5_base_path, run, **kwargs)
+
+    def session(self, hdf5_file: str, maxsize: int = 4, **kwargs) -> 'HDF5WriterSession':
+        r'''
+        Open a writer session which keeps `hdf5_file` open and writes objects on a background thread
+        (see `HDF5WriterSession`).
+
+        :param hdf5_file: The file name
+        :param maxsize: maximum number of queued objects, i.e. `HDF5WriterSession.write` blocks if exceeded
+        :param \*\*kwargs: Optional arguments passed to create_dataset
+        :return: writer session
+        '''
 
-            # create group if it doesn't exist
-            l_group = f_hdf5[hdf5_base_path] \
-                if hdf5_base_path in f_hdf5 else f_hdf5.create_group(hdf5_base_path)
+        return HDF5WriterSession(self, hdf5_file, maxsize, **kwargs)
 
-            # add datasets for each element of objectdict,
-            # if they already exist by name, overwrite them
-            for i_path, i_object_value in Writer._flatten_object_dict(object_dict).items():
+    def _write_hdf5_group(self, f_hdf5: h5py.File, object_dict: dict, hdf5_base_path: str, **kwargs):
+        r'''
+        Write an object to a specific path into an open HDF5 file (see `write_hdf5`).
 
-                # remove filters if we have a scalar object, i.e. string, int, float
-                if isinstance(
+        :param f_hdf5: open HDF5 file
+        :param object_dict: Object(s) to be stored in a named dictionary structure
+        :param hdf5_base_path: Destination path in HDF5 structure, will be created if not existent.
+        :param \*\*kwargs: Optional arguments passed to create_dataset
+        '''
+
+        # create group if it doesn't exist
+        l_group = f_hdf5[hdf5_base_path] \
+            if hdf5_base_path in f_hdf5 else f_hdf5.create_group(hdf5_base_path)
+
+        # add datasets for each element of objectdict,
+        # if they already exist by name, overwrite them
+        for i_path, i_object_value in Writer._flatten_object_dict(object_dict).items():
+
+            # remove filters if we have a scalar object, i.e. string, int, float
+            if isinstance(
+                    i_object_value.get('value'),
+                    (str, int, float, numpy.str_, numpy.int_, numpy.float_)):
+                kwargs.pop('compression', None)
+                kwargs.pop('compression_opts', None)
+                kwargs.pop('fletcher32', None)
+                kwargs.pop('chunks', None)
+
+            if i_path in l_group:
+                # remove previous object by i_path id and add the new one
+                self._log.debug('removing previous path %s', i_path)
+                del l_group[i_path]
+
+            if i_object_value.get('value') is not None \
+                    and i_object_value.get('attr') is not None:
+                try:
+                    l_group.create_dataset(
+                        name=i_path,
+                        data=numpy.asarray(i_object_value.get('value'))
+                        if not isinstance(i_object_value.get('value'), (str, numpy.str_))
+                        else str(i_object_value.get('value')),
+                        **kwargs
+                    ).attrs.update(
+                        i_object_value.get('attr')
+                        if isinstance(i_object_value.get('attr'), dict) else {}
+                    )
+                except TypeError as error:
+                    self._log.error(
+                        'error writing %s: %s (%s), error was: %s',
+                        i_path,
                         i_object_value.get('value'),
-                        (str, int, float, numpy.str_, numpy.int_, numpy.float_)):
-                    kwargs.pop('compression', None)
-                    kwargs.pop('compression_opts', None)
-                    kwargs.pop('fletcher32', None)
-                    kwargs.pop('chunks', None)
-
-                if i_path in l_group:
-                    # remove previous object by i_path id and add the new one
-                    self._log.debug('removing previous path %s', i_path)
-                    del l_group[i_path]
-
-                # # If object is a pandas.DataFrame, write it to a separate hdf5 file (f_hdf5 with '_pandas' suffix) to avoid interfering with f_hdf5.
-                # # The DataFrame itself will also be stored in f_hdf5, but converted to a numpy array.
-                # if isinstance(i_object_value.get('value'), pandas.DataFrame):
-                #     i_object_value.get('value').to_hdf(
-                #         f'{Path(hdf5_file).parent}/{Path(hdf5_file).stem}_pandas{Path(hdf5_file).suffix}',
-                #         f'/{hdf5_base_path}/{i_path}',
-                #         complib=kwargs.get('compression') if kwargs.get('compression') in ('zlib', 'lzo', 'bzip2', 'blosc') else 'zlib',
-                #         complevel=kwargs.get('compression_opts'),
-                #         fletcher32=kwargs.get('fletcher32')
-                #     )
-
-                if i_object_value.get('value') is not None \
-                        and i_object_value.get('attr') is not None:
-                    try:
-                        l_group.create_dataset(
-                            name=i_path,
-                            data=numpy.asarray(i_object_value.get('value'))
-                            if not isinstance(i_object_value.get('value'), (str, numpy.str_))
-                            else str(i_object_value.get('value')),
-                            **kwargs
-                        ).attrs.update(
-                            i_object_value.get('attr')
-                            if isinstance(i_object_value.get('attr'), dict) else {}
-                        )
-                    except TypeError as error:
-                        self._log.error(
-                            'error writing %s: %s (%s), error was: %s',
-                            i_path,
-                            i_object_value.get('value'),
-                            type(i_object_value.get('value')),
-                            error
-                        )
-                        raise TypeError(error)
+                        type(i_object_value.get('value')),
+                        error
+                    )
+                    raise TypeError(error)
+
+    def _write_hdf5_run(self, f_hdf5: h5py.File, object_dict: dict, hdf5_base_path: str, run: int, **kwargs):
+        r'''
+        Write the objects of one run into run-axis datasets of an open HDF5 file.
+
+        Each object is written at index `run` of a float dataset of shape (runs, \*object shape), created on first
+        write. All axes are resizable, the run axis grows with the largest run written (in any order) and data axes
+        with the largest object. Cells never written are NaN. Chunks span a few runs and a bounded part of the last
+        axis (i.e. grid cells), so appending a run and reading cells across all runs both touch few chunks.
+
+        :param f_hdf5: open HDF5 file
+        :param object_dict: Object(s) of one run to be stored in a named dictionary structure
+        :param hdf5_base_path: Destination path in HDF5 structure, will be created if not existent.
+        :param run: run number, i.e. index along the run axis
+        :param \*\*kwargs: Optional arguments passed to create_dataset
+        :raises ValueError: if an object's dimensions do not match its existing dataset
+        '''
+
+        l_group = f_hdf5.require_group(hdf5_base_path)
+
+        for i_path, i_object_value in Writer._flatten_object_dict(object_dict).items():
+            if i_object_value.get('value') is None or i_object_value.get('attr') is None:
+                continue
+
+            l_value = numpy.asarray(i_object_value.get('value'), dtype=float)
+            l_shape = (run + 1,) + l_value.shape
+
+            if i_path in l_group:
+                l_dataset = l_group[i_path]
+                if l_dataset.ndim != len(l_shape):
+                    raise ValueError(
+                        f'{i_path} has {l_dataset.ndim - 1} data axes, got object with {l_value.ndim}'
+                    )
+                if any(i_size > i_current for i_size, i_current in zip(l_shape, l_dataset.shape)):
+                    l_dataset.resize(numpy.maximum(l_shape, l_dataset.shape))
+            else:
+                l_dataset = l_group.create_dataset(
+                    name=i_path,
+                    shape=l_shape,
+                    maxshape=(None,) * len(l_shape),
+                    dtype=float,
+                    fillvalue=numpy.nan,
+                    chunks=Writer._run_axis_chunks(l_value.shape),
+                    **kwargs
+                )
+                l_dataset.attrs.update(
+                    i_object_value.get('attr') if isinstance(i_object_value.get('attr'), dict) else {}
+                )
+
+            l_dataset[(run,) + tuple(slice(0, i_size) for i_size in l_value.shape)] = l_value
+
+    # runs per chunk and approximate upper bound of chunk sizes of run-axis datasets
+    _RUN_AXIS_CHUNK_RUNS = 8
+    _RUN_AXIS_CHUNK_BYTES = 2**19
+
+    @staticmethod
+    def _run_axis_chunks(shape: tuple) -> tuple:
+        '''
+        Chunk shape of a run-axis dataset for objects of given shape: a few runs, one element of the first data axis
+        (e.g. a metric) if there are further axes, all elements of middle axes (e.g. vehicles) and as many elements of
+        the last axis (e.g. grid cells) as fit into the chunk size bound.
+
+        :param shape: shape of an object of one run
+        :return: chunk shape
+        '''
+
+        l_shape = tuple(max(int(i_size), 1) for i_size in shape)
+        if not l_shape:
+            return (Writer._RUN_AXIS_CHUNK_RUNS,)
+
+        l_leading = ((1,) if len(l_shape) > 1 else ()) + l_shape[1:-1]
+        l_last = Writer._RUN_AXIS_CHUNK_BYTES // (
+            Writer._RUN_AXIS_CHUNK_RUNS * int(numpy.prod(l_leading, dtype=int)) * numpy.dtype(float).itemsize
+        )
+        return (Writer._RUN_AXIS_CHUNK_RUNS,) + l_leading + (int(numpy.clip(l_last, 1, l_shape[-1])),)
+
+    @staticmethod
+    def stack_hdf5_virtual(sources: typing.Sequence[h5py.Dataset], dest: h5py.Group, name: str,
+                           fillvalue=numpy.nan) -> h5py.Dataset:
+        '''
+        Create a virtual dataset (VDS) stacking given source datasets along a new first axis without copying data,
+        e.g. the datasets of all runs of a metric. Sources of different shapes are padded with `fillvalue`, source
+        files are referenced by absolute path.
+
+        :param sources: source datasets of equal dimensionality and dtype
+        :param dest: destination group, its file must support VDS (i.e. libver v110 or later)
+        :param name: name of virtual dataset
+        :param fillvalue: value of elements not mapped to a source (for float datasets)
+        :return: virtual dataset
+        '''
+
+        l_shape = tuple(numpy.max([i_source.shape for i_source in sources], axis=0)) if sources else ()
+        import h5py  # pylint: disable=import-outside-toplevel
+        l_layout = h5py.VirtualLayout(shape=(len(sources),) + l_shape, dtype=sources[0].dtype if sources else float)
+        for i_index, i_source in enumerate(sources):
+            l_layout[(i_index,) + tuple(slice(0, i_size) for i_size in i_source.shape)] = h5py.VirtualSource(
+                str(Path(i_source.file.filename).resolve()), i_source.name, shape=i_source.shape, dtype=i_source.dtype
+            )
+
+        return dest.create_virtual_dataset(
+            name,
+            l_layout,
+            fillvalue=fillvalue if numpy.issubdtype(l_layout.dtype, numpy.floating) else None
+        )
+
+    @staticmethod
+    def link_hdf5_virtual(source: typing.Union[h5py.Group, h5py.Dataset], dest: h5py.Group, name: str):
+        '''
+        Mirror a group (recursively) or dataset into `dest/name` with virtual datasets mapping onto the source file,
+        i.e. a metadata-only copy. Attributes are copied. Scalar and variable-length datasets can't be mapped and
+        are copied physically (they are small).
+
+        :param source: source group or dataset
+        :param dest: destination group, its file must support VDS (i.e. libver v110 or later)
+        :param name: destination name
+        '''
+
+        import h5py  # pylint: disable=import-outside-toplevel
+        if isinstance(source, h5py.Group):
+            l_group = dest.require_group(name)
+            l_group.attrs.update(source.attrs)
+            for i_name, i_item in source.items():
+                Writer.link_hdf5_virtual(i_item, l_group, i_name)
+            return
+
+        if name in dest:
+            del dest[name]
+
+        if source.shape == () or source.dtype.kind == 'O' or h5py.check_vlen_dtype(source.dtype) is not None:
+            source.file.copy(source=source, dest=dest, name=name)
+            return
+
+        l_layout = h5py.VirtualLayout(shape=source.shape, dtype=source.dtype)
+        l_layout[...] = h5py.VirtualSource(
+            str(Path(source.file.filename).resolve()), source.name, shape=source.shape, dtype=source.dtype
+        )
+        dest.create_virtual_dataset(name, l_layout).attrs.update(source.attrs)
+
+    @staticmethod
+    def materialize_hdf5_virtual(group: h5py.Group, **kwargs) -> int:
+        r'''
+        Replace all virtual datasets below a group by physical copies of their data, e.g. before shipping a file
+        built by `stack_hdf5_virtual` or `link_hdf5_virtual` without its source files.
+        Data is copied chunk by chunk into a chunked dataset of the same shape and dtype, i.e. without reading a
+        whole virtual dataset into memory.
+
+        :note: HDF5 re-opens the source files of virtual datasets with the intent of the group's file, i.e. call this
+          after closing the inputs, which must not be open read-only in this process at the same time.
+
+        :param group: group
+        :param \*\*kwargs: Optional arguments passed to create_dataset, e.g. compression
+        :return: number of materialized datasets
+        '''
+
+        import h5py  # pylint: disable=import-outside-toplevel
+        l_virtual = []
+        group.visititems(
+            lambda _, item: l_virtual.append(item.name)
+            if isinstance(item, h5py.Dataset) and item.is_virtual else None
+        )
+
+        for i_path in l_virtual:
+            l_source = group.file[i_path]
+            l_target = group.file.create_dataset(
+                f'{i_path}.materialized',
+                shape=l_source.shape,
+                dtype=l_source.dtype,
+                fillvalue=l_source.fillvalue,
+                **dict({'chunks': True} if l_source.ndim and l_source.size else {}, **kwargs)
+            )
+            if l_target.chunks is None:
+                l_target[()] = l_source[()]
+            else:
+                for i_chunk in l_target.iter_chunks():
+                    l_target[i_chunk] = l_source[i_chunk]
+            l_target.attrs.update(l_source.attrs)
+            del group.file[i_path]
+            group.file.move(l_target.name, i_path)
+
+        return len(l_virtual)
 
     @staticmethod
     def _flatten_object_dict(dictionary: dict) -> dict:
@@ -211,3 +460,133 @@ class Writer(object):
                 else:
                     yield i_k, i_v
         return dict(items())
+
+
+class HDF5WriterSession(object):
+    '''
+    Writer session keeping one HDF5 file open, e.g. for all runs of a sweep.
+
+    Objects passed to `write` are put into a bounded queue and written by a dedicated thread, which owns the file,
+    so callers (i.e. the next simulation run) continue while the previous results are compressed and written.
+    The file is flushed after each object. Closing the session, by `close` or leaving its context, drains the queue
+    before the file is closed. While the session is open in the main thread, SIGTERM raises `SystemExit`, so the
+    context is left and pending results get written as on SIGINT (`KeyboardInterrupt`).
+    '''
+
+    _STOP = object()
+
+    def __init__(self, writer: Writer, hdf5_file: str, maxsize: int = 4, **kwargs):
+        r'''
+        Initialisation, opens the file and starts the writer thread.
+
+        :param writer: writer providing logging and the HDF5 layout
+        :param hdf5_file: The file name
+        :param maxsize: maximum number of queued objects
+        :param \*\*kwargs: Optional arguments passed to create_dataset
+        '''
+
+        self._writer = writer
+        self._hdf5_file = hdf5_file
+        self._kwargs = kwargs
+        self._queue = queue.Queue(maxsize=max(int(maxsize), 1))
+        self._error = None
+        self._closed = False
+
+        # open file in the calling thread to fail early, it is only used by the writer thread afterwards
+        import h5py  # pylint: disable=import-outside-toplevel
+        self._hdf5 = h5py.File(hdf5_file, mode='a')
+
+        self._previous_sigterm = None
+        if threading.current_thread() is threading.main_thread():
+            self._previous_sigterm = signal.signal(signal.SIGTERM, HDF5WriterSession._raise_exit)
+        self._thread = threading.Thread(target=self._run, name=f'HDF5WriterSession({hdf5_file})', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'HDF5WriterSession':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _raise_exit(signum, _frame):
+        '''Signal handler translating SIGTERM into `SystemExit`.'''
+        raise SystemExit(128 + signum)
+
+    def write(self, object_dict: dict, hdf5_base_path: str, run: typing.Optional[int] = None,
+              written: typing.Optional[typing.Callable[[float], None]] = None):
+        '''
+        Queue an object to be written to a specific path (see `Writer.write_hdf5`), or into run-axis datasets if a
+        run is given (see `Writer.write_hdf5_run`). Blocks while the queue is full.
+
+        :param object_dict: Object(s) to be stored in a named dictionary structure
+        :param hdf5_base_path: Destination path in HDF5 structure, will be created if not existent.
+        :param run: (optional) run number, i.e. index along the run axis
+        :param written: (optional) called by the writer thread with the seconds spent writing and flushing the object,
+            once it is written
+        :raises TypeError: if object_dict is not a dictionary
+        :raises RuntimeError: if the session is closed or the writer thread failed
+        '''
+
+        if not isinstance(object_dict, dict):
+            raise TypeError('objectdict is not a dictionary')
+        if self._closed:
+            raise RuntimeError(f'writer session of {self._hdf5_file} is closed')
+        self._raise_error()
+
+        self._queue.put((object_dict, hdf5_base_path, run, written))
+
+    def close(self):
+        '''
+        Write pending objects, stop writer thread and close file.
+
+        :raises RuntimeError: if the writer thread failed
+        '''
+
+        if not self._closed:
+            self._closed = True
+            self._queue.put(HDF5WriterSession._STOP)
+            self._thread.join()
+            self._hdf5.close()
+            if self._previous_sigterm is not None:
+                signal.signal(signal.SIGTERM, self._previous_sigterm)
+
+        self._raise_error()
+
+    def _raise_error(self):
+        '''
+        Re-raise an error of the writer thread in the calling thread.
+
+        :raises RuntimeError: if the writer thread failed
+        '''
+        if self._error is not None:
+            raise RuntimeError(f'writing {self._hdf5_file} failed: {self._error}') from self._error
+
+    def _run(self):
+        '''Writer thread: write queued objects until the session gets closed.'''
+
+        while True:
+            l_item = self._queue.get()
+            if l_item is HDF5WriterSession._STOP:
+                return
+            if self._error is not None:
+                # drop remaining objects after a failure, it is reported to the caller
+                continue
+
+            l_object_dict, l_hdf5_base_path, l_run, l_written = l_item
+            self._writer._log.debug('Writing %s to %s', l_hdf5_base_path, self._hdf5_file)  # pylint: disable=protected-access
+            l_start = time.perf_counter()
+            try:
+                if l_run is None:
+                    self._writer._write_hdf5_group(  # pylint: disable=protected-access
+                        self._hdf5, l_object_dict, l_hdf5_base_path, **self._kwargs
+                    )
+                else:
+                    self._writer._write_hdf5_run(  # pylint: disable=protected-access
+                        self._hdf5, l_object_dict, l_hdf5_base_path, l_run, **self._kwargs
+                    )
+                self._hdf5.flush()
+                if l_written is not None:
+                    l_written(time.perf_counter() - l_start)
+            except Exception as error:  # pylint: disable=broad-except
+                self._error = error
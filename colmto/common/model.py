@@ -25,11 +25,12 @@
 
 import typing
 import numpy
-import pandas
+if typing.TYPE_CHECKING:
+    import pandas
 
 
 # pylint: disable=no-member
-def unfairness(data: pandas.Series) -> numpy.float64:
+def unfairness(data: 'pandas.Series') -> numpy.float64:
     r'''
     Calculate the unfairness by means of the H-Spread of Hinges for given data points.
 
@@ -71,10 +72,62 @@ def unfairness(data: pandas.Series) -> numpy.float64:
     :return: Hinge of type numpy.float64
 
     '''
+    import pandas  # pylint: disable=import-outside-toplevel
     assert isinstance(data, pandas.Series)
     return numpy.subtract(*data.quantile([.75, .25])) if not data.empty else numpy.float64(0)
 
 
+def nanquantile(data: numpy.ndarray, quantiles: typing.Sequence[float], axis: int = 0) -> numpy.ndarray:
+    r'''
+    Quantiles along an axis ignoring NaN values, linear interpolated as `numpy.nanquantile` does.
+    All quantiles are taken from one sort along the axis (NaN values sort last), i.e. without the per-element
+    fallback `numpy.nanquantile` uses for arrays containing NaN values.
+
+    :param data: array
+    :param quantiles: quantiles in [0, 1]
+    :param axis: axis to reduce
+    :return: array of shape (quantiles, \*data shape with axis removed), NaN where there is no valid value
+    '''
+
+    l_sorted = numpy.sort(numpy.moveaxis(numpy.asarray(data, dtype=float), axis, 0), axis=0)
+    if l_sorted.shape[0] == 0:
+        return numpy.full((len(quantiles),) + l_sorted.shape[1:], numpy.nan)
+
+    l_count = numpy.count_nonzero(~numpy.isnan(l_sorted), axis=0)
+    l_last = numpy.maximum(l_count - 1, 0)
+
+    l_quantiles = numpy.empty((len(quantiles),) + l_sorted.shape[1:])
+    for i_index, i_quantile in enumerate(quantiles):
+        l_position = i_quantile * l_last
+        l_lower = numpy.floor(l_position).astype(int)
+        l_lower_values = numpy.take_along_axis(l_sorted, l_lower[numpy.newaxis], axis=0)[0]
+        l_upper_values = numpy.take_along_axis(l_sorted, numpy.minimum(l_lower + 1, l_last)[numpy.newaxis], axis=0)[0]
+        l_quantiles[i_index] = l_lower_values + (l_upper_values - l_lower_values) * (l_position - l_lower)
+
+    return numpy.where(l_count == 0, numpy.nan, l_quantiles)
+
+
+def unfairness_array(data: numpy.ndarray, axis: int = 0) -> numpy.ndarray:
+    '''
+    Calculate the unfairness (see `unfairness`) along an axis of an array at once, e.g. for all grid cells
+    (columns) of a vehicles x cells array.
+
+    NaN values are ignored per cell as `pandas.Series.quantile` does, i.e. cells without any valid data are NaN and
+    an empty axis results in 0, like for `unfairness` applied to each cell. The quartiles are linear interpolated
+    between the order statistics of one sort along the axis, with NaN values sorted to the end (see `nanquantile`).
+
+    :param data: array of data elements
+    :param axis: axis to reduce, i.e. the one of the data points of each cell
+    :return: array of hinges with `axis` removed
+    '''
+
+    l_data = numpy.moveaxis(numpy.asarray(data, dtype=float), axis, 0)
+    if l_data.shape[0] == 0:
+        return numpy.zeros(l_data.shape[1:])
+
+    return numpy.subtract(*nanquantile(l_data, (.75, .25)))
+
+
 def dissatisfaction(
         time_loss: float,
         optimal_travel_time: float,
@@ -102,11 +155,13 @@ def dissatisfaction(
     :param optimal_travel_time: optimal travel time
     :return: dissatisfaction ([0,1] normalised)
 
+    :note: Arguments can be arrays (of equal shape or broadcastable) as well to calculate dissatisfactions at once.
+
     '''
 
-    assert time_loss >= 0
-    assert time_loss_threshold >= 0
-    assert optimal_travel_time > 0
+    assert numpy.all(numpy.asarray(time_loss) >= 0)
+    assert numpy.all(numpy.asarray(time_loss_threshold) >= 0)
+    assert numpy.all(numpy.asarray(optimal_travel_time) > 0)
 
     # pylint: disable=no-member
     return numpy.divide(
@@ -115,7 +170,7 @@ def dissatisfaction(
     )
     # pylint: enable=no-member
 
-def inefficiency(data: pandas.Series) -> typing.Union[numpy.int64, numpy.float64]:  # pylint: disable=no-member
+def inefficiency(data: 'pandas.Series') -> typing.Union[numpy.int64, numpy.float64]:  # pylint: disable=no-member
     '''
     Inefficiency model, i.e. sum of data
 
@@ -123,5 +178,18 @@ def inefficiency(data: pandas.Series) -> typing.Union[numpy.int64, numpy.float64
     :return: sum of data points
     '''
 
+    import pandas  # pylint: disable=import-outside-toplevel
     assert isinstance(data, pandas.Series)
     return data.sum()
+
+
+def inefficiency_array(data: numpy.ndarray, axis: int = 0) -> numpy.ndarray:
+    '''
+    Inefficiency model (see `inefficiency`) along an axis of an array at once, i.e. NaN-ignoring sums.
+
+    :param data: array of data elements
+    :param axis: axis to reduce
+    :return: array of sums with `axis` removed
+    '''
+
+    return numpy.nansum(numpy.asarray(data, dtype=float), axis=axis)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# @package colmto.common.profiling
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''Profiling of selected simulation runs, i.e. of a few runs of a sweep instead of all of them.'''
+
+import collections
+import cProfile
+import math
+import os
+from pathlib import Path
+import sys
+import threading
+import typing
+
+
+def selected(run: int, runs: typing.Iterable[int] = (), ratio: float = 0.) -> bool:
+    '''
+    Check whether to profile a run, either listed explicitly or as one of an evenly spaced fraction of runs, e.g.
+    ratio 0.01 selects runs 0, 100, 200, etc. Selection does not draw random numbers, i.e. profiled runs are the same
+    as without profiling.
+
+    :param run: run number
+    :param runs: run numbers to profile
+    :param ratio: fraction of runs to profile
+    :return: True if run is to be profiled
+    '''
+
+    return run in runs or (ratio > 0 and math.floor(run * ratio) > math.floor((run - 1) * ratio))
+
+
+class RunProfiler(object):
+    '''
+    Context manager profiling the calling thread with cProfile and, at the same time, sampling its stack in a
+    background thread at a fixed interval. On exit it writes `<prefix>.prof` (see `pstats`, e.g. for snakeviz) and
+    `<prefix>.collapsed`, i.e. one `frame;frame;frame count` line per sampled stack (see flamegraph.pl or speedscope).
+    '''
+
+    def __init__(self, prefix: Path, interval: float = 0.001):
+        '''
+        Initialisation.
+
+        :param prefix: path of output files without suffix
+        :param interval: sampling interval in seconds
+        '''
+
+        self._prefix = Path(prefix)
+        self._interval = interval
+        self._profile = cProfile.Profile()
+        self._stacks = collections.Counter()  # type: typing.Counter[str]
+        self._stop = threading.Event()
+        self._thread_id = None  # type: typing.Optional[int]
+        self._sampler = None  # type: typing.Optional[threading.Thread]
+
+    @property
+    def files(self) -> typing.Tuple[Path, Path]:
+        '''
+        :return: paths of profile and collapsed stacks
+        '''
+        return self._prefix.with_name(f'{self._prefix.name}.prof'), \
+            self._prefix.with_name(f'{self._prefix.name}.collapsed')
+
+    def __enter__(self) -> 'RunProfiler':
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name='colmto-profiler', daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+
+        l_profile_file, l_collapsed_file = self.files
+        l_profile_file.parent.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(str(l_profile_file))
+        with open(l_collapsed_file, mode='w') as f_collapsed:
+            for i_stack, i_count in sorted(self._stacks.items()):
+                f_collapsed.write(f'{i_stack} {i_count}\n')
+
+    def _sample(self):
+        '''Sample the stack of the profiled thread until stopped.'''
+
+        while not self._stop.wait(self._interval):
+            l_frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            l_stack = []
+            while l_frame is not None:
+                l_stack.append(
+                    f'{l_frame.f_code.co_name} '
+                    f'({os.path.basename(l_frame.f_code.co_filename)}:{l_frame.f_code.co_firstlineno})'
+                )
+                l_frame = l_frame.f_back
+            if l_stack:
+                self._stacks[';'.join(reversed(l_stack))] += 1
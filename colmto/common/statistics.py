@@ -23,8 +23,9 @@
 # @endcond
 '''Statistics module'''
 
+import bisect
 import typing
-import pandas
+import zlib
 import numpy
 
 import colmto.common.io
@@ -33,9 +34,421 @@ import colmto.common.model
 
 from colmto.common.helper import VehicleType, Metric
 from colmto.common.helper import StatisticSeries
-from colmto.environment.vehicle import SUMOVehicle
+if typing.TYPE_CHECKING:
+    from colmto.environment.vehicle import SUMOVehicle  # pylint: disable=cyclic-import
 
 
+class SlidingWindow(object):
+    '''
+    Fixed-length sliding window over one or more float fields, e.g. occupancy or the
+    (minimum, median, mean, maximum) fields of a StatisticValue.
+
+    Values are kept in a NumPy ring buffer. For each field an ordered list of its non-NaN values is kept up to date
+    as values enter and leave the window, so NaN counts and medians are available without rescanning the window.
+    Locating values in the ordered lists is O(log w), inserting and removing them shifts the lists, i.e. O(w) per append,
+    albeit as a single memmove, which is cheap for window lengths of up to a few thousand time steps.
+    The median lookup itself is O(1).
+    '''
+
+    def __init__(self, length: int, fields: int = 1):
+        '''
+        Initialisation: Window starts filled with NaN values.
+
+        :param length: number of values the window holds per field
+        :param fields: number of fields per value
+        '''
+
+        if length < 1:
+            raise ValueError(f'Window length must be positive, got {length}.')
+
+        self._buffer = numpy.full((length, fields), numpy.nan)
+        self._position = 0
+        self._ordered = tuple([] for _ in range(fields))
+
+    def __len__(self) -> int:
+        '''
+        :return: window length
+        '''
+        return self._buffer.shape[0]
+
+    def __array__(self, dtype=None) -> numpy.ndarray:
+        '''
+        :return: window contents ordered from oldest to newest, shape (length, fields)
+        '''
+        return numpy.roll(self._buffer, -self._position, axis=0).astype(dtype or self._buffer.dtype)
+
+    @property
+    def fields(self) -> int:
+        '''
+        :return: number of fields per value
+        '''
+        return self._buffer.shape[1]
+
+    def append(self, value: typing.Union[float, typing.Iterable[float], None]) -> 'SlidingWindow':
+        '''
+        Append value to window, replacing the oldest one. None is treated as NaN.
+
+        :param value: scalar for single-field windows, or iterable with one value per field
+        :return: future self
+        '''
+
+        l_value = numpy.array(numpy.nan if value is None else value, dtype=float).reshape(-1)
+
+        if l_value.size != self.fields:
+            raise ValueError(f'Expected {self.fields} field(s), got {l_value.size}.')
+
+        for i_field, (i_old, i_new) in enumerate(zip(self._buffer[self._position], l_value)):
+            if i_old == i_old:  # not NaN
+                del self._ordered[i_field][bisect.bisect_left(self._ordered[i_field], i_old)]
+            if i_new == i_new:
+                bisect.insort(self._ordered[i_field], float(i_new))
+
+        self._buffer[self._position] = l_value
+        self._position = (self._position + 1) % len(self)
+
+        return self
+
+    def nan_count(self) -> numpy.ndarray:
+        '''
+        :return: number of NaN values per field
+        '''
+        return numpy.array([len(self) - len(i_ordered) for i_ordered in self._ordered])
+
+    def nanmedian(self) -> numpy.ndarray:
+        '''
+        Median per field, ignoring NaN values (same as `numpy.nanmedian(window, axis=0)`).
+        Fields only containing NaN values yield NaN.
+
+        :return: medians per field
+        '''
+
+        return numpy.array([
+            (i_ordered[(len(i_ordered) - 1) // 2] + i_ordered[len(i_ordered) // 2]) / 2
+            if i_ordered else numpy.nan
+            for i_ordered in self._ordered
+        ])
+
+
+def interpolate_nan(values: numpy.ndarray) -> numpy.ndarray:
+    '''
+    Linear interpolate NaN gaps along the last axis of an array of any shape, e.g. (vehicles, metrics, grid cells),
+    at once. Same as `pandas.Series.interpolate()` for each 1-D slice: Leading NaN values stay NaN, trailing ones
+    take the last valid value.
+
+    :param values: array
+    :return: new array with NaN values interpolated
+    '''
+
+    l_values = numpy.asarray(values, dtype=float)
+    l_cells = numpy.arange(l_values.shape[-1])
+    l_valid = ~numpy.isnan(l_values)
+
+    # index of previous and next valid cell (including the cell itself) for each cell
+    l_previous = numpy.maximum.accumulate(numpy.where(l_valid, l_cells, -1), axis=-1)
+    l_next = numpy.flip(
+        numpy.minimum.accumulate(
+            numpy.flip(numpy.where(l_valid, l_cells, l_values.shape[-1]), axis=-1), axis=-1
+        ),
+        axis=-1
+    )
+
+    # values at previous/next valid cell, trailing cells (without next valid cell) take the previous value
+    l_has_next = l_next < l_values.shape[-1]
+    l_next = numpy.where(l_has_next, l_next, l_previous)
+    l_previous_values = numpy.take_along_axis(l_values, numpy.maximum(l_previous, 0), axis=-1)
+    l_next_values = numpy.take_along_axis(l_values, numpy.maximum(l_next, 0), axis=-1)
+
+    # interpolate as numpy.interp does, i.e. slope * (x - x_previous) + y_previous
+    l_gaps = l_next - l_previous
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        l_interpolated = (l_next_values - l_previous_values) / numpy.where(l_gaps > 0, l_gaps, 1) \
+                         * (l_cells - l_previous) + l_previous_values
+
+    return numpy.where(
+        l_valid,
+        l_values,
+        numpy.where(l_previous < 0, numpy.nan, numpy.where(l_gaps > 0, l_interpolated, l_previous_values))
+    )
+
+
+class QuantileSketch(object):
+    r'''
+    Mergeable streaming quantile sketch (KLL style) for each of a fixed number of cells, e.g. the grid cells of a
+    (vehicle type, metric), to approximate quantiles across many runs without keeping their values.
+
+    Each level :math:`h` holds values of weight :math:`2^h` as a (cells x items) array, NaN padded. Values enter
+    level 0. If a cell of a level exceeds the level's capacity, its sorted values are compacted, i.e. every
+    other value (random offset) moves to the next level with twice the weight. Capacities decrease geometrically
+    (factor 2/3) from the top level's `k` downwards, so a sketch keeps O(k) values per cell. Sketches of equal
+    cells can be merged level by level, e.g. the ones of different workers or files.
+
+    `epsilon` bounds the rank error of quantile estimates, i.e. the estimate of quantile :math:`q` has a rank in
+    :math:`[q - \epsilon, q + \epsilon]` with high probability, by choosing :math:`k = \lceil 4 / \epsilon \rceil`.
+    '''
+
+    def __init__(self, cells: int, epsilon: float = 0.01, seed: typing.Optional[int] = None):
+        '''
+        Initialisation.
+
+        :param cells: number of cells
+        :param epsilon: rank error bound in (0, 1)
+        :param seed: seed of PRNG choosing compaction offsets
+        '''
+
+        if not 0. < epsilon < 1.:
+            raise ValueError(f'epsilon must be in (0, 1), got {epsilon}.')
+
+        self._cells = int(cells)
+        self._epsilon = float(epsilon)
+        self._k = int(numpy.ceil(4. / epsilon))
+        self._levels = []  # type: typing.List[numpy.ndarray]
+        self._prng = numpy.random.RandomState(seed)
+
+    @property
+    def cells(self) -> int:
+        '''
+        :return: number of cells
+        '''
+        return self._cells
+
+    @property
+    def epsilon(self) -> float:
+        '''
+        :return: rank error bound
+        '''
+        return self._epsilon
+
+    @property
+    def levels(self) -> typing.Tuple[numpy.ndarray, ...]:
+        '''
+        :return: values of each level as (cells x items) arrays, NaN padded
+        '''
+        return tuple(self._levels)
+
+    def count(self) -> numpy.ndarray:
+        '''
+        :return: number of (non-NaN) values folded into each cell
+        '''
+        return numpy.sum(
+            [numpy.count_nonzero(~numpy.isnan(i_level), axis=1) * 2**i_height for i_height, i_level in enumerate(self._levels)],
+            axis=0
+        ) if self._levels else numpy.zeros(self._cells, dtype=int)
+
+    def update(self, values: numpy.ndarray) -> 'QuantileSketch':
+        '''
+        Fold values into sketch, NaN values are ignored.
+
+        :param values: array of shape (items, cells), e.g. vehicles x cells of one run, or (cells,)
+        :return: future self
+        '''
+
+        l_values = numpy.asarray(values, dtype=float).reshape(-1, self._cells)
+        self._append(0, l_values.T)
+        self._compact()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        '''
+        Merge values of another sketch of same cells into this one.
+
+        :param other: sketch
+        :return: future self
+        '''
+
+        if other.cells != self._cells:
+            raise ValueError(f'Cannot merge sketch of {other.cells} cells into one of {self._cells} cells.')
+
+        for i_height, i_level in enumerate(other.levels):
+            self._append(i_height, i_level)
+        self._compact()
+        return self
+
+    def quantiles(self, quantiles: typing.Sequence[float]) -> numpy.ndarray:
+        '''
+        Estimate quantiles for each cell, i.e. the smallest value whose weighted rank reaches the quantile.
+
+        :param quantiles: quantiles in [0, 1]
+        :return: array of shape (quantiles, cells), NaN for cells without values
+        '''
+
+        if not self._levels:
+            return numpy.full((len(quantiles), self._cells), numpy.nan)
+
+        l_values = numpy.concatenate(self._levels, axis=1)
+        l_weights = numpy.concatenate(
+            [numpy.full(i_level.shape, 2.**i_height) for i_height, i_level in enumerate(self._levels)], axis=1
+        )
+        l_weights[numpy.isnan(l_values)] = 0.
+
+        l_order = numpy.argsort(l_values, axis=1)
+        l_values = numpy.take_along_axis(l_values, l_order, axis=1)
+        l_ranks = numpy.cumsum(numpy.take_along_axis(l_weights, l_order, axis=1), axis=1)
+
+        l_quantiles = numpy.empty((len(quantiles), self._cells))
+        for i_index, i_quantile in enumerate(quantiles):
+            l_first = numpy.argmax(l_ranks >= i_quantile * l_ranks[:, -1:], axis=1)
+            l_quantiles[i_index] = l_values[numpy.arange(self._cells), l_first]
+
+        return numpy.where(l_ranks[:, -1] > 0, l_quantiles, numpy.nan)
+
+    def median(self) -> numpy.ndarray:
+        '''
+        :return: estimated median of each cell
+        '''
+        return self.quantiles((.5,))[0]
+
+    def h_spread(self) -> numpy.ndarray:
+        '''
+        Estimated H-spread (interquartile range) of each cell, i.e. the unfairness if fed with relative time losses
+        (see `colmto.common.model.unfairness`).
+
+        :return: H-spread of each cell
+        '''
+        return numpy.subtract(*self.quantiles((.75, .25)))
+
+    def state(self) -> typing.Dict[str, dict]:
+        '''
+        Sketch state in a named dictionary structure suitable for writing to hdf5 (see `from_state`).
+        Empty levels are written as one NaN column.
+
+        :return: dictionary of levels
+        '''
+
+        return {
+            f'level_{i_height}': {
+                'value': i_level if i_level.shape[1] else numpy.full((self._cells, 1), numpy.nan),
+                'attr': {
+                    'description': f'values of weight {2**i_height} for each cell of a quantile sketch',
+                    'epsilon': self._epsilon,
+                    'level': i_height
+                }
+            } for i_height, i_level in enumerate(self._levels)
+        }
+
+    @staticmethod
+    def from_state(levels: typing.Sequence[numpy.ndarray], epsilon: float,
+                   seed: typing.Optional[int] = None) -> 'QuantileSketch':
+        '''
+        Restore a sketch from its levels, e.g. read from an hdf5 file written with `state`.
+
+        :param levels: values of each level as (cells x items) arrays
+        :param epsilon: rank error bound of sketch
+        :param seed: seed of PRNG choosing compaction offsets
+        :return: sketch
+        '''
+
+        l_sketch = QuantileSketch(numpy.shape(levels[0])[0] if len(levels) else 0, epsilon, seed)
+        for i_height, i_level in enumerate(levels):
+            l_sketch._append(i_height, numpy.asarray(i_level, dtype=float))  # pylint: disable=protected-access
+        l_sketch._compact()  # pylint: disable=protected-access
+        return l_sketch
+
+    def _capacity(self, height: int) -> int:
+        '''
+        :param height: level
+        :return: capacity of level, decreasing by 2/3 per level below the top one
+        '''
+        return max(2, int(numpy.ceil(self._k * (2. / 3.)**(len(self._levels) - 1 - height))))
+
+    def _append(self, height: int, values: numpy.ndarray):
+        '''
+        Append (cells x items) values to a level, packed to the maximum number of non-NaN values of a cell.
+
+        :param height: level
+        :param values: values
+        '''
+
+        while len(self._levels) <= height:
+            self._levels.append(numpy.empty((self._cells, 0)))
+
+        l_level = numpy.sort(numpy.concatenate((self._levels[height], values), axis=1), axis=1)
+        self._levels[height] = l_level[:, :numpy.count_nonzero(~numpy.isnan(l_level), axis=1).max(initial=0)]
+
+    def _compact(self):
+        '''
+        Compact cells of levels exceeding their capacity, bottom-up.
+        '''
+
+        l_height = 0
+        while l_height < len(self._levels):
+            # levels are sorted with NaN values last (see _append)
+            l_level = self._levels[l_height]
+            l_count = numpy.count_nonzero(~numpy.isnan(l_level), axis=1)
+            l_full = l_count > self._capacity(l_height)
+
+            if l_full.any():
+                # every other value of the first 2 * pairs values moves up, an odd one out stays
+                l_pairs = numpy.where(l_full, l_count // 2, 0)
+                l_positions = self._prng.randint(2, size=(self._cells, 1)) + 2 * numpy.arange(l_pairs.max())
+                l_promoted = numpy.take_along_axis(l_level, numpy.minimum(l_positions, l_level.shape[1] - 1), axis=1)
+                l_promoted[numpy.arange(l_pairs.max()) >= l_pairs[:, numpy.newaxis]] = numpy.nan
+
+                l_remaining = l_level.copy()
+                l_remaining[l_full] = numpy.nan
+                l_odd = l_full & (l_count % 2 == 1)
+                l_remaining[l_odd, 0] = l_level[l_odd, l_count[l_odd] - 1]
+
+                self._levels[l_height] = numpy.empty((self._cells, 0))
+                self._append(l_height, l_remaining)
+                self._append(l_height + 1, l_promoted)
+
+            l_height += 1
+
+
+class VehicleSeriesAccumulator(object):
+    '''
+    Accumulator of the interpolated grid-based series of the vehicles of a run, folded in as vehicles finish
+    (e.g. arrive), so their per-vehicle state can be released during the run. Pass it to
+    `Statistics.merge_vehicle_series` instead of the run's vehicles.
+    '''
+
+    def __init__(self):
+        '''Initialisation.'''
+        self._vehicle_ids = []  # type: typing.List[numpy.ndarray]
+        self._vtype_codes = []  # type: typing.List[numpy.ndarray]
+        self._tensors = []  # type: typing.List[numpy.ndarray]
+
+    def __len__(self) -> int:
+        '''
+        :return: number of accumulated vehicles
+        '''
+        return sum(len(i_vehicle_ids) for i_vehicle_ids in self._vehicle_ids)
+
+    def add(self, vehicles: typing.Dict[str, 'SUMOVehicle']) -> 'VehicleSeriesAccumulator':
+        '''
+        Fold finished vehicles into accumulator, i.e. copy their interpolated grid-based series.
+
+        :param vehicles: named dictionary of vehicles
+        :return: future self
+        '''
+
+        if vehicles:
+            self._vehicle_ids.append(numpy.array(list(vehicles.keys())))
+            self._vtype_codes.append(
+                numpy.fromiter(
+                    (i_vehicle.vehicle_type.code for i_vehicle in vehicles.values()), dtype=int, count=len(vehicles)
+                )
+            )
+            self._tensors.append(Statistics.grid_tensor(list(vehicles.values())))
+        return self
+
+    def series(self) -> typing.Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        '''
+        :return: tuple of vehicle ids, vehicle type codes and grid-based series as array of shape
+            (metrics, vehicles, grid cells) (see `Statistics.grid_tensor`), ordered by vehicle id
+        '''
+
+        if not self._vehicle_ids:
+            return numpy.array([], dtype=str), numpy.array([], dtype=int), Statistics.grid_tensor([])
+
+        l_vehicle_ids = numpy.concatenate(self._vehicle_ids)
+        l_order = numpy.argsort(l_vehicle_ids, kind='stable')
+        return (
+            l_vehicle_ids[l_order],
+            numpy.concatenate(self._vtype_codes)[l_order],
+            numpy.concatenate(self._tensors, axis=1)[:, l_order]
+        )
+
 class Statistics(object):
     '''Statistics class for computing/aggregating SUMO results'''
 
@@ -47,62 +460,95 @@ class Statistics(object):
             self._log = colmto.common.log.logger(__name__)
             self._writer = colmto.common.io.Writer(None)
 
-    def merge_vehicle_series(self, run: int, vehicles: typing.Dict[str, SUMOVehicle]) -> typing.Dict[str, dict]:
+    def merge_vehicle_series(self, run: int,
+                             vehicles: typing.Union[typing.Dict[str, 'SUMOVehicle'], VehicleSeriesAccumulator]
+                             ) -> typing.Dict[str, dict]:
         '''
         merge vehicle data series into a dictionary structure suitable for writing to hdf5
 
+        The interpolated series of all vehicles are built once as a (metric x vehicle x cell) array (see
+        `grid_tensor`), series of each vehicle type are slices of it taken with a vehicle type mask.
+
         :param run: current run number
-        :param vehicles: named dictionary of vehicles
+        :param vehicles: named dictionary of vehicles or accumulator of their series
         :return: dictionary of metrics for current run
         '''
 
         self._log.debug('Merging vehicle series of run %d', run)
 
+        if isinstance(vehicles, VehicleSeriesAccumulator):
+            l_vehicle_ids, l_vtype_codes, l_tensor = vehicles.series()
+        else:
+            l_vehicle_ids = numpy.array(sorted(vehicles.keys()))
+            l_tensor = self.grid_tensor([vehicles[i_vehicle] for i_vehicle in l_vehicle_ids])
+            l_vtype_codes = numpy.fromiter(
+                (vehicles[i_vehicle].vehicle_type.code for i_vehicle in l_vehicle_ids),
+                dtype=int,
+                count=len(l_vehicle_ids)
+            )
+        l_metric_indices = {
+            i_metric: i_index for i_index, i_metric in enumerate(StatisticSeries.GRID.metrics())
+        }
+
+        import pandas  # pylint: disable=import-outside-toplevel
+
+        def _metric_frames(mask: numpy.ndarray, attr: dict) -> typing.Dict[str, dict]:
+            return {
+                i_metric.value: {
+                    'value': pandas.DataFrame(
+                        l_tensor[l_metric_indices[i_metric]][mask], index=l_vehicle_ids[mask].tolist()
+                    ),
+                    'attr': {**attr, 'metric': i_metric.value}
+                }
+                for i_metric in StatisticSeries.metrics()
+            } if mask.any() else {}
+
         return {
             StatisticSeries.GRID.value: {
-                'all': {
-                    i_metric.value: {
-                        'value': pandas.concat(
-                            (
-                                StatisticSeries.from_vehicle(vehicles[i_vehicle], interpolate=True)
-                                for i_vehicle in sorted(vehicles.keys())
-                            ),
-                            axis=1,
-                            keys=sorted(vehicles.keys())
-                        ).T[i_metric.value],
-                        'attr': {
-                            'description': f'{StatisticSeries.GRID.value}-based data for all vehicle types',
-                            'metric': i_metric.value,
-                        }
-                    }
-                    for i_metric in StatisticSeries.metrics()
-                    if len(vehicles) > 0
-                },
+                'all': _metric_frames(
+                    numpy.ones(len(l_vehicle_ids), dtype=bool),
+                    {'description': f'{StatisticSeries.GRID.value}-based data for all vehicle types'}
+                ),
                 **{
-                    i_vtype.value : {
-                        i_metric.value : {
-                            'value' : pandas.concat(
-                                (
-                                    StatisticSeries.from_vehicle(vehicles[i_vehicle], interpolate=True)
-                                    for i_vehicle in sorted(filter(lambda v, vtype=i_vtype: vehicles[v].vehicle_type == vtype, vehicles.keys()))
-                                ),
-                                axis=1,
-                                keys=sorted(filter(lambda v, vtype=i_vtype: vehicles[v].vehicle_type == vtype, vehicles.keys()))
-                            ).T[i_metric.value],
-                            'attr': {
-                                'description': f'{StatisticSeries.GRID.value}-based data of {i_vtype}s',
-                                'metric': i_metric.value,
-                                'vtype': i_vtype.value,
-                            }
+                    i_vtype.value: _metric_frames(
+                        l_vtype_codes == i_vtype.code,
+                        {
+                            'description': f'{StatisticSeries.GRID.value}-based data of {i_vtype}s',
+                            'vtype': i_vtype.value
                         }
-                        for i_metric in StatisticSeries.metrics()
-                        if len(list(filter(lambda v, vtype=i_vtype: vehicles[v].vehicle_type == vtype, vehicles.keys()))) > 0
-                    }
+                    )
                     for i_vtype in VehicleType
                 }
             }
         }
 
+    @staticmethod
+    def grid_tensor(vehicles: typing.Sequence['SUMOVehicle'], interpolate=True) -> numpy.ndarray:
+        '''
+        Grid-based series of given vehicles as one array of shape (metrics, vehicles, grid cells), metrics ordered as
+        in `StatisticSeries.GRID.metrics()`.
+        Series of vehicles sharing one store are gathered with a single fancy indexing operation.
+
+        :param vehicles: vehicles
+        :param interpolate: linear interpolate NaN values of all series at once (see `interpolate_nan`)
+        :return: array of grid-based series
+        '''
+
+        if not vehicles:
+            return numpy.empty((len(StatisticSeries.GRID.metrics()), 0, 0))
+
+        l_stores = {id(i_vehicle.store): i_vehicle.store for i_vehicle in vehicles}
+        if len(l_stores) == 1:
+            l_series = l_stores.popitem()[1].grid_series(
+                numpy.fromiter((i_vehicle.slot for i_vehicle in vehicles), dtype=int, count=len(vehicles))
+            )
+        else:
+            l_series = numpy.stack([i_vehicle.store.grid_series(i_vehicle.slot) for i_vehicle in vehicles])
+
+        return numpy.ascontiguousarray(
+            numpy.swapaxes(interpolate_nan(l_series) if interpolate else l_series, 0, 1)
+        )
+
     def global_stats(self, merged_series: typing.Dict[str, dict]):
         '''
         Inplace ddd global statistics, i.e. unfairness and inefficiency for each series element.
@@ -117,14 +563,132 @@ class Statistics(object):
             # for the individual vehicle types
             for i_vtype in merged_series.get(i_series):
                 if merged_series.get(i_series).get(i_vtype):
-                    l_stat = merged_series.get(i_series).get(i_vtype).get(Metric.RELATIVE_TIME_LOSS.value).get('value').dropna() # type: pandas.DataFrame
+                    # vehicles x cells, NaN values are ignored per cell
+                    l_stat = numpy.asarray(
+                        merged_series.get(i_series).get(i_vtype).get(Metric.RELATIVE_TIME_LOSS.value).get('value'),
+                        dtype=float
+                    )
                     merged_series.get(i_series).get(i_vtype)['unfairness'] = {
-                        'value': numpy.array([colmto.common.model.unfairness(l_stat[i_column]) for i_column in l_stat]),
+                        'value': colmto.common.model.unfairness_array(l_stat, axis=0),
                         'attr': {'description': f'unfairness for each cell of {i_vtype} vehicles with {Metric.RELATIVE_TIME_LOSS.value} != NaN'}
                     }
                     merged_series.get(i_series).get(i_vtype)['inefficiency'] = {
-                        'value': numpy.array([colmto.common.model.inefficiency(l_stat[i_column]) for i_column in l_stat]),
+                        'value': colmto.common.model.inefficiency_array(l_stat, axis=0),
                         'attr': {'description':f'inefficiency for each cell of {i_vtype} vehicles with {Metric.RELATIVE_TIME_LOSS.value} != NaN'}
                     }
 
         return merged_series
+
+    @staticmethod
+    def update_sketches(sketches: typing.Dict[typing.Tuple[str, str, str], QuantileSketch],
+                        merged_series: typing.Dict[str, dict],
+                        epsilon: float = 0.01,
+                        seed: int = 0) -> typing.Dict[typing.Tuple[str, str, str], QuantileSketch]:
+        '''
+        Inplace fold the grid-based metrics of one run (see `merge_vehicle_series`) into quantile sketches of each
+        (series, vehicle type, metric), i.e. the values of all vehicles of a grid cell over all runs.
+        Created sketches are seeded by `seed` and their (series, vehicle type, metric), so sweeps estimate the same
+        quantiles each time.
+
+        :param sketches: named dictionary of sketches, missing ones are created
+        :param merged_series: data acquired by calling `merge_vehicle_series`
+        :param epsilon: rank error bound of created sketches
+        :param seed: seed of created sketches
+        :return: inplace updated `sketches`
+        '''
+
+        for i_series, i_vtypes in merged_series.items():
+            for i_vtype, i_metrics in i_vtypes.items():
+                for i_metric in StatisticSeries.metrics():
+                    if i_metric.value not in (i_metrics or {}):
+                        continue
+                    l_values = numpy.asarray(i_metrics[i_metric.value].get('value'), dtype=float)
+                    if (i_series, i_vtype, i_metric.value) not in sketches:
+                        sketches[(i_series, i_vtype, i_metric.value)] = QuantileSketch(
+                            l_values.shape[-1],
+                            epsilon,
+                            seed=(seed + zlib.crc32(f'{i_series}/{i_vtype}/{i_metric.value}'.encode())) % 2**32
+                        )
+                    sketches.get((i_series, i_vtype, i_metric.value)).update(l_values)
+
+        return sketches
+
+    @staticmethod
+    def sketch_summaries(sketches: typing.Dict[typing.Tuple[str, str, str], QuantileSketch]) -> typing.Dict[str, dict]:
+        '''
+        Approximate statistics of quantile sketches (see `update_sketches`) in a named dictionary structure suitable
+        for writing to hdf5, i.e. `<vtype>/<series>/<metric>/{quantile_25,median,quantile_75,h_spread}` for each grid
+        cell and the sketch state at `<vtype>/<series>/<metric>/sketch` to merge it with sketches of other files.
+        The H-spread of the relative time loss is the unfairness across runs.
+
+        :param sketches: named dictionary of sketches
+        :return: dictionary of sketch statistics
+        '''
+
+        l_summaries = {}
+        for (i_series, i_vtype, i_metric), i_sketch in sketches.items():
+            l_quartiles = i_sketch.quantiles((.25, .5, .75))
+            l_summaries.setdefault(i_vtype, {}).setdefault(i_series, {})[i_metric] = {
+                **{
+                    i_name: {
+                        'value': i_value,
+                        'attr': {
+                            'description': f'approximate {i_name} of {i_metric} for each cell of {i_vtype} vehicles',
+                            'epsilon': i_sketch.epsilon
+                        }
+                    } for i_name, i_value in (
+                        ('quantile_25', l_quartiles[0]),
+                        ('median', l_quartiles[1]),
+                        ('quantile_75', l_quartiles[2]),
+                        ('h_spread', l_quartiles[2] - l_quartiles[0])
+                    )
+                },
+                'count': {
+                    'value': i_sketch.count(),
+                    'attr': {'description': f'number of {i_metric} values for each cell of {i_vtype} vehicles'}
+                },
+                'sketch': i_sketch.state()
+            }
+
+        return l_summaries
+
+    @staticmethod
+    def stack_series(merged_series: typing.Dict[str, dict]) -> typing.Dict[str, dict]:
+        '''
+        Stack the metrics of each vehicle type of merged series (see `merge_vehicle_series` and `global_stats`) along
+        one axis for writing them into run-axis datasets (see `colmto.common.io.Writer.write_hdf5_run`), i.e.
+
+        * `<vtype>/<series>`: grid-based metrics as array of shape (metrics, vehicles, grid cells) and
+        * `<vtype>/global_stats`: unfairness and inefficiency as array of shape (2, grid cells).
+
+        Metric names and descriptions along the stacked axis are kept in attribute tables `metrics` and
+        `descriptions`.
+
+        :param merged_series: data acquired by calling `merge_vehicle_series` (and `global_stats`)
+        :return: dictionary of stacked series of current run
+        '''
+
+        l_stacked = {}
+        for i_series, i_vtypes in merged_series.items():
+            for i_vtype, i_metrics in i_vtypes.items():
+                if not i_metrics:
+                    continue
+                for i_name, i_keys in (
+                        (i_series, [i_metric.value for i_metric in StatisticSeries.metrics()]),
+                        ('global_stats', ['unfairness', 'inefficiency'])
+                ):
+                    l_keys = [i_key for i_key in i_keys if i_key in i_metrics]
+                    if not l_keys:
+                        continue
+                    l_stacked.setdefault(i_vtype, {})[i_name] = {
+                        'value': numpy.stack(
+                            [numpy.asarray(i_metrics[i_key].get('value'), dtype=float) for i_key in l_keys]
+                        ),
+                        'attr': {
+                            'description': f'{i_name} of {i_vtype} vehicles stacked along axis 1 (after runs)',
+                            'metrics': l_keys,
+                            'descriptions': [i_metrics[i_key].get('attr').get('description') for i_key in l_keys]
+                        }
+                    }
+
+        return l_stacked
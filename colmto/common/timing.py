@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# @package colmto.common.timing
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''Timing of the phases of simulation runs, i.e. where the time of a run is spent.'''
+
+import time
+import typing
+
+import numpy
+
+# phases of a time step of a TraCI run (see Runtime.run_traci)
+STEP_PHASES = ('collect', 'departures', 'subscriptions', 'update', 'observe', 'apply', 'sumo', 'simulation')
+
+# phases of a run after its simulation (see SumoSim)
+RUN_PHASES = ('statistics', 'write')
+
+# edges of histogram bins of per-step times in seconds, 4 log-spaced bins per decade from 1 µs to 10 s
+HISTOGRAM_BIN_EDGES = numpy.logspace(-6, 1, 29)
+
+
+class PhaseTimer(object):
+    '''
+    Low overhead timer of the phases of the time steps of a run based on a monotonic clock.
+
+    Each call of `lap` attributes the time since the previous call to a phase, `step` closes the current time step.
+    Phases occurring once per run, e.g. writing results, are recorded with `add`.
+    '''
+
+    def __init__(self, phases: typing.Sequence[str] = STEP_PHASES):
+        '''
+        Initialisation.
+
+        :param phases: phases of a time step
+        '''
+
+        self._phases = tuple(phases)
+        self._index = {i_phase: i_index for i_index, i_phase in enumerate(self._phases)}
+        self._current = [0] * len(self._phases)
+        self._steps = []  # type: typing.List[typing.Tuple[int, ...]]
+        self._once = {}  # type: typing.Dict[str, int]
+        self._last = time.perf_counter_ns()
+
+    def __bool__(self) -> bool:
+        return True
+
+    @property
+    def phases(self) -> typing.Tuple[str, ...]:
+        '''
+        :return: phases of a time step
+        '''
+        return self._phases
+
+    def lap(self, phase: typing.Optional[str] = None) -> 'PhaseTimer':
+        '''
+        Attribute the time since the previous lap to a phase of the current time step.
+
+        :param phase: phase, None to (re)start timing without attributing the time
+        :return: future self
+        '''
+
+        l_now = time.perf_counter_ns()
+        if phase is not None:
+            self._current[self._index[phase]] += l_now - self._last
+        self._last = l_now
+        return self
+
+    def step(self) -> 'PhaseTimer':
+        '''
+        Close the current time step.
+
+        :return: future self
+        '''
+
+        self._steps.append(tuple(self._current))
+        self._current = [0] * len(self._phases)
+        return self
+
+    def add(self, phase: str, seconds: float) -> 'PhaseTimer':
+        '''
+        Add time of a phase occurring once per run.
+
+        :param phase: phase
+        :param seconds: time spent
+        :return: future self
+        '''
+
+        self._once[phase] = self._once.get(phase, 0) + int(seconds * 1e9)
+        return self
+
+    def summary(self) -> typing.Dict[str, dict]:
+        '''
+        Aggregate times of phases: total, mean, median, 90th/99th percentile and maximum of the per-step times in
+        seconds and their histogram over `HISTOGRAM_BIN_EDGES` (times outside are counted in the first/last bin).
+        Phases occurring once per run only have a total.
+
+        :return: named dictionary of phases
+        '''
+
+        l_times = numpy.array(self._steps, dtype=float).reshape(-1, len(self._phases)) / 1e9
+        l_summary = {}
+
+        for i_phase, i_times in zip(self._phases, l_times.T):
+            l_summary[i_phase] = {
+                'steps': len(i_times),
+                'total': float(numpy.sum(i_times)),
+                'mean': float(numpy.mean(i_times)) if len(i_times) else 0.,
+                'median': float(numpy.median(i_times)) if len(i_times) else 0.,
+                'p90': float(numpy.percentile(i_times, 90)) if len(i_times) else 0.,
+                'p99': float(numpy.percentile(i_times, 99)) if len(i_times) else 0.,
+                'max': float(numpy.max(i_times)) if len(i_times) else 0.,
+                'histogram': numpy.histogram(
+                    numpy.clip(i_times, HISTOGRAM_BIN_EDGES[0], HISTOGRAM_BIN_EDGES[-1]), bins=HISTOGRAM_BIN_EDGES
+                )[0].tolist()
+            }
+
+        for i_phase, i_time in self._once.items():
+            l_summary[i_phase] = {'total': i_time / 1e9}
+
+        return l_summary
+
+    @staticmethod
+    def format_summary(summary: typing.Dict[str, dict]) -> str:
+        '''
+        :param summary: summary of phases (see `summary`)
+        :return: one line of total times of phases and their share of the time of all phases
+        '''
+
+        l_total = sum(i_phase.get('total') for i_phase in summary.values()) or 1.
+        return ', '.join(
+            f'{i_phase} {i_summary.get("total"):.2f} s ({100 * i_summary.get("total") / l_total:.0f}%)'
+            for i_phase, i_summary in summary.items()
+        )
+
+
+class _NullTimer(object):
+    '''Timer doing nothing, i.e. a disabled `PhaseTimer`.'''
+
+    def __bool__(self) -> bool:
+        return False
+
+    def lap(self, phase: typing.Optional[str] = None) -> '_NullTimer':  # pylint: disable=unused-argument
+        '''Do nothing.'''
+        return self
+
+    def step(self) -> '_NullTimer':
+        '''Do nothing.'''
+        return self
+
+    def add(self, phase: str, seconds: float) -> '_NullTimer':  # pylint: disable=unused-argument
+        '''Do nothing.'''
+        return self
+
+
+# disabled timer
+NULL_TIMER = _NullTimer()
@@ -22,8 +22,7 @@
 # #############################################################################
 # @endcond
 '''Visualisation of simulation stuff.'''
-import matplotlib.cm
-import matplotlib.colors
+import functools
 
 import colmto.common.log
 
@@ -559,21 +558,28 @@ _VIRIDIS_DATA = ((0.267004, 0.004874, 0.329415), (0.268510, 0.009605, 0.335427),
                  (0.964894, 0.902323, 0.123941), (0.974417, 0.903590, 0.130215),
                  (0.983868, 0.904867, 0.136897), (0.993248, 0.906157, 0.143936))
 
-_COLORMAP = dict(
-    [
-        (name, matplotlib.colors.ListedColormap(data, name=name)) for (name, data) in
-        (
-            ('magma', _MAGMA_DATA),
-            ('magma_r', tuple(reversed(_MAGMA_DATA))),
-            ('inferno', _INFERNO_DATA),
-            ('inferno_r', tuple(reversed(_INFERNO_DATA))),
-            ('plasma', _PLASMA_DATA),
-            ('plasma_r', tuple(reversed(_PLASMA_DATA))),
-            ('viridis', _VIRIDIS_DATA),
-            ('viridis_r', tuple(reversed(_VIRIDIS_DATA)))
-        )
-    ]
-)
+# colormap name -> colour data, colormaps are created on first use (see `_colormap`)
+_COLORMAP_DATA = {
+    'magma': _MAGMA_DATA,
+    'magma_r': tuple(reversed(_MAGMA_DATA)),
+    'inferno': _INFERNO_DATA,
+    'inferno_r': tuple(reversed(_INFERNO_DATA)),
+    'plasma': _PLASMA_DATA,
+    'plasma_r': tuple(reversed(_PLASMA_DATA)),
+    'viridis': _VIRIDIS_DATA,
+    'viridis_r': tuple(reversed(_VIRIDIS_DATA))
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _colormap(cmap_name):
+    '''
+    :param cmap_name: Colormap name, i.e. a key of `_COLORMAP_DATA`
+    :return: matplotlib.colors.ListedColormap, created once per name
+    '''
+
+    import matplotlib.colors  # pylint: disable=import-outside-toplevel
+    return matplotlib.colors.ListedColormap(_COLORMAP_DATA[cmap_name], name=cmap_name)
 
 
 def cmap_names():
@@ -582,7 +588,7 @@ def cmap_names():
 
     '''
 
-    return list(_COLORMAP.keys())
+    return list(_COLORMAP_DATA.keys())
 
 
 def mapped_cmap(cmap_name, range_max):
@@ -593,7 +599,9 @@ def mapped_cmap(cmap_name, range_max):
 
     '''
 
+    import matplotlib.cm  # pylint: disable=import-outside-toplevel
+    import matplotlib.colors  # pylint: disable=import-outside-toplevel
     return matplotlib.cm.ScalarMappable(
         norm=matplotlib.colors.Normalize(vmin=0, vmax=range_max),
-        cmap=_COLORMAP[cmap_name]
+        cmap=_colormap(cmap_name)
     ).to_rgba
@@ -29,17 +29,73 @@ import typing
 if typing.TYPE_CHECKING:
     import traci
 
-from collections import deque
 from types import MappingProxyType
 import numpy
 import colmto.common.log
 from colmto.common.helper import VehicleType
 from colmto.common.helper import StatisticValue
+from colmto.common.helper import Behaviour
+from colmto.common.statistics import SlidingWindow
 from colmto.cse.rule import BaseRule
 from colmto.cse.rule import SUMORule
 from colmto.environment.vehicle import SUMOVehicle
 
 
+class Observation(object):
+    '''
+    Versioned snapshot of the traffic observed by a CSE at one simulation step.
+
+    Aggregates (e.g. median occupancy) are computed lazily on first access and memoized, i.e. they are computed at
+    most once per step, regardless of the number of rules and vehicles querying them.
+    '''
+
+    __slots__ = ('_version', '_aggregates', '_cache')
+
+    def __init__(self, version: int, **aggregates: typing.Callable[[], typing.Mapping]):
+        '''
+        Initialisation
+
+        :param version: version of snapshot, i.e. number of observed steps
+        :param aggregates: callables computing the aggregates of this snapshot, e.g. `occupancy=cse._median_occupancy`
+
+        '''
+
+        self._version = version
+        self._aggregates = aggregates
+        self._cache = {}
+
+    def __getattr__(self, name: str) -> typing.Mapping:
+        '''
+        Return (memoized) aggregate
+
+        :param name: name of aggregate
+        :return: aggregate
+
+        '''
+
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        try:
+            l_aggregate = self._aggregates[name]
+        except KeyError:
+            raise AttributeError(f'Observation has no aggregate \'{name}\'')
+        self._cache[name] = MappingProxyType(l_aggregate())
+        return self._cache[name]
+
+    @property
+    def version(self) -> int:
+        '''
+        :return: version of snapshot, i.e. number of observed steps
+
+        '''
+
+        return self._version
+
+
 class BaseCSE(object):
     '''Base class for the central optimisation entity (CSE).'''
 
@@ -75,14 +131,19 @@ class SumoCSE(BaseCSE):
     First-come-first-served CSE (basically do nothing and allow all vehicles access to OTL.
     '''
 
-    def __init__(self, args=None):
+    def __init__(self, args=None, observation_window: int = 60):
         '''
         Init
+
+        :param args: argparse configuration
+        :param observation_window: number of time steps (i.e. seconds) to base observed traffic on
         '''
         super().__init__(args)
         self._traci = None
-        self._occupancy_window = {  # record occupancy of previous 60 time steps (i.e. seconds) for both lanes
-            i_lane: deque((float('NaN') for _ in range(60)), maxlen=60)
+        self._cosmetic = True
+        self._commands = {'sent': 0, 'suppressed': 0}
+        self._occupancy_window = {  # record occupancy of previous time steps for both lanes
+            i_lane: SlidingWindow(observation_window)
             for i_lane in ('21edge_0', '21edge_1')
         }
         if self._args is not None and self._args.writefulloccupancies:
@@ -91,22 +152,61 @@ class SumoCSE(BaseCSE):
                 for i_lane in ('21edge_0', '21edge_1')
             }
         self._dissatisfaction = {
-            i_vtype: deque((StatisticValue.nanof(None) for _ in range(60)), maxlen=60)
+            i_vtype: SlidingWindow(observation_window, fields=len(StatisticValue._fields))
             for i_vtype in VehicleType
         }
+        self._observation = self._snapshot(0)
+
+    def _snapshot(self, version: int) -> Observation:
+        '''
+        Create observation snapshot of current windows.
+
+        :param version: version of snapshot
+        :return: observation
 
+        '''
+
+        return Observation(
+            version,
+            occupancy=self._median_occupancy,
+            dissatisfaction=self._median_dissatisfaction
+        )
+
+    @property
+    def observation(self) -> Observation:
+        '''
+        :return: observation snapshot of current step
 
-    def traci(self, _traci: 'traci') -> SumoCSE:
+        '''
+
+        return self._observation
+
+    def traci(self, _traci: 'traci', cosmetic: bool = True) -> SumoCSE:
         '''
         Set TraCI reference
 
+        :param _traci: TraCI reference
+        :param cosmetic: send cosmetic commands (e.g. colours) to vehicles, i.e. only useful if running with GUI
         :return: self
 
         '''
 
         self._traci = _traci
+        self._cosmetic = bool(cosmetic)
         return self
 
+    @property
+    def commands(self) -> typing.Mapping[str, int]:
+        '''
+        Number of TraCI commands sent to vehicles and of commands suppressed, as vehicles are only actuated on
+        transitions between allowed and denied OTL access (and cosmetic commands are dropped if running headless).
+
+        :return: dictionary with keys 'sent' and 'suppressed'
+
+        '''
+
+        return MappingProxyType(self._commands)
+
     def observe_traffic(self,
                         lane_subscription_results: typing.Dict[str, typing.Dict[int, float]],
                         vehicle_subscription_results: typing.Dict[str, typing.Dict[int, float]],
@@ -132,20 +232,22 @@ class SumoCSE(BaseCSE):
             if not i_key in self._occupancy_window:
                 raise KeyError(
                     f'Unexpected key (\'{i_key}\') of subcription results. Expected one of {list(self._occupancy_window.keys())}.')
-            self._occupancy_window.get(i_key).appendleft(i_value.get(self._traci.constants.LAST_STEP_OCCUPANCY))
-        if self._args is not None and self._args.writefulloccupancies:
-            self._occupancy_full.get(i_key).append(i_value.get(self._traci.constants.LAST_STEP_OCCUPANCY))
+            self._occupancy_window.get(i_key).append(i_value.get(self._traci.constants.LAST_STEP_OCCUPANCY))
+            if self._args is not None and self._args.writefulloccupancies:
+                self._occupancy_full.get(i_key).append(i_value.get(self._traci.constants.LAST_STEP_OCCUPANCY))
 
         # record dissatisfaction
-        l_dissatisfaction = {
-            i_vtype: []
-            for i_vtype in VehicleType
-        }
-        for i_vehicle_id in vehicle_subscription_results:
-            l_vehicle = vehicles.get(i_vehicle_id)
-            l_dissatisfaction.get(l_vehicle.vehicle_type).append(l_vehicle.dissatisfaction)
-        for i_vtype, i_values in l_dissatisfaction.items():
-            self._dissatisfaction.get(i_vtype).appendleft(StatisticValue.nanof(i_values))
+        l_vehicles = self.vehicle_columns(
+            tuple(vehicles.get(i_vehicle_id) for i_vehicle_id in vehicle_subscription_results)
+        )
+        for i_vtype in VehicleType:
+            self._dissatisfaction.get(i_vtype).append(
+                StatisticValue.nanof(
+                    l_vehicles.get('dissatisfaction')[l_vehicles.get('vehicle_type') == i_vtype.code].tolist()
+                )
+            )
+
+        self._observation = self._snapshot(self._observation.version + 1)
 
         return self
 
@@ -167,6 +269,7 @@ class SumoCSE(BaseCSE):
         '''
         Calculate median (ignoring NaN values) occupancy for all lanes.
         Result can be NaN, iff observation window (self._occupancy_window) only contains NaN values.
+        Medians are maintained incrementally by the windows, i.e. cost does not depend on the window length.
 
         Example:
 
@@ -178,11 +281,7 @@ class SumoCSE(BaseCSE):
         '''
 
         return {
-            i_lane: float(
-                numpy.nanmedian(list(self._occupancy_window.get(i_lane)))
-                if not numpy.isnan(list(self._occupancy_window.get(i_lane))).all()
-                else 'nan'
-            )
+            i_lane: float(self._occupancy_window.get(i_lane).nanmedian()[0])
             for i_lane in self._occupancy_window
         }
 
@@ -200,8 +299,7 @@ class SumoCSE(BaseCSE):
         '''
 
         return {
-            i_vtype: StatisticValue(*numpy.nanmedian(self._dissatisfaction.get(i_vtype), axis=0))
-            if not numpy.isnan(list(self._dissatisfaction.get(i_vtype))).all() else StatisticValue.nanof([])
+            i_vtype: StatisticValue(*(float(i_median) for i_median in self._dissatisfaction.get(i_vtype).nanmedian()))
             for i_vtype in self._dissatisfaction
         }
 
@@ -265,9 +363,52 @@ class SumoCSE(BaseCSE):
 
         return self
 
+    @staticmethod
+    def vehicle_columns(vehicles: typing.Sequence[SUMOVehicle]) -> typing.Dict[str, numpy.ndarray]:
+        '''
+        Gather the vehicle attributes rules are evaluated on into columns (see `SUMORule.applies_to_vehicles`).
+        Columns are taken directly from the vehicles' `VehicleStore` if they share one.
+
+        :param vehicles: sequence of vehicles
+        :return: dictionary of column name -> array with one entry per vehicle, and 'vehicles' -> the vehicles
+        '''
+
+        l_store = vehicles[0].store if vehicles else None
+        if l_store is not None and all(i_vehicle.store is l_store for i_vehicle in vehicles):
+            l_columns = l_store.columns(
+                numpy.fromiter((i_vehicle.slot for i_vehicle in vehicles), dtype=int, count=len(vehicles)),
+                ('position_x', 'position_y', 'speed_max', 'vehicle_type', 'dissatisfaction')
+            )
+        else:
+            l_columns = {
+                'position_x': numpy.fromiter((i_vehicle.position.x for i_vehicle in vehicles), dtype=float, count=len(vehicles)),
+                'position_y': numpy.fromiter((i_vehicle.position.y for i_vehicle in vehicles), dtype=float, count=len(vehicles)),
+                'speed_max': numpy.fromiter((i_vehicle.speed_max for i_vehicle in vehicles), dtype=float, count=len(vehicles)),
+                'vehicle_type': numpy.fromiter((i_vehicle.vehicle_type.code for i_vehicle in vehicles), dtype=int, count=len(vehicles)),
+                'dissatisfaction': numpy.fromiter((i_vehicle.dissatisfaction for i_vehicle in vehicles), dtype=float, count=len(vehicles))
+            }
+
+        # for rules evaluated per vehicle, i.e. without a vectorised `applies_to_vehicles`
+        l_columns['vehicles'] = vehicles
+        return l_columns
+
+    def deny_mask(self, vehicles: typing.Mapping[str, numpy.ndarray]) -> numpy.ndarray:
+        '''
+        Evaluate all rules at once on vehicle columns for the current observation.
+        A vehicle is denied access to the OTL iff at least one rule applies to it.
+
+        :param vehicles: vehicle columns (see `SumoCSE.vehicle_columns`)
+        :return: boolean deny mask, True for each vehicle to be denied OTL access
+        '''
+
+        l_mask = numpy.zeros(len(vehicles.get('speed_max')), dtype=bool)
+        for i_rule in self._rules:
+            l_mask |= i_rule.applies_to_vehicles(vehicles, observation=self._observation)
+        return l_mask
+
     def apply(self, vehicles: typing.Union[typing.Iterable[SUMOVehicle], typing.Dict[str, SUMOVehicle]]) -> SumoCSE:
         '''
-        Apply rules to vehicles
+        Apply rules to vehicles: Evaluate rules vectorised via `deny_mask` and act on the resulting mask.
 
         :type vehicles: typing.Union[SUMOVehicle, typing.Dict[str, SUMOVehicle]]
         :param vehicles: Iterable of vehicles or dictionary Id -> Vehicle
@@ -275,8 +416,9 @@ class SumoCSE(BaseCSE):
 
         '''
 
-        for i_vehicle in vehicles.values() if isinstance(vehicles, dict) else vehicles:
-            self.apply_one(i_vehicle)
+        l_vehicles = tuple(vehicles.values() if isinstance(vehicles, dict) else vehicles)
+        for i_vehicle, i_deny in zip(l_vehicles, self.deny_mask(self.vehicle_columns(l_vehicles))):
+            self._actuate(i_vehicle, i_deny)
         return self
 
     def apply_one(self, vehicle: SUMOVehicle) -> SumoCSE:
@@ -289,12 +431,38 @@ class SumoCSE(BaseCSE):
 
         '''
 
-        for i_rule in self._rules:
-            if i_rule.applies_to(vehicle, occupancy=self._median_occupancy(), dissatisfaction=self._median_dissatisfaction()):
-                vehicle.deny_otl_access(self._traci).vehicle_class = SUMORule.disallowed_class_name()
-                self._traci.vehicle.setVehicleClass(vehicle.sumo_id, vehicle.vehicle_class) if self._traci else None
-                return self
-        # default case: no applicable rule found -> allow
-        vehicle.allow_otl_access(self._traci).vehicle_class = SUMORule.allowed_class_name()
-        self._traci.vehicle.setVehicleClass(vehicle.sumo_id, vehicle.vehicle_class) if self._traci else None
+        return self._actuate(
+            vehicle,
+            any(i_rule.applies_to(vehicle, observation=self._observation) for i_rule in self._rules)
+        )
+
+    def _actuate(self, vehicle: SUMOVehicle, deny: bool) -> SumoCSE:
+        '''
+        Deny or allow vehicle access to the OTL.
+        TraCI commands are only sent if access changes, i.e. on transitions between allowed and denied.
+        The vehicle counts the commands it sends or suppresses, the vehicle class is counted here.
+
+        :param vehicle: Vehicle
+        :param deny: deny access if True, allow otherwise
+        :return: `SumoCSE` as future reference
+
+        '''
+
+        l_transition = vehicle.otl_access is not (Behaviour.DENY if deny else Behaviour.ALLOW)
+
+        if deny:
+            vehicle.deny_otl_access(
+                self._traci, self._cosmetic, self._commands
+            ).vehicle_class = SUMORule.disallowed_class_name()
+        else:
+            vehicle.allow_otl_access(
+                self._traci, self._cosmetic, self._commands
+            ).vehicle_class = SUMORule.allowed_class_name()
+
+        if self._traci and l_transition:
+            self._traci.vehicle.setVehicleClass(vehicle.sumo_id, vehicle.vehicle_class)
+            self._commands['sent'] += 1
+        elif self._traci:
+            # vehicle class is still in effect
+            self._commands['suppressed'] += 1
         return self
@@ -29,6 +29,8 @@ import typing
 from abc import ABCMeta
 from abc import abstractmethod
 
+import numpy
+
 from colmto.common.helper import Position
 from colmto.common.helper import VehicleType
 from colmto.common.helper import BoundingBox
@@ -36,6 +38,7 @@ from colmto.common.helper import Behaviour
 from colmto.common.helper import RuleOperator
 from colmto.common.helper import DissatisfactionRange
 from colmto.common.helper import OccupancyRange
+from colmto.common.helper import StatisticValue
 
 
 class BaseRule(metaclass=ABCMeta):
@@ -148,9 +151,52 @@ class SUMORule(BaseRule, metaclass=ABCMeta):
         Test whether this rule applies to given vehicle
 
         :param vehicle: Vehicle
+        :param kwargs: observed traffic, i.e. `observation` snapshot of the CSE (or its aggregates as keywords)
         '''
         pass
 
+    @staticmethod
+    def observed(aggregate: str, **kwargs) -> typing.Mapping:
+        '''
+        Look up an aggregate of observed traffic.
+        Prefers the CSE's `observation` snapshot and falls back to the aggregate passed as keyword, e.g.
+        `occupancy={'21edge_0': 0.2}`.
+
+        :param aggregate: name of aggregate, e.g. 'occupancy' or 'dissatisfaction'
+        :param kwargs: keyword arguments passed to `applies_to`
+        :return: aggregate or empty dict if not observed
+
+        '''
+
+        if kwargs.get('observation') is not None:
+            return getattr(kwargs.get('observation'), aggregate)
+        return kwargs.get(aggregate, {})
+
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised `applies_to`: Test whether this rule applies to each of the given vehicles at once.
+
+        Vehicles are passed as columns of equal length, i.e.
+
+            * 'position_x', 'position_y': current position
+            * 'speed_max': maximum speed
+            * 'vehicle_type': vehicle type codes (see `VehicleType.code`)
+            * 'dissatisfaction': current dissatisfaction
+            * 'vehicles': the vehicles themselves
+
+        Rules without a vectorised implementation fall back to evaluating `applies_to` for each of the 'vehicles'.
+
+        :param vehicles: vehicle columns
+        :param kwargs: observed traffic, i.e. `observation` snapshot of the CSE (or its aggregates as keywords)
+        :return: boolean array, True for each vehicle this rule applies to
+        '''
+
+        return numpy.fromiter(
+            (self.applies_to(i_vehicle, **kwargs) for i_vehicle in vehicles.get('vehicles')),
+            dtype=bool,
+            count=len(vehicles.get('vehicles'))
+        )
+
 
 class ExtendableRule(BaseRule, metaclass=ABCMeta):
     '''
@@ -158,13 +204,14 @@ class ExtendableRule(BaseRule, metaclass=ABCMeta):
 
     '''
 
-    def __init__(self, subrules=tuple(), subrule_operator=RuleOperator.ANY):
+    def __init__(self, subrules=tuple(), subrule_operator=RuleOperator.ANY, **kwargs):
         '''
         Initialisation.
 
         :param subrules: List of sub-rules
         :param subrule_operator: Rule operator of RuleOperator enum for applying sub-rules ANY|ALL
         :type subrule_operator: typing.Union[RuleOperator, str]
+        :param kwargs: configuration args of the extended rule, passed on to its initialisation
 
         '''
 
@@ -188,7 +235,7 @@ class ExtendableRule(BaseRule, metaclass=ABCMeta):
             if isinstance(subrule_operator, RuleOperator) \
             else RuleOperator.ruleoperator_from_string(subrule_operator)
 
-        super().__init__()
+        super().__init__(**kwargs)
 
     @property
     def subrules(self) -> frozenset:
@@ -220,7 +267,7 @@ class ExtendableRule(BaseRule, metaclass=ABCMeta):
 
         '''
 
-        if rule_operator not in RuleOperator:
+        if not isinstance(rule_operator, RuleOperator):
             raise ValueError
         self._subrule_operator = rule_operator
 
@@ -251,22 +298,70 @@ class ExtendableRule(BaseRule, metaclass=ABCMeta):
 
 class ExtendableSUMORule(ExtendableRule, metaclass=ABCMeta):
     '''
-    Extends Extendable rule to check whether sub-rules apply to a given SUMOVehicle
+    Extends Extendable rule to check whether sub-rules apply to a given SUMOVehicle.
+
+    Extendable variants of SUMO rules derive from this class first, i.e. `ExtendableSUMORule, SUMOVTypeRule`,
+    so the extended rule applies to vehicles iff the rule itself and its sub-rules apply.
     '''
 
-    def applies_to_subrules(self, vehicle: 'SUMOVehicle') -> bool:
+    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
+        '''
+        Test whether this (and sub)rules apply to given vehicle.
+
+        :param vehicle: Vehicle
+        :param kwargs: observed traffic, passed on to the extended rule and sub-rules
+        :return: boolean
+
+        '''
+
+        return super().applies_to(vehicle, **kwargs) and self.applies_to_subrules(vehicle, **kwargs)  # pylint: disable=no-member
+
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this (and sub)rules apply to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :param kwargs: observed traffic, passed on to the extended rule and sub-rules
+        :return: boolean array
+
+        '''
+
+        return RuleOperator.ALL.evaluate_masks((
+            super().applies_to_vehicles(vehicles, **kwargs),  # pylint: disable=no-member
+            self.applies_to_subrules_vehicles(vehicles, **kwargs)
+        ))
+
+    def applies_to_subrules(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
         '''
         Check whether sub-rules apply to this vehicle.
 
         :param vehicle: SUMOVehicle object
+        :param kwargs: observed traffic, passed on to sub-rules
         :return: boolean
 
         '''
 
         return self._subrule_operator.evaluate(
-            (i_rule.applies_to(vehicle) for i_rule in self._subrules)
+            (i_rule.applies_to(vehicle, **kwargs) for i_rule in self._subrules)
         ) if self._subrules else False  # always return False if subrules is empty
 
+    def applies_to_subrules_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised `applies_to_subrules`: Check whether sub-rules apply to each of the given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :param kwargs: observed traffic, passed on to sub-rules
+        :return: boolean array
+
+        '''
+
+        if not self._subrules:  # always False if subrules is empty
+            return numpy.zeros(len(vehicles.get('speed_max')), dtype=bool)
+
+        return self._subrule_operator.evaluate_masks(
+            i_rule.applies_to_vehicles(vehicles, **kwargs) for i_rule in self._subrules
+        )
+
 
 class SUMOUniversalRule(SUMORule, rule_name='SUMOUniversalRule'):
     '''
@@ -284,6 +379,17 @@ class SUMOUniversalRule(SUMORule, rule_name='SUMOUniversalRule'):
 
         return True
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return numpy.ones(len(vehicles.get('speed_max')), dtype=bool)
+
 
 class SUMONullRule(SUMORule, rule_name='SUMONullRule'):
     '''
@@ -300,6 +406,17 @@ class SUMONullRule(SUMORule, rule_name='SUMONullRule'):
 
         return False
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return numpy.zeros(len(vehicles.get('speed_max')), dtype=bool)
+
 
 class SUMOVehicleRule(SUMORule, metaclass=ABCMeta, rule_name='SUMOVehicleRule'):
     '''Base class for vehicle attribute specific rules.'''
@@ -345,8 +462,19 @@ class SUMOVTypeRule(SUMOVehicleRule, rule_name='SUMOVTypeRule'):
 
         return self._vehicle_type == vehicle.vehicle_type
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
 
-class ExtendableSUMOVTypeRule(SUMOVTypeRule, ExtendableSUMORule, rule_name='ExtendableSUMOVTypeRule'):
+        '''
+
+        return vehicles.get('vehicle_type') == self._vehicle_type.code
+
+
+class ExtendableSUMOVTypeRule(ExtendableSUMORule, SUMOVTypeRule, rule_name='ExtendableSUMOVTypeRule'):
     '''
     Extendable vehicle-type based rule: Applies to vehicles with a given SUMO vehicle type.
     Can be extendend by sub-rules.
@@ -363,8 +491,7 @@ class ExtendableSUMOVTypeRule(SUMOVTypeRule, ExtendableSUMORule, rule_name='Exte
 
         '''
 
-        SUMOVTypeRule.__init__(self, vehicle_type=vehicle_type)
-        ExtendableSUMORule.__init__(self, subrules=subrules, subrule_operator=subrule_operator)
+        super().__init__(subrules=subrules, subrule_operator=subrule_operator, vehicle_type=vehicle_type)
 
     def __str__(self):
         return f'{self.__class__}: ' \
@@ -372,17 +499,6 @@ class ExtendableSUMOVTypeRule(SUMOVTypeRule, ExtendableSUMORule, rule_name='Exte
                f'subrule_operator: {self._subrule_operator}, ' \
                f'subrules: {self.subrules_as_str}'
 
-    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
-        '''
-        Test whether this rule applies to given vehicle.
-
-        :param vehicle: Vehicle
-        :return: boolean
-
-        '''
-
-        return super().applies_to(vehicle) and self.applies_to_subrules(vehicle)
-
 
 class SUMOMinimalSpeedRule(SUMOVehicleRule, rule_name='SUMOMinimalSpeedRule'):
     '''MinimalSpeed rule: Applies to vehicles unable to reach a minimal velocity.'''
@@ -414,8 +530,19 @@ class SUMOMinimalSpeedRule(SUMOVehicleRule, rule_name='SUMOMinimalSpeedRule'):
 
         return vehicle.speed_max < self._minimal_speed
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return vehicles.get('speed_max') < self._minimal_speed
+
 
-class ExtendableSUMOMinimalSpeedRule(SUMOMinimalSpeedRule, ExtendableSUMORule, rule_name='ExtendableSUMOMinimalSpeedRule'):
+class ExtendableSUMOMinimalSpeedRule(ExtendableSUMORule, SUMOMinimalSpeedRule, rule_name='ExtendableSUMOMinimalSpeedRule'):
     '''
     Extendable speed-based rule: Applies to vehicles unable to reach a minimal velocity.
     Can be extendend by sub-rules.
@@ -432,8 +559,7 @@ class ExtendableSUMOMinimalSpeedRule(SUMOMinimalSpeedRule, ExtendableSUMORule, r
 
         '''
 
-        SUMOMinimalSpeedRule.__init__(self, minimal_speed=minimal_speed)
-        ExtendableSUMORule.__init__(self, subrules=subrules, subrule_operator=subrule_operator)
+        super().__init__(subrules=subrules, subrule_operator=subrule_operator, minimal_speed=minimal_speed)
 
     def __str__(self):
         return f'{self.__class__}: ' \
@@ -441,17 +567,6 @@ class ExtendableSUMOMinimalSpeedRule(SUMOMinimalSpeedRule, ExtendableSUMORule, r
                f'subrule_operator: {self._subrule_operator}, ' \
                f'subrules: {self.subrules_as_str}'
 
-    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
-        '''
-        Test whether this (and sub)rules apply to given vehicle.
-
-        :param vehicle: Vehicle
-        :return: boolean
-
-        '''
-
-        return super().applies_to(vehicle) and self.applies_to_subrules(vehicle)
-
 
 class SUMOPositionRule(SUMOVehicleRule, rule_name='SUMOPositionRule'):
     '''
@@ -498,8 +613,22 @@ class SUMOPositionRule(SUMOVehicleRule, rule_name='SUMOPositionRule'):
 
         return self._outside ^ self._bounding_box.contains(vehicle.position)
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
 
-class ExtendableSUMOPositionRule(SUMOPositionRule, ExtendableSUMORule, rule_name='ExtendableSUMOPositionRule'):
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return self._outside ^ (
+            (self._bounding_box.p1.x <= vehicles.get('position_x')) & (vehicles.get('position_x') <= self._bounding_box.p2.x)
+            & (self._bounding_box.p1.y <= vehicles.get('position_y')) & (vehicles.get('position_y') <= self._bounding_box.p2.y)
+        )
+
+
+class ExtendableSUMOPositionRule(ExtendableSUMORule, SUMOPositionRule, rule_name='ExtendableSUMOPositionRule'):
     '''
     Extendable position-based rule: Applies to vehicles which are located inside a given bounding box, i.e.
     [(left_lane_0, right_lane_0) -> (left_lane_1, right_lane_1)], AND match at least one sub-rule.
@@ -518,8 +647,8 @@ class ExtendableSUMOPositionRule(SUMOPositionRule, ExtendableSUMORule, rule_name
 
         '''
 
-        SUMOPositionRule.__init__(self, bounding_box=bounding_box, outside=outside)
-        ExtendableSUMORule.__init__(self, subrules=subrules, subrule_operator=subrule_operator)
+        super().__init__(
+            subrules=subrules, subrule_operator=subrule_operator, bounding_box=bounding_box, outside=outside)
 
     def __str__(self):
         return f'{self.__class__}: ' \
@@ -527,17 +656,6 @@ class ExtendableSUMOPositionRule(SUMOPositionRule, ExtendableSUMORule, rule_name
                f'subrule_operator: {self._subrule_operator}, ' \
                f'subrules: {self.subrules_as_str}'
 
-    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
-        '''
-        Test whether this (and sub)rules apply to given vehicle.
-
-        :param vehicle: Vehicle
-        :return: boolean
-
-        '''
-
-        return super().applies_to(vehicle) and self.applies_to_subrules(vehicle)
-
 
 class SUMOVehicleDissatisfactionRule(SUMOVehicleRule, rule_name='SUMOVehicleDissatisfactionRule'):
     '''
@@ -584,8 +702,22 @@ class SUMOVehicleDissatisfactionRule(SUMOVehicleRule, rule_name='SUMOVehicleDiss
 
         return self._outside ^ self._dissatisfaction_range.contains(vehicle.dissatisfaction)
 
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return self._outside ^ (
+            (self._dissatisfaction_range.min <= vehicles.get('dissatisfaction'))
+            & (vehicles.get('dissatisfaction') <= self._dissatisfaction_range.max)
+        )
 
-class ExtendableSUMOVehicleDissatisfactionRule(SUMOVehicleDissatisfactionRule, ExtendableSUMORule, rule_name='ExtendableSUMOVehicleDissatisfactionRule'):
+
+class ExtendableSUMOVehicleDissatisfactionRule(ExtendableSUMORule, SUMOVehicleDissatisfactionRule, rule_name='ExtendableSUMOVehicleDissatisfactionRule'):
     '''
     Extendable dissatisfaction rule for vehicles:
     Applies to vehicles which have reached a given dissatisfaction threshold (default: <=0.5).
@@ -602,8 +734,8 @@ class ExtendableSUMOVehicleDissatisfactionRule(SUMOVehicleDissatisfactionRule, E
 
         '''
 
-        SUMOVehicleDissatisfactionRule.__init__(self, dissatisfaction_range=dissatisfaction_range, outside=outside)
-        ExtendableSUMORule.__init__(self, subrules=subrules, subrule_operator=subrule_operator)
+        super().__init__(
+            subrules=subrules, subrule_operator=subrule_operator, dissatisfaction_range=dissatisfaction_range, outside=outside)
 
     def __str__(self):
         return f'{self.__class__}: ' \
@@ -612,17 +744,6 @@ class ExtendableSUMOVehicleDissatisfactionRule(SUMOVehicleDissatisfactionRule, E
                f'subrule_operator: {self._subrule_operator}, ' \
                f'subrules: {self.subrules_as_str}'
 
-    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
-        '''
-        Test whether this (and sub)rules apply to given vehicle
-
-        :param vehicle: Vehicle
-        :return: boolean
-
-        '''
-
-        return super().applies_to(vehicle) and self.applies_to_subrules(vehicle)
-
 
 class SUMOGlobalDissatisfactionRule(SUMOVehicleRule, rule_name='SUMOGlobalDissatisfactionRule'):
     '''
@@ -668,10 +789,42 @@ class SUMOGlobalDissatisfactionRule(SUMOVehicleRule, rule_name='SUMOGlobalDissat
 
         '''
 
-        return self._outside ^ self._dissatisfaction_range.contains(kwargs.get('dissatisfaction', {}).get(vehicle.vehicle_type, float('NaN')))
+        return self._outside ^ self._dissatisfaction_range.contains(
+            self.global_dissatisfaction(self.observed('dissatisfaction', **kwargs).get(vehicle.vehicle_type, float('NaN')))
+        )
+
+    @staticmethod
+    def global_dissatisfaction(observed: typing.Union[StatisticValue, float]) -> float:
+        '''
+        Global dissatisfaction of a vehicle type, i.e. the median of observed dissatisfaction medians.
+
+        :param observed: observed dissatisfaction (StatisticValue) of a vehicle type or plain float
+        :return: global dissatisfaction
+        '''
+
+        return float(observed.median if isinstance(observed, StatisticValue) else observed)
+
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        l_global_dissatisfaction = numpy.array([
+            self.global_dissatisfaction(self.observed('dissatisfaction', **kwargs).get(i_vtype, float('NaN')))
+            for i_vtype in VehicleType
+        ])[vehicles.get('vehicle_type')]
+
+        return self._outside ^ (
+            (self._dissatisfaction_range.min <= l_global_dissatisfaction)
+            & (l_global_dissatisfaction <= self._dissatisfaction_range.max)
+        )
 
 
-class ExtendableSUMOGlobalDissatisfactionRule(SUMOGlobalDissatisfactionRule, ExtendableSUMORule, rule_name='ExtendableSUMOGlobalDissatisfactionRule'):
+class ExtendableSUMOGlobalDissatisfactionRule(ExtendableSUMORule, SUMOGlobalDissatisfactionRule, rule_name='ExtendableSUMOGlobalDissatisfactionRule'):
     '''
     Extendable global dissatisfaction-based rule:
     Applies if the global dissatisfaction reaches a given threshold (default: <=0.5).
@@ -690,8 +843,8 @@ class ExtendableSUMOGlobalDissatisfactionRule(SUMOGlobalDissatisfactionRule, Ext
 
         '''
 
-        SUMOVehicleDissatisfactionRule.__init__(self, dissatisfaction_range=dissatisfaction_range, outside=outside)
-        ExtendableSUMORule.__init__(self, subrules=subrules, subrule_operator=subrule_operator)
+        super().__init__(
+            subrules=subrules, subrule_operator=subrule_operator, dissatisfaction_range=dissatisfaction_range, outside=outside)
 
     def __str__(self):
         return f'{self.__class__}: ' \
@@ -700,17 +853,6 @@ class ExtendableSUMOGlobalDissatisfactionRule(SUMOGlobalDissatisfactionRule, Ext
                f'subrule_operator: {self._subrule_operator}, ' \
                f'subrules: {self.subrules_as_str}'
 
-    def applies_to(self, vehicle: 'SUMOVehicle', **kwargs) -> bool:
-        '''
-        Test whether this (and sub)rules apply to given vehicle
-
-        :param vehicle: Vehicle
-        :return: boolean
-
-        '''
-
-        return super().applies_to(vehicle) and self.applies_to_subrules(vehicle)
-
 
 class SUMOOccupancyRule(SUMOVehicleRule, rule_name='SUMOOccupancyRule'):
     '''
@@ -753,4 +895,19 @@ class SUMOOccupancyRule(SUMOVehicleRule, rule_name='SUMOOccupancyRule'):
         :return: boolean
 
         '''
-        return self._outside ^ self._occupancy_range.contains(kwargs.get('occupancy', {}).get(self._lane_id, float('NaN')))
+        return self._outside ^ self._occupancy_range.contains(self.observed('occupancy', **kwargs).get(self._lane_id, float('NaN')))
+
+    def applies_to_vehicles(self, vehicles: typing.Mapping[str, numpy.ndarray], **kwargs) -> numpy.ndarray:
+        '''
+        Vectorised test whether this rule applies to given vehicles.
+
+        :param vehicles: vehicle columns (see `SUMORule.applies_to_vehicles`)
+        :return: boolean array
+
+        '''
+
+        return numpy.full(
+            len(vehicles.get('speed_max')),
+            self.applies_to(None, **kwargs),
+            dtype=bool
+        )
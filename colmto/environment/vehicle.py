@@ -25,6 +25,7 @@
 
 import colmto.cse.rule
 import colmto.common.model
+import colmto.common.statistics
 from colmto.common.helper import Position
 from colmto.common.helper import VehicleType
 from colmto.common.helper import VehicleDisposition
@@ -32,13 +33,19 @@ from colmto.common.helper import StatisticSeries
 from colmto.common.helper import GridPosition
 from colmto.common.helper import Colour
 from colmto.common.helper import Metric
+from colmto.common.helper import Behaviour
 from types import MappingProxyType
 import typing
 if typing.TYPE_CHECKING:
     import traci
+    import pandas
 
-from collections import OrderedDict
-import pandas
+from collections.abc import MutableMapping
+import numpy
+
+# duration (s) cooperative vehicles keep to the right lane after being denied OTL access,
+# i.e. long enough to last until access is allowed again; a float, as traci treats integer durations >= 1000 as ms
+_KEEP_RIGHT_DURATION = 86400.
 
 
 class BaseVehicle(object):
@@ -73,6 +80,441 @@ class BaseVehicle(object):
         return self._properties.get('position')
 
 
+class VehicleStore(object):
+    '''
+    Columnar (struct-of-arrays) store of the state of all vehicles of a run.
+
+    Each vehicle owns an integer slot, i.e. one row of preallocated NumPy columns holding position, lane, speed,
+    travel time, dissatisfaction, etc. `SUMOVehicle` objects are thin views over their slot, so all vehicles of a
+    time step can be updated at once by `update_all` instead of one `SUMOVehicle.update` call per vehicle.
+    The capacity doubles if all slots are taken.
+
+    Grid-based series are kept in a float array of shape (rows, metrics, grid cells), initialised as NaN and
+    filled in place as vehicles pass cells. A slot gets a row on its first update and gives it back with `release`,
+    e.g. when its vehicle arrived, so rows are only held by vehicles on the road and get reused by later ones.
+    The array is allocated on the first update, i.e. stores of runs which are only generated (and simulated
+    elsewhere) don't hold it.
+
+    '''
+
+    # column -> dtype
+    _COLUMNS = {
+        'position_x': float,
+        'position_y': float,
+        'start_position_x': float,
+        'start_position_y': float,
+        'grid_position_x': int,
+        'grid_position_y': int,
+        'lane_index': int,
+        'speed': float,
+        'speed_max': float,
+        'start_time': float,
+        'time_step': float,
+        'travel_time': float,
+        'dissatisfaction': float,
+        'dsat_threshold': float,
+        'vehicle_type': int,
+        'updated': bool
+    }
+
+    def __init__(self, environment: typing.Optional[dict] = None, capacity: int = 64):
+        '''
+        Initialisation.
+
+        :param environment: environment, i.e. 'gridcellwidth' to calculate grid positions with
+        :param capacity: number of initially allocated slots
+        '''
+
+        self._environment = environment if environment is not None else {}
+        self._size = 0
+        self._columns = {
+            i_column: numpy.zeros(max(int(capacity), 1), dtype=i_dtype)
+            for i_column, i_dtype in self._COLUMNS.items()
+        }
+        self._slots = {}
+        self._grid_rows = numpy.full(max(int(capacity), 1), -1, dtype=int)  # slot -> row of grid series, -1: none
+        self._free_grid_rows = []
+        self._grid_series = None
+
+    def __len__(self) -> int:
+        '''
+        :return: number of allocated slots
+        '''
+        return self._size
+
+    def __getitem__(self, column: str) -> numpy.ndarray:
+        '''
+        :param column: column name
+        :return: column of all allocated slots
+        '''
+        return self._columns[column][:self._size]
+
+    @staticmethod
+    def of(vehicles: typing.Iterable['SUMOVehicle']) -> 'VehicleStore':
+        '''
+        Get store shared by given vehicles, e.g. the ones created for a run.
+
+        :param vehicles: vehicles
+        :return: common store of vehicles, a new empty store if there are no vehicles
+        :raises ValueError: if vehicles do not share one store
+        '''
+
+        l_stores = {id(i_vehicle.store): i_vehicle.store for i_vehicle in vehicles}
+        if len(l_stores) > 1:
+            raise ValueError(f'vehicles are spread across {len(l_stores)} stores')
+        return l_stores.popitem()[1] if l_stores else VehicleStore()
+
+    def allocate(self) -> int:
+        '''
+        Allocate a slot for a new vehicle.
+
+        :return: slot
+        '''
+
+        return int(self.allocate_many(1)[0])
+
+    def allocate_many(self, count: int) -> numpy.ndarray:
+        '''
+        Allocate consecutive slots for `count` new vehicles at once.
+
+        :param count: number of slots
+        :return: array of slots
+        '''
+
+        l_capacity = len(self._columns['speed'])
+        if self._size + count > l_capacity:
+            l_growth = max(l_capacity, self._size + count - l_capacity)
+            self._columns = {
+                i_column: numpy.concatenate((i_values, numpy.zeros(l_growth, dtype=i_values.dtype)))
+                for i_column, i_values in self._columns.items()
+            }
+            self._grid_rows = numpy.concatenate((self._grid_rows, numpy.full(l_growth, -1, dtype=int)))
+
+        self._size += count
+        return numpy.arange(self._size - count, self._size)
+
+    def register(self, sumo_id: str, slot: int):
+        '''
+        Register SUMO vehicle id of a slot.
+
+        :param sumo_id: vehicle id
+        :param slot: slot
+        '''
+        self._slots[str(sumo_id)] = slot
+
+    def slots(self, sumo_ids: typing.Sequence[str]) -> numpy.ndarray:
+        '''
+        :param sumo_ids: vehicle ids
+        :return: slots of vehicle ids
+        '''
+        return numpy.fromiter((self._slots[i_id] for i_id in sumo_ids), dtype=int, count=len(sumo_ids))
+
+    def grid_series(self, slot: typing.Union[int, numpy.ndarray]) -> numpy.ndarray:
+        '''
+        :param slot: slot or array of slots
+        :return: grid-based series recorded for slot as array of shape (metrics, grid cells),
+            metrics ordered as in `StatisticSeries.GRID.metrics()`, NaN for cells not passed (yet) and for slots
+            without a row, i.e. not updated yet or released.
+            For an array of slots, a copy of shape (slots, metrics, grid cells).
+        '''
+
+        l_rows = self._grid_rows[slot]
+        if numpy.ndim(l_rows) == 0 and l_rows >= 0:
+            return self._grid_series[l_rows]
+
+        l_grid_series = numpy.full(
+            numpy.shape(slot) + (len(StatisticSeries.GRID.metrics()), int(self._environment.get('gridlength'))),
+            numpy.nan
+        )
+        if numpy.ndim(l_rows) > 0:
+            l_grid_series[l_rows >= 0] = self._grid_series[l_rows[l_rows >= 0]]
+        return l_grid_series
+
+    def release(self, slots: numpy.ndarray) -> 'VehicleStore':
+        '''
+        Release rows of grid-based series of given slots for reuse, e.g. after they got collected when their
+        vehicles arrived. Series of released slots read as NaN.
+
+        :param slots: slots
+        :return: self
+        '''
+
+        l_slots = numpy.asarray(slots, dtype=int)
+        l_rows = self._grid_rows[l_slots]
+        l_rows = numpy.unique(l_rows[l_rows >= 0])
+        if len(l_rows):
+            self._grid_series[l_rows] = numpy.nan
+            self._free_grid_rows.extend(l_rows.tolist())
+        self._grid_rows[l_slots] = -1
+        return self
+
+    def _assign_grid_rows(self, slots: numpy.ndarray) -> numpy.ndarray:
+        '''
+        Assign rows of grid-based series to slots without one, reusing released rows before growing the array.
+
+        :param slots: slots
+        :return: rows of slots
+        '''
+
+        if self._grid_series is None:
+            self._grid_series = numpy.empty(
+                (0, len(StatisticSeries.GRID.metrics()), int(self._environment.get('gridlength')))
+            )
+
+        l_new_slots = numpy.unique(slots[self._grid_rows[slots] < 0])
+        if len(l_new_slots):
+            if len(self._free_grid_rows) < len(l_new_slots):
+                l_rows = len(self._grid_series)
+                l_grown = max(l_rows, len(l_new_slots) - len(self._free_grid_rows))
+                self._grid_series = numpy.concatenate(
+                    (self._grid_series, numpy.full((l_grown,) + self._grid_series.shape[1:], numpy.nan))
+                )
+                self._free_grid_rows.extend(range(l_rows, l_rows + l_grown))
+
+            self._grid_rows[l_new_slots] = self._free_grid_rows[-len(l_new_slots):]
+            del self._free_grid_rows[-len(l_new_slots):]
+
+        return self._grid_rows[slots]
+
+    def columns(self, slots: numpy.ndarray, columns: typing.Iterable[str]) -> typing.Dict[str, numpy.ndarray]:
+        '''
+        Gather columns for given slots.
+
+        :param slots: slots
+        :param columns: column names
+        :return: dictionary of column name -> array with one entry per slot
+        '''
+        return {i_column: self._columns[i_column][slots] for i_column in columns}
+
+    def update_all(self, sumo_ids: typing.Sequence[str], positions: typing.Sequence[Position],
+                   lanes: typing.Sequence[int], speeds: typing.Sequence[float], time_step: float) -> numpy.ndarray:
+        '''
+        Update vehicles by their SUMO vehicle ids with data acquired via TraCI (see `update_slots`).
+
+        :param sumo_ids: vehicle ids
+        :param positions: TraCI provided positions
+        :param lanes: TraCI provided lane indices
+        :param speeds: TraCI provided speeds
+        :param time_step: TraCI provided time step
+        :return: slots of updated vehicles
+        '''
+
+        l_slots = self.slots(sumo_ids)
+        self.update_slots(l_slots, positions, lanes, speeds, time_step)
+        return l_slots
+
+    def update_slots(self, slots: numpy.ndarray, positions: typing.Sequence[Position],  # pylint: disable=too-many-locals
+                     lanes: typing.Sequence[int], speeds: typing.Sequence[float], time_step: float) -> 'VehicleStore':
+        '''
+        Update current state of vehicles in given slots and calculate their statistics at once.
+
+        For the grid cell a vehicle is in, take the global position in x-direction divided by grid
+        cell size and int-rounded. For the y-coordinate take the lane index.
+
+        :note: The cell width can be set via 'gridcellwidth' in the run config.
+
+        :param slots: slots
+        :param positions: TraCI provided positions
+        :param lanes: TraCI provided lane indices
+        :param speeds: TraCI provided speeds
+        :param time_step: TraCI provided time step
+        :return: self
+        '''
+
+        l_positions = numpy.asarray(positions, dtype=float).reshape(-1, 2)
+        l_lanes = numpy.asarray(lanes, dtype=int)
+        l_speeds = numpy.asarray(speeds, dtype=float)
+        l_time_step = float(time_step)
+        l_start_time = self._columns['start_time'][slots]
+
+        assert (l_positions >= 0).all()
+        assert (l_speeds >= 0).all()
+        assert l_time_step >= 0
+        assert (l_time_step >= l_start_time).all()
+        assert numpy.isin(l_lanes, (0, 1)).all()
+
+        # update current vehicle state
+        l_grid_positions = numpy.round(l_positions / self._environment.get('gridcellwidth')).astype(int) - 1
+        l_travel_times = l_time_step - l_start_time
+        self._columns['position_x'][slots] = l_positions[:, 0]
+        self._columns['position_y'][slots] = l_positions[:, 1]
+        self._columns['grid_position_x'][slots] = l_grid_positions[:, 0]
+        self._columns['grid_position_y'][slots] = l_grid_positions[:, 1]
+        self._columns['speed'][slots] = l_speeds
+        self._columns['time_step'][slots] = l_time_step
+        self._columns['travel_time'][slots] = l_travel_times
+        self._columns['lane_index'][slots] = l_lanes
+        self._columns['updated'][slots] = True
+
+        # vehicle/generic optimal travel time: round positions of division as SUMO reports positions with reduced
+        # accuracy (2 significant figures) to avoid negative travel time losses.
+        l_speed_max = self._columns['speed_max'][slots]
+        l_generic_optimal_travel_times = _round(l_positions[:, 0] / l_speed_max, 2)
+
+        # Vehicle optimal travel time: include, i.e. substract the start_position as SUMO puts
+        # vehicles at lane positions greater than 0 in their first active time step if they started
+        # between the previous and current global (runtime) time step.
+        l_time_losses = l_travel_times - _round(
+            (l_positions[:, 0] - self._columns['start_position_x'][slots]) / l_speed_max, 2
+        )
+        assert (l_time_losses >= 0).all()
+
+        l_dissatisfaction = colmto.common.model.dissatisfaction(
+            time_loss=l_time_losses,
+            optimal_travel_time=l_generic_optimal_travel_times,
+            time_loss_threshold=self._columns['dsat_threshold'][slots]
+        )
+        assert ((0 <= l_dissatisfaction) & (l_dissatisfaction <= 1)).all()
+        self._columns['dissatisfaction'][slots] = l_dissatisfaction
+
+        l_relative_time_losses = numpy.divide(
+            l_time_losses,
+            l_generic_optimal_travel_times,
+            out=numpy.zeros_like(l_time_losses),
+            where=l_generic_optimal_travel_times > 0
+        )
+
+        # update data series based on grid cell, vehicles outside the grid are not recorded
+        l_rows = self._assign_grid_rows(numpy.asarray(slots, dtype=int))
+        # values in order of StatisticSeries.GRID.metrics()
+        l_in_grid = (l_grid_positions[:, 0] >= 0) & (l_grid_positions[:, 0] < self._grid_series.shape[2])
+        self._grid_series[l_rows[l_in_grid], :, l_grid_positions[l_in_grid, 0]] = numpy.stack(
+            (
+                numpy.full(len(slots), l_time_step),
+                l_positions[:, 1],
+                l_grid_positions[:, 1],
+                l_dissatisfaction,
+                l_travel_times,
+                l_time_losses,
+                l_relative_time_losses,
+                l_lanes
+            ),
+            axis=1
+        )[l_in_grid]
+
+        return self
+
+
+def _round(values: numpy.ndarray, decimals: int) -> numpy.ndarray:
+    '''
+    Round values like `round()` does for floats, i.e. based on their exact binary value.
+    `numpy.round` scales values before rounding, which can tip values close to a tie the other way, hence these
+    few values are rounded individually.
+
+    :param values: values
+    :param decimals: number of decimals
+    :return: rounded values
+    '''
+
+    l_scaled = values * 10.**decimals
+    l_rounded = numpy.round(l_scaled) / 10.**decimals
+    for i_index in numpy.flatnonzero(numpy.abs(numpy.abs(l_scaled - numpy.trunc(l_scaled)) - .5) < 1e-6):
+        l_rounded[i_index] = round(float(values[i_index]), decimals)
+    return l_rounded
+
+
+class _SlotProperties(MutableMapping):
+    '''
+    Properties of a `SUMOVehicle`. Its state is read from and written through to its slot in a `VehicleStore`,
+    other properties are kept in a dictionary. The order of keys is maintained as in a dictionary.
+
+    '''
+
+    # property -> (columns, type of columns, type of property once updated by the store), values are kept in the
+    # store only. For properties spanning several columns, the type of the value last assigned is kept.
+    _STORED = {
+        'position': (('position_x', 'position_y'), float, Position),
+        'start_position': (('start_position_x', 'start_position_y'), float, None),
+        'grid_position': (('grid_position_x', 'grid_position_y'), int, GridPosition),
+        'lane_index': (('lane_index',), int, None),
+        'speed': (('speed',), float, None),
+        'start_time': (('start_time',), float, None),
+        'time_step': (('time_step',), float, None),
+        'travel_time': (('travel_time',), float, None),
+        'dissatisfaction': (('dissatisfaction',), float, None)
+    }
+
+    # properties kept in the store that exist once the vehicle has been updated
+    _UPDATED = ('lane_index',)
+
+    # property -> column, values are kept as they are and mirrored to the store
+    _MIRRORED = {
+        'maxSpeed': 'speed_max',
+        'dsat_threshold': 'dsat_threshold',
+        'vType': 'vehicle_type'
+    }
+
+    __slots__ = ('_store', '_slot', '_values')
+
+    def __init__(self, store: VehicleStore, slot: int, properties: typing.Optional[dict] = None):
+        '''
+        Initialisation.
+
+        :param store: vehicle store
+        :param slot: slot of vehicle in store
+        :param properties: initial properties
+        '''
+
+        self._store = store
+        self._slot = slot
+        self._values = {}
+        self.update(properties if properties is not None else {})
+
+    @classmethod
+    def of_values(cls, store: VehicleStore, slot: int, values: dict) -> '_SlotProperties':
+        '''
+        Properties of a slot from values as kept by another `_SlotProperties`, e.g. of a template vehicle.
+        Values of stored and mirrored properties are expected to be in the store already.
+
+        :param store: vehicle store
+        :param slot: slot of vehicle in store
+        :param values: values, taken over as they are
+        :return: _SlotProperties
+        '''
+
+        l_properties = cls.__new__(cls)
+        l_properties._store = store
+        l_properties._slot = slot
+        l_properties._values = values
+        return l_properties
+
+    def __getitem__(self, key: str):
+        if key not in self._STORED:
+            return self._values[key]
+        if key not in self._values and not (key in self._UPDATED and self._store['updated'][self._slot]):
+            raise KeyError(key)
+        l_columns, l_type, l_updated_type = self._STORED[key]
+        l_values = tuple(l_type(self._store[i_column][self._slot]) for i_column in l_columns)
+        if len(l_values) == 1:
+            return l_values[0]
+        return (l_updated_type if l_updated_type and self._store['updated'][self._slot] else self._values[key])(*l_values)
+
+    def __setitem__(self, key: str, value):
+        if key in self._STORED:
+            l_columns, _, _ = self._STORED[key]
+            for i_column, i_value in zip(l_columns, (value,) if len(l_columns) == 1 else tuple(value)):
+                self._store[i_column][self._slot] = i_value
+            self._values[key] = type(value) if isinstance(value, Position) else Position
+            return
+        if key in self._MIRRORED:
+            self._store[self._MIRRORED[key]][self._slot] = (
+                VehicleType.__members__.get(str(value).upper(), VehicleType.UNDEFINED).code if key == 'vType'
+                else numpy.nan if value is None else float(value)
+            )
+        self._values[key] = value
+
+    def __delitem__(self, key: str):
+        del self._values[key]
+
+    def __iter__(self):
+        yield from self._values
+        if self._store['updated'][self._slot]:
+            yield from (i_key for i_key in self._UPDATED if i_key not in self._values)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 class SUMOVehicle(BaseVehicle):
     '''SUMO vehicle class.
 
@@ -93,7 +535,8 @@ class SUMOVehicle(BaseVehicle):
                  speed_deviation: float = 0.0,
                  sigma: float = 0.0,
                  speed_max: float = 0.0,
-                 cooperation_probability: typing.Union[None, float]=None):
+                 cooperation_probability: typing.Union[None, float]=None,
+                 store: typing.Optional[VehicleStore] = None):
         '''
         Initialisation.
 
@@ -111,11 +554,18 @@ class SUMOVehicle(BaseVehicle):
         :param speed_max: maximum desired or capable speed of vehicle
         :type cooperation_probability: float
         :param cooperation_probability: disposition for cooperative driving with :math:`p\in [0,1]\cup \{None\}`. :math:`p=1` or `None` means always cooperative (default), :math:`p=0` always uncooperative
+        :type store: VehicleStore
+        :param store: (optional) columnar store shared by the vehicles of a run, a private one is created otherwise
 
         '''
 
         super().__init__()
 
+        # keep state in a slot of the (shared) columnar store
+        self._store = store if store is not None else VehicleStore(environment, capacity=1)
+        self._slot = self._store.allocate()
+        self._properties = _SlotProperties(self._store, self._slot, self._properties)
+
         if isinstance(vtype_sumo_cfg, dict):
             self._properties.update(vtype_sumo_cfg)
 
@@ -140,12 +590,95 @@ class SUMOVehicle(BaseVehicle):
 
         self._environment = environment
 
-        # prepare grid-based series using OrderedDicts to maintain the order of keys
-        self._grid_based_series_dict = {
-            i_metric.value : OrderedDict()
-            for i_metric in StatisticSeries.GRID.metrics()
+        # last actuated OTL access (see allow_otl_access/deny_otl_access)
+        self._otl_access = None
+
+    @classmethod
+    def batch(cls,  # pylint: disable=too-many-arguments,too-many-locals
+              environment: dict,
+              vehicle_types: typing.Sequence[str],
+              templates: typing.Mapping[str, dict],
+              speed_max: numpy.ndarray,
+              start_time: numpy.ndarray,
+              normal_colour: numpy.ndarray,
+              cooperation_disposition: typing.Sequence[VehicleDisposition],
+              sumo_ids: typing.Sequence[str]) -> typing.List['SUMOVehicle']:
+        '''
+        Create the vehicles of a run at once, sharing one new `VehicleStore`.
+
+        Each vehicle gets the properties of a template vehicle of its type, created once per type with the
+        keyword arguments in `templates`, and its individual values from the given arrays, which are written to the
+        store column-wise. Vehicle i is the same as a `SUMOVehicle(environment, vehicle_types[i], **templates[...])`
+        with speed_max, start_time, normal_colour, cooperation_disposition and sumo_id set to the i-th values.
+
+        :param environment: environment
+        :param vehicle_types: SUMO vehicle type of each vehicle
+        :param templates: vehicle type -> keyword arguments of a template vehicle, i.e. vtype_sumo_cfg, speed_deviation
+            and sigma
+        :param speed_max: maximum desired or capable speed of each vehicle
+        :param start_time: start time of each vehicle
+        :param normal_colour: normal colour of each vehicle, array of shape (vehicles, 4)
+        :param cooperation_disposition: disposition of each vehicle
+        :param sumo_ids: vehicle id of each vehicle
+        :return: list of vehicles in given order
+        '''
+
+        l_store = VehicleStore(environment, capacity=len(vehicle_types))
+        l_slots = l_store.allocate_many(len(vehicle_types))
+        l_templates = {
+            i_vtype: cls(environment, vehicle_type=i_vtype, **templates[i_vtype])
+            for i_vtype in dict.fromkeys(vehicle_types)
         }
 
+        # take over mirrored columns of templates (e.g. vType), then set individual columns
+        l_template_index = {i_vtype: i_index for i_index, i_vtype in enumerate(l_templates)}
+        l_template_index = numpy.fromiter(
+            (l_template_index[i_vtype] for i_vtype in vehicle_types), dtype=int, count=len(vehicle_types)
+        )
+        for i_column in _SlotProperties._MIRRORED.values():  # pylint: disable=protected-access
+            l_store[i_column][:] = numpy.array(
+                [i_template.store[i_column][i_template.slot] for i_template in l_templates.values()],
+                dtype=l_store[i_column].dtype
+            )[l_template_index] if l_templates else ()
+        l_store['speed_max'][:] = speed_max
+        l_store['start_time'][:] = start_time
+
+        l_vehicles = []
+        for i_slot, i_vtype, i_speed_max, i_colour, i_disposition, i_sumo_id in zip(
+                l_slots.tolist(), vehicle_types, numpy.asarray(speed_max, dtype=float).tolist(),
+                numpy.asarray(normal_colour, dtype=float).tolist(), cooperation_disposition, sumo_ids):
+            l_values = dict(l_templates[i_vtype]._properties._values)  # pylint: disable=protected-access
+            l_values.update({
+                'normal_colour': Colour(*i_colour),
+                'maxSpeed': i_speed_max,
+                'cooperation_disposition': i_disposition,
+                'sumo_id': str(i_sumo_id)
+            })
+            l_vehicle = cls.__new__(cls)
+            l_vehicle._store = l_store
+            l_vehicle._slot = i_slot
+            l_vehicle._properties = _SlotProperties.of_values(l_store, i_slot, l_values)
+            l_vehicle._environment = environment
+            l_vehicle._otl_access = None
+            l_vehicles.append(l_vehicle)
+            l_store.register(i_sumo_id, i_slot)
+
+        return l_vehicles
+
+    @property
+    def store(self) -> VehicleStore:
+        '''
+        :return: columnar store holding the state of this vehicle
+        '''
+        return self._store
+
+    @property
+    def slot(self) -> int:
+        '''
+        :return: slot of this vehicle in its store
+        '''
+        return self._slot
+
     @property
     def lane(self) -> int:
         '''
@@ -178,6 +711,7 @@ class SUMOVehicle(BaseVehicle):
         :type sumo_id: str
         '''
         self._properties['sumo_id'] = str(sumo_id)
+        self._store.register(sumo_id, self._slot)
 
     @property
     def vehicle_type(self) -> VehicleType:
@@ -310,9 +844,25 @@ class SUMOVehicle(BaseVehicle):
         return float(self._properties.get('dsat_threshold'))
 
 
-    def statistic_series_grid(self, interpolate=False) -> pandas.Series:
+    def grid_series(self, interpolate=False) -> numpy.ndarray:
         '''
-        Recorded travel statistics as `pandas.Series`.
+        Recorded travel statistics as array of shape (metrics, grid cells), metrics ordered as in
+        `StatisticSeries.GRID.metrics()`.
+
+        :note: As vehicles are expected to "jump" over cells while traveling faster than `cell width / time step`,
+          each cell is initialised as `NaN` and missing values are linear interpolated afterwards.
+
+        :param interpolate: return a data copy with NaN values linear interpolated
+        :return: grid-based series as array
+
+        '''
+
+        l_grid_series = numpy.array(self._store.grid_series(self._slot))
+        return colmto.common.statistics.interpolate_nan(l_grid_series) if interpolate else l_grid_series
+
+    def statistic_series_grid(self, interpolate=False) -> 'pandas.Series':
+        '''
+        Recorded travel statistics as `pandas.Series` (see `grid_series`).
 
         :note: To properly store results from SUMO (discrete time vs. "continuous" space), there exists a
           `pandas.Series <https://pandas.pydata.org/pandas-docs/stable/generated/pandas.Series.html>`_
@@ -326,7 +876,9 @@ class SUMOVehicle(BaseVehicle):
 
         '''
 
-        l_grid_based_series = pandas.Series(
+        import pandas  # pylint: disable=import-outside-toplevel
+        return pandas.Series(
+            data=self.grid_series(interpolate).ravel(),
             index=pandas.MultiIndex.from_product(
                 iterables=(
                     (i_metric.value for i_metric in StatisticSeries.GRID.metrics()),
@@ -336,65 +888,103 @@ class SUMOVehicle(BaseVehicle):
             )
         )
 
-        for i_metric in StatisticSeries.GRID.metrics():
-            l_grid_based_series.update(
-                pandas.Series(data=self._grid_based_series_dict.get(i_metric.value))
-            )
-
-        return pandas.concat(
-            (
-                l_grid_based_series[i_metric.value].interpolate()
-                for i_metric in StatisticSeries.GRID.metrics()
-            ),
-            keys=(i_metric.value for i_metric in StatisticSeries.GRID.metrics())
-        ) if interpolate else l_grid_based_series
+    @property
+    def otl_access(self) -> typing.Optional[Behaviour]:
+        '''
+        :return: last actuated overtaking lane (OTL) access, None if access has not been actuated yet
+        '''
+        return self._otl_access
 
-    def allow_otl_access(self, traci: 'traci'=None):
+    def allow_otl_access(self, traci: 'traci'=None, cosmetic: bool = True,
+                         commands: typing.MutableMapping[str, int] = None):
         '''
         Signal the vehicle that overtaking lane (OTL) access has been allowed.
         It is now the vehicle's responsibility to act cooperatively, e.g.
         1. set own class to allow, 2. change colour back to default.
 
+        TraCI commands are only sent on transitions, i.e. if access was not allowed before.
+        Cooperative vehicles release their hold on the right lane by a lane change to their current lane with a
+        duration of 0.
+
         :note: This is the place where cooperative behaviour can be implemented. I.e. 'free will' (TM) starts here.
 
         :param traci: traci control reference
+        :param cosmetic: send cosmetic commands (colour) as well, i.e. only useful if running with GUI
+        :param commands: counters of TraCI commands 'sent' and 'suppressed' to update, if given
         :return: self
         '''
 
+        l_commands = commands if commands is not None and traci else {'sent': 0, 'suppressed': 0}
+
+        if self._otl_access is Behaviour.ALLOW:
+            # colour is still in effect
+            l_commands['suppressed'] += 1
+            return self
+
         self._properties['colour'] = self.normal_colour
         if traci:
-            traci.vehicle.setColor(self.sumo_id, self.colour.as_tuple())
+            if cosmetic:
+                traci.vehicle.setColor(self.sumo_id, self.colour.as_tuple())
+                l_commands['sent'] += 1
+            else:
+                l_commands['suppressed'] += 1
+            if self._otl_access is Behaviour.DENY and self.cooperation_disposition == VehicleDisposition.COOPERATIVE:
+                # release right lane, i.e. stay on current lane for this time step only
+                traci.vehicle.changeLane(self.sumo_id, self._properties.get('lane_index', 0), 0)
+                l_commands['sent'] += 1
+        self._otl_access = Behaviour.ALLOW
         return self
 
-    def deny_otl_access(self, _traci: 'traci' = None) -> BaseVehicle:
+    def deny_otl_access(self, _traci: 'traci' = None, cosmetic: bool = True,
+                        commands: typing.MutableMapping[str, int] = None) -> BaseVehicle:
         '''
         Signal the vehicle that overtaking lane (OTL) access has been denied.
         It is now the vehicle's responsibility to act cooperatively, i.e.
         1. set own class to deny, 2. change colour to red and 3. do a lane change to the right.
 
+        TraCI commands are only sent on transitions, i.e. if access was not denied before.
+        Cooperative vehicles keep to the right lane until access is allowed again, i.e. by one lane change with a
+        duration of `_KEEP_RIGHT_DURATION` instead of a lane change lasting one second at every time step.
+
         :note: This is the place where cooperative behaviour is implemented. Vehicles acting uncooperative won't behave according to rules. I.e. 'free will' (TM) starts here.
 
         :param _traci: traci control reference
+        :param cosmetic: send cosmetic commands (colour) as well, i.e. only useful if running with GUI
+        :param commands: counters of TraCI commands 'sent' and 'suppressed' to update, if given
         :return: self
         '''
 
+        l_commands = commands if commands is not None and _traci else {'sent': 0, 'suppressed': 0}
+
+        if self._otl_access is Behaviour.DENY:
+            # colour and the lane change of cooperative vehicles are still in effect
+            l_commands['suppressed'] += 1 + (self.cooperation_disposition == VehicleDisposition.COOPERATIVE)
+            return self
+
         if self.cooperation_disposition == VehicleDisposition.COOPERATIVE:
             # show that I'm cooperative by painting myself red
             self._properties['colour'] = Colour(255, 0, 0, 255)
-            if _traci:
-                _traci.vehicle.setColor(self.sumo_id, self.colour.as_tuple())
-                # as I'm cooperative, always keep to the right lane
-                _traci.vehicle.changeLane(self.sumo_id, 0, 1)
         else:
             # show that I'm uncooperative by painting myself gray
             self._properties['colour'] = Colour(127, 127, 127, 255)
-            if _traci:
+
+        if _traci:
+            if cosmetic:
                 _traci.vehicle.setColor(self.sumo_id, self.colour.as_tuple())
+                l_commands['sent'] += 1
+            else:
+                l_commands['suppressed'] += 1
+            if self.cooperation_disposition == VehicleDisposition.COOPERATIVE:
+                # as I'm cooperative, keep to the right lane (until access is allowed again)
+                _traci.vehicle.changeLane(self.sumo_id, 0, _KEEP_RIGHT_DURATION)
+                l_commands['sent'] += 1
+        self._otl_access = Behaviour.DENY
         return self
 
     def update(self, position: Position, lane_index: int, speed: float, time_step: float) -> BaseVehicle:
         '''
         Update current properties of vehicle providing data acquired from TraCI call.
+        Use `VehicleStore.update_all` to update all vehicles of a time step at once.
 
         For the grid cell the vehicle is in, take the global position in x-direction divided by grid
         cell size and int-rounded. For the y-coordinate take the lane index.
@@ -409,62 +999,6 @@ class SUMOVehicle(BaseVehicle):
 
         '''
 
-        # update current vehicle properties
-        l_position = Position(*position)
-        assert l_position.x >= 0 and l_position.y >= 0
-        self._properties['position'] = l_position
-        self._properties['grid_position'] = l_position.gridified(width=self._environment.get('gridcellwidth'))
-        assert float(speed) >= 0
-        self._properties['speed']  = float(speed)
-        assert float(time_step) >= 0
-        self._properties['time_step'] = float(time_step)
-        assert float(time_step) >= self.start_time
-        self._properties['travel_time'] = float(time_step) - self.start_time
-        assert int(lane_index) in (0, 1)
-        self._properties['lane_index'] = int(lane_index)
-
-        # vehicle/generic optimal travel time: round positions of division as SUMO reports positions with reduced
-        # accuracy (2 significant figures) to avoid negative travel time losses.
-        l_generic_optimal_travel_time = round(self.position.x / self.speed_max, 2)
+        self._store.update_slots(numpy.array((self._slot,)), (tuple(position),), (lane_index,), (speed,), time_step)
 
-        # Vehicle optimal travel time: include, i.e. substract the start_position as SUMO puts
-        # vehicles at lane positions greater than 0 in their first active time step if they started
-        # between the previous and current global (runtime) time step.
-        l_vehicle_optimal_travel_time = round((self.position.x - self.start_position.x) / self.speed_max, 2)
-        l_vehicle_time_loss = self.travel_time - l_vehicle_optimal_travel_time
-        assert l_vehicle_time_loss >= 0
-
-        self._properties['dissatisfaction'] = colmto.common.model.dissatisfaction(
-            time_loss=l_vehicle_time_loss,
-            optimal_travel_time=l_generic_optimal_travel_time,
-            time_loss_threshold=self.dsat_threshold
-        )
-        assert 0 <= self.dissatisfaction <= 1
-
-        # update data series based on grid cell
-        self._grid_based_series_dict.get(Metric.TIME_STEP.value)[
-            (Metric.TIME_STEP.value, self.grid_position.x)
-        ] = float(time_step)
-        self._grid_based_series_dict.get(Metric.POSITION_Y.value)[
-            (Metric.POSITION_Y.value, self.grid_position.x)
-        ] = self.position.y
-        self._grid_based_series_dict.get(Metric.GRID_POSITION_Y.value)[
-            (Metric.GRID_POSITION_Y.value, self.grid_position.x)
-        ] = self.grid_position.y
-        self._grid_based_series_dict.get(Metric.DISSATISFACTION.value)[
-            (Metric.DISSATISFACTION.value, self.grid_position.x)
-        ] = self.dissatisfaction
-        self._grid_based_series_dict.get(Metric.TRAVEL_TIME.value)[
-            (Metric.TRAVEL_TIME.value, self.grid_position.x)
-        ] = self.travel_time
-        self._grid_based_series_dict.get(Metric.TIME_LOSS.value)[
-            (Metric.TIME_LOSS.value, self.grid_position.x)
-        ] = l_vehicle_time_loss
-        self._grid_based_series_dict.get(Metric.RELATIVE_TIME_LOSS.value)[
-            (Metric.RELATIVE_TIME_LOSS.value, self.grid_position.x)
-        ] = l_vehicle_time_loss / l_generic_optimal_travel_time if l_generic_optimal_travel_time > 0 else 0
-        self._grid_based_series_dict.get(Metric.LANE_INDEX.value)[
-            (Metric.LANE_INDEX.value, self.grid_position.x)
-        ] = self.lane
-
-        return self
\ No newline at end of file
+        return self
@@ -25,254 +25,220 @@
 
 
 import argparse
-from contextlib import ExitStack
+import concurrent.futures
+import multiprocessing
 import os
-import sys
+import typing
 import h5py
 import numpy
 import colmto.common.io
+import colmto.common.model
 from colmto.common.helper import StatisticSeries
 
 
-def aggregate_run_stats_to_hdf5(hdf5_stats, detector_positions):
+# statistics of runs aggregated for each element (e.g. vehicle and cell) of a metric: name -> quantile or None (sum)
+_STATISTICS = {
+    'quantile_25': .25,
+    'median': .5,
+    'quantile_75': .75,
+    'sum': None
+}
+
+
+def _reduce_runs(datasets: typing.Sequence[h5py.Dataset], stacked: bool, chunk_bytes: int) -> typing.Tuple[
+        typing.Tuple[int, ...], int, typing.Iterator[typing.Tuple[slice, typing.Dict[str, numpy.ndarray]]]]:
     '''
-    Aggregates statistics of runs by applying the median.
-    :param hdf5_stats: run stats as a hdf5 object
-    :param detector_positions:
-    :return: updated run_stats dictionary with aggregated stats (key: 'aggregated')
+    Reduce runs to their statistics (see `_STATISTICS`) in blocks of cells, i.e. of the last axis.
+
+    Blocks are aligned to the storage chunks of the datasets, so each (compressed) chunk is read and decompressed
+    once. Memory is bounded by `chunk_bytes` (at least one chunk width of cells of all runs), not by the number of
+    runs. Runs of different shapes are padded with NaN.
+
+    :param datasets: datasets holding one run each, or all runs along their first axis if `stacked`
+    :param stacked: datasets are run-axis datasets (`resultslayout: runaxis`)
+    :param chunk_bytes: upper bound of bytes read per block
+    :return: shape of reduced runs, number of runs and iterator of (cells, statistic -> reduced block of cells)
     '''
 
-    l_aggregated = {
-        'global': {
-            i_view: {
-                i_vtype: {
-                    i_stat: {
-                        'value': numpy.array(
-                            [
-                                i_hdf5_stat[os.path.join(
-                                    i_run, 'global', i_view, i_vtype, i_stat
-                                )] for i_hdf5_stat in hdf5_stats for i_run in i_hdf5_stat
-                            ]
-                        ),
-                        'attr': {
-                            'description': 'global stats of {} of {} {} for each run'.format(
-                                i_view, i_vtype, i_stat
-                            ),
-                            'rows': 'runs',
-                            'columns': '{} of {} {}'.format(i_view, i_vtype, i_stat)
-                        }
-                    } for i_stat in [
-                        'dissatisfaction',
-                        'dissatisfaction_end',
-                        'dissatisfaction_delta',
-                        'time_loss_start',
-                        'time_loss_end',
-                        'time_loss_delta',
-                        'relative_time_loss_start',
-                        'relative_time_loss_end',
-                        'relative_time_loss_delta'
-                    ]
-                } for i_vtype in ['alltypes', 'passenger', 'truck', 'tractor']
-            } for i_view in ['global_stats', 'driver']
-        },
-        'intervals': {
-            '{}-{}'.format(*i_interval): {
-                i_view: {
-                    i_vtype: {
-                        i_stat: {
-                            'value': numpy.array(
-                                [
-                                    i_hdf5_stat[os.path.join(
-                                        i_run,
-                                        'intervals',
-                                        '{}-{}'.format(*i_interval),
-                                        i_view,
-                                        i_vtype,
-                                        i_stat
-                                    )] for i_hdf5_stat in hdf5_stats for i_run in i_hdf5_stat
-                                ]
-                            ),
-                            'attr': {
-                                'description': 'interval [{}, {}] {}'.format(
-                                    i_interval[0],
-                                    i_interval[1],
-                                    'stats of {} of {} {} for each run'.format(
-                                        i_view, i_vtype, i_stat
-                                    ),
-                                ),
-                                'rows': 'runs',
-                                'columns': '{} of {} {}'.format(i_view, i_vtype, i_stat)
-                            }
-                        } for i_stat in [
-                            'dissatisfaction_start',
-                            'dissatisfaction_end',
-                            'dissatisfaction_delta',
-                            'time_loss_start',
-                            'time_loss_end',
-                            'time_loss_delta',
-                            'relative_time_loss_start',
-                            'relative_time_loss_end',
-                            'relative_time_loss_delta'
-                        ]
-                    } for i_vtype in ['alltypes', 'passenger', 'truck', 'tractor']
-                } for i_view in ['global_stats', 'driver']
-            } for i_interval in zip(detector_positions[:-1], detector_positions[1:])
-        }
-    }
-    print('|   |   |   |-- efficiency (global)')
-    l_aggregated['global']['efficiency'] = {}
-    for i_vtype in ['alltypes', 'passenger', 'truck', 'tractor']:
-        if l_aggregated['global']['efficiency'].get(i_vtype) is None:
-            l_aggregated['global']['efficiency'][i_vtype] = {}
-        for i_stat in [
-            'dissatisfaction_start',
-            'dissatisfaction_end',
-            'dissatisfaction_delta',
-            'time_loss_start',
-            'time_loss_end',
-            'time_loss_delta',
-            'relative_time_loss_start',
-            'relative_time_loss_end',
-            'relative_time_loss_delta'
-        ]:
-            l_aggregated['global']['efficiency'][i_vtype][i_stat] = {
-                'value': [
-                    numpy.sum(
-                        i_hdf5_stat[
-                            os.path.join(
-                                i_run, 'global', 'driver', i_vtype, i_stat
-                            )
-                        ]
-                    ) for i_hdf5_stat in hdf5_stats for i_run in i_hdf5_stat
-                ],
-                'attr': {
-                    'description': 'efficiency as sum of {}'.format(i_stat)
-                }
+    l_run_shapes = [i_dataset.shape[1:] if stacked else i_dataset.shape for i_dataset in datasets]
+    l_run_counts = [i_dataset.shape[0] if stacked else 1 for i_dataset in datasets]
+    l_shape = tuple(numpy.max(l_run_shapes, axis=0))
+    l_runs = sum(l_run_counts)
+
+    # cells per block: a multiple of the storage chunk widths (along cells) of all datasets
+    l_chunk_cells = min(
+        int(numpy.lcm.reduce([i_dataset.chunks[-1] if i_dataset.chunks is not None else 1 for i_dataset in datasets])),
+        l_shape[-1]
+    )
+    l_cells = max(
+        1, chunk_bytes // (l_runs * int(numpy.prod(l_shape[:-1], dtype=int)) * 8 * l_chunk_cells)
+    ) * l_chunk_cells
+
+    def blocks():
+        for i_start in range(0, l_shape[-1], l_cells):
+            l_stop = min(i_start + l_cells, l_shape[-1])
+            l_block = numpy.full((l_runs,) + l_shape[:-1] + (l_stop - i_start,), numpy.nan)
+            l_first_run = 0
+            for i_dataset, i_run_shape, i_run_count in zip(datasets, l_run_shapes, l_run_counts):
+                if i_run_shape[-1] > i_start:
+                    l_values = i_dataset[..., i_start:l_stop]
+                    l_block[
+                        (slice(l_first_run, l_first_run + i_run_count),)
+                        + tuple(slice(0, i_size) for i_size in i_run_shape[:-1])
+                        + (slice(0, l_values.shape[-1]),)
+                    ] = l_values if stacked else l_values[numpy.newaxis]
+                l_first_run += i_run_count
+
+            l_quantiles = iter(
+                colmto.common.model.nanquantile(
+                    l_block, [i_quantile for i_quantile in _STATISTICS.values() if i_quantile is not None]
+                )
+            )
+            yield slice(i_start, l_stop), {
+                i_statistic: numpy.nansum(l_block, axis=0) if i_quantile is None else next(l_quantiles)
+                for i_statistic, i_quantile in _STATISTICS.items()
             }
 
-    print('|   |   |   |-- efficiency {}'.format(detector_positions))
-    for i_interval in zip(detector_positions[:-1], detector_positions[1:]):
-        l_aggregated['intervals']['{}-{}'.format(*i_interval)]['efficiency'] = {}
-        for i_vtype in ['alltypes', 'passenger', 'truck', 'tractor']:
-            if l_aggregated[
-                    'intervals'
-            ]['{}-{}'.format(*i_interval)]['efficiency'].get(i_vtype) is None:
-                l_aggregated[
-                    'intervals'
-                ]['{}-{}'.format(*i_interval)]['efficiency'][i_vtype] = {}
-            for i_stat in [
-                'dissatisfaction_start',
-                'dissatisfaction_end',
-                'dissatisfaction_delta',
-                'time_loss_start',
-                'time_loss_end',
-                'time_loss_delta',
-                'relative_time_loss_start',
-                'relative_time_loss_end',
-                'relative_time_loss_delta'
-            ]:
-                l_aggregated[
-                        'intervals']['{}-{}'.format(*i_interval)]['efficiency'][i_vtype][i_stat] = {
-                    'value': [
-                        numpy.sum(
-                            i_hdf5_stat[os.path.join(
-                                i_run,
-                                'intervals',
-                                '{}-{}'.format(*i_interval),
-                                'driver',
-                                i_vtype,
-                                i_stat
-                            )]
-                        ) for i_hdf5_stat in hdf5_stats for i_run in i_hdf5_stat
-                    ],
-                    'attr': {
-                        'description': 'efficiency as sum of {}'.format(i_stat)
+    return l_shape, l_runs, blocks()
+
+
+def aggregate_runs(input_file: str, group_path: str, part_file: str, chunk_bytes: int) -> str:
+    '''
+    Aggregate all runs of one (scenario, aadt, ordering) group of an input file into a part file.
+
+    For each vehicle type and metric, blocks of cells are read across all runs and reduced to median, quartiles and
+    sum along the run axis (see `_reduce_runs`), with HDF5's chunk cache disabled. Runs are read from either layout:
+
+    * one group per run (default): `run/grid_based_series/vtype/metric` of shape (vehicles, cells) or
+    * run-axis datasets (`resultslayout: runaxis`): `vtype/grid_based_series` of shape (runs, metrics, vehicles,
+      cells), with metric names in its `metrics` attribute, reduced along its first axis.
+
+    :param input_file: input HDF5 file
+    :param group_path: path of group containing runs, i.e. `scenario/aadt/ordering`
+    :param part_file: HDF5 file aggregated datasets are written to at `group_path/vtype/metric/statistic`
+    :param chunk_bytes: upper bound of bytes read per chunk
+    :return: part file
+    '''
+
+    with h5py.File(input_file, 'r', rdcc_nbytes=0) as f_input, h5py.File(part_file, 'w') as f_part:
+        l_group = f_input[group_path]
+        l_children = list(l_group.keys())
+
+        if isinstance(l_group[l_children[0]].get(StatisticSeries.GRID.value), h5py.Dataset):
+            # run-axis layout: all metrics of a vehicle type are stacked along axis 1, reduce them at once
+            for i_vtype in l_children:
+                l_dataset = l_group[i_vtype].get(StatisticSeries.GRID.value)
+                if not isinstance(l_dataset, h5py.Dataset):
+                    raise ValueError(
+                        f'{input_file}: {group_path}/{i_vtype} has no run-axis dataset {StatisticSeries.GRID.value}'
+                    )
+                l_shape, l_runs, l_blocks = _reduce_runs([l_dataset], True, chunk_bytes)
+                l_aggregated = {}
+                for i_index, i_metric in enumerate(l_dataset.attrs['metrics']):
+                    l_output = f_part.require_group(f'{group_path}/{i_vtype}/{i_metric}')
+                    l_output.attrs['description'] = l_dataset.attrs['descriptions'][i_index]
+                    l_output.attrs['runs'] = l_runs
+                    l_aggregated[i_index] = {
+                        i_statistic: l_output.create_dataset(
+                            i_statistic, shape=l_shape[1:], dtype=float, fillvalue=numpy.nan,
+                            **colmto.common.io.HDF5_DATASET_OPTIONS
+                        ) for i_statistic in _STATISTICS
                     }
+                for i_cells, i_statistics in l_blocks:
+                    for i_index, i_outputs in l_aggregated.items():
+                        for i_statistic, i_values in i_statistics.items():
+                            i_outputs[i_statistic][..., i_cells] = i_values[i_index]
+            return part_file
+
+        l_first_run = l_group[f'{l_children[0]}/{StatisticSeries.GRID.value}']
+        for i_vtype in l_first_run.keys():
+            for i_metric in l_first_run[i_vtype].keys():
+                l_datasets = [
+                    l_group[f'{i_run}/{StatisticSeries.GRID.value}/{i_vtype}/{i_metric}'] for i_run in l_children
+                ]
+                if l_datasets[0].ndim == 0:
+                    continue
+
+                l_shape, l_runs, l_blocks = _reduce_runs(l_datasets, False, chunk_bytes)
+                l_output = f_part.require_group(f'{group_path}/{i_vtype}/{i_metric}')
+                l_output.attrs.update(l_datasets[0].attrs)
+                l_output.attrs['runs'] = l_runs
+                l_aggregated = {
+                    i_statistic: l_output.create_dataset(
+                        i_statistic, shape=l_shape, dtype=float, fillvalue=numpy.nan,
+                        **colmto.common.io.HDF5_DATASET_OPTIONS
+                    ) for i_statistic in _STATISTICS
                 }
+                for i_cells, i_statistics in l_blocks:
+                    for i_statistic, i_values in i_statistics.items():
+                        l_aggregated[i_statistic][..., i_cells] = i_values
 
-    return l_aggregated
+    return part_file
 
 
 def main(args):
     '''
     Main function
+
+    Aggregates independent (scenario, aadt, ordering) groups in a pool of spawned worker processes, each writing into a
+    part file next to the output file. Finished parts are copied into the output file by this process and removed.
+    Groups found in more than one input file or already present in the output file are rejected before aggregating.
+
     :param args: cmdline arguments
     '''
-    l_writer = colmto.common.io.Writer()
-
-    print('opening input/output HDF5s')
-    with ExitStack() as f_stack:
-        print(' input:', '\n\t'.join(args.input_files), sep=' ')
-        print('output:', args.output_file)
-        l_inputs = [f_stack.enter_context(h5py.File(i_fname, 'r')) for i_fname in args.input_files]
-        l_output = f_stack.enter_context(h5py.File(args.output_file, 'a', libver='latest'))
-
-        print('aggregating data...')
-        for i_input in l_inputs:
-            for i_scenario in i_input.keys():
-                print(f'|-- {i_scenario}')
-
-                l_aadts = [i_aadt for i_aadt in i_input[i_scenario].keys()]
-                if not l_aadts:
-                    print('No aadt dirs found!')
-                    return
-
-                for i_aadt in l_aadts:
-                    print(f'|   |-- {i_aadt}')
-                    l_orderings = list(i_input[f'{i_scenario}/{i_aadt}'].keys())
-                    if not l_orderings:
-                        print('No ordering dirs found!')
-                        return
-
-                    for i_ordering in l_orderings:
-                        l_runs = list(i_input[f'{i_scenario}/{i_aadt}/{i_ordering}'].keys())
-
-                        print(f'|   |   |-- {i_ordering} ({len(l_runs)} runs)')
-                        l_vtypes = list(i_input[f'{i_scenario}/{i_aadt}/{i_ordering}/0/{StatisticSeries.GRID.value}'].keys())
-                        for i_vtype in l_vtypes:
-                            print(f'|   |   |   |-- {i_vtype}')
-                            l_metrics = list(i_input[f'{i_scenario}/{i_aadt}/{i_ordering}/0/{StatisticSeries.GRID.value}/{i_vtype}'].keys())
-
-                            for i_metric in l_metrics:
-                                print(f'|   |   |   |   |-- {i_metric}')
-                                l_output[f'{i_scenario}/{i_aadt}/{i_ordering}/{i_vtype}/{i_metric}'] = numpy.array([i_input[f'{i_scenario}/{i_aadt}/{i_ordering}/{i_run}/{StatisticSeries.GRID.value}/{i_vtype}/{i_metric}'] for i_run in l_runs])
-
-
-        #             l_runs = list(f_hdf5_input.values())[0][
-        #                 os.path.join(i_scenario, i_aadt, i_ordering)
-        #             ].keys()
-        #             l_intervals = list(f_hdf5_input.values())[0][os.path.join(
-        #                 i_scenario,
-        #                 i_aadt,
-        #                 i_ordering,
-        #                 l_runs[0],
-        #                 'intervals'
-        #             )].keys()
-        #             l_detector_positions = sorted(
-        #                 set(
-        #                     [
-        #                         e for tupl in [
-        #                             (int(i.split('-')[0]), int(i.split('-')[1])) for i in l_intervals
-        #                         ] for e in tupl
-        #                     ]
-        #                 )
-        #             )
-        #             print('|   |   |-- {} {}'.format(i_ordering, l_detector_positions))
-
-        #             l_writer.write_hdf5(
-        #                 aggregate_run_stats_to_hdf5(
-        #                     [
-        #                         i_hdf5_input[os.path.join(i_scenario, i_aadt, i_ordering)]
-        #                         for i_hdf5_input in f_hdf5_input.values()
-        #                     ],
-        #                     l_detector_positions
-        #                 ),
-        #                 hdf5_file=args[-1],
-        #                 hdf5_base_path=os.path.join(i_scenario, str(i_aadt), i_ordering),
-        #                 compression='gzip',
-        #                 compression_opts=9,
-        #                 fletcher32=True
-        #             )
+
+    print('collecting run groups')
+    l_groups = {}
+    for i_input_file in args.input_files:
+        with h5py.File(i_input_file, 'r') as f_input:
+            for i_scenario in [i_scenario for i_scenario in f_input.keys() if args.root in (None, i_scenario)]:
+                for i_aadt in f_input[i_scenario].keys():
+                    for i_ordering in f_input[f'{i_scenario}/{i_aadt}'].keys():
+                        l_group_path = f'{i_scenario}/{i_aadt}/{i_ordering}'
+                        if l_group_path in l_groups:
+                            raise ValueError(
+                                f'{l_group_path} found in {l_groups.get(l_group_path)} and {i_input_file}, '
+                                f'aggregate runs of one group from a single (merged) input file'
+                            )
+                        l_groups[l_group_path] = i_input_file
+                        print(f'|-- {i_input_file}: {l_group_path}')
+
+    if os.path.isfile(args.output_file):
+        with h5py.File(args.output_file, 'r') as f_output:
+            l_existing = [i_group_path for i_group_path in l_groups if i_group_path in f_output]
+        if l_existing:
+            raise ValueError(f'{args.output_file} already contains {", ".join(l_existing)}')
+
+    if args.dryrun or not l_groups:
+        return
+
+    print(f'aggregating {len(l_groups)} groups with {args.jobs} worker processes into {args.output_file} ...')
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.jobs, mp_context=multiprocessing.get_context('spawn')
+    ) as f_executor:
+        l_pending = {
+            f_executor.submit(
+                aggregate_runs,
+                i_input_file,
+                i_group_path,
+                f'{args.output_file}.part{i_index}',
+                args.chunk_bytes
+            ): i_group_path for i_index, (i_group_path, i_input_file) in enumerate(l_groups.items())
+        }
+
+        with h5py.File(args.output_file, 'a', libver='latest') as f_output:
+            for i_future in concurrent.futures.as_completed(l_pending):
+                l_group_path = l_pending.get(i_future)
+                l_part_file = i_future.result()
+                with h5py.File(l_part_file, 'r') as f_part:
+                    f_part.copy(
+                        source=l_group_path,
+                        dest=f_output.require_group(os.path.dirname(l_group_path)),
+                        name=os.path.basename(l_group_path)
+                    )
+                os.remove(l_part_file)
+                print(f'|-- {l_group_path} done')
+
 
 if __name__ == '__main__':
     l_parser = argparse.ArgumentParser(
@@ -297,8 +263,22 @@ if __name__ == '__main__':
         '--root',
         dest='root',
         type=str,
-        default='NI-B210',
-        help='Root dir element.'
+        default=None,
+        help='Root group, i.e. scenario, to aggregate, all if omitted.'
+    )
+    l_parser.add_argument(
+        '-j', '--jobs',
+        dest='jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of worker processes aggregating (scenario, aadt, ordering) groups in parallel.'
+    )
+    l_parser.add_argument(
+        '--chunk-bytes',
+        dest='chunk_bytes',
+        type=int,
+        default=2**26,
+        help='Upper bound of bytes each worker reads at once, i.e. cells of all runs of a metric.'
     )
     l_parser.add_argument(
         '-d', '--dry-run',
@@ -25,6 +25,7 @@
 import argparse
 from contextlib import ExitStack
 import h5py
+import colmto.common.io
 
 
 def main(args):
@@ -42,11 +43,19 @@ def main(args):
         f_output_file = f_stack.enter_context(h5py.File(args.output_file, 'a', libver='latest'))
         for i_fin in l_input_files:
             for i_aadt in i_fin[args.root].keys():
-                if not args.dryrun:
+                if args.dryrun:
+                    print(f'would {"link" if args.virtual else "copy"} {args.root}/{i_aadt} to {f_output_file}')
+                elif args.virtual:
+                    print(f'link {args.root}/{i_aadt} to {f_output_file}')
+                    colmto.common.io.Writer.link_hdf5_virtual(i_fin[f'{args.root}/{i_aadt}'], f_output_file, i_aadt)
+                else:
                     print(f'copy {args.root}/{i_aadt} to {f_output_file}')
                     i_fin.copy(source=f'{args.root}/{i_aadt}', dest=f_output_file)
-                else:
-                    print(f'would copy {args.root}/{i_aadt} to {f_output_file}')
+
+    if args.materialize and not args.dryrun:
+        print(f'materializing virtual datasets in {args.output_file}')
+        with h5py.File(args.output_file, 'a', libver='latest') as f_output_file:
+            colmto.common.io.Writer.materialize_hdf5_virtual(f_output_file, **colmto.common.io.HDF5_DATASET_OPTIONS)
 
 if __name__ == '__main__':
     l_parser = argparse.ArgumentParser(
@@ -80,5 +89,19 @@ if __name__ == '__main__':
         action='store_true',
         default=False
     )
+    l_parser.add_argument(
+        '--virtual',
+        dest='virtual',
+        action='store_true',
+        default=False,
+        help='Link AADTs as virtual datasets mapping onto the input files instead of copying data.'
+    )
+    l_parser.add_argument(
+        '--materialize',
+        dest='materialize',
+        action='store_true',
+        default=False,
+        help='Copy the data of all virtual datasets in the output file, e.g. to ship it without its input files.'
+    )
 
     main(l_parser.parse_args())
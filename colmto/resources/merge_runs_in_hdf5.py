@@ -30,9 +30,14 @@ import os
 import sys
 import h5py
 import numpy
+import colmto.common.io
 from colmto.common.helper import StatisticSeries
 
 
+# options of merged datasets
+_DATASET_OPTIONS = dict(colmto.common.io.HDF5_DATASET_OPTIONS, shuffle=True, chunks=True, track_times=True)
+
+
 def main(args):
     '''
     Main function
@@ -74,17 +79,26 @@ def main(args):
 
                             for i_metric in l_metrics:
                                 print(f'|   |   |   |   |-- {i_metric}')
+                                if args.virtual:
+                                    # map runs onto the input file instead of copying them
+                                    colmto.common.io.Writer.stack_hdf5_virtual(
+                                        [i_input[f'{i_scenario}/{i_aadt}/{i_ordering}/{i_run}/{StatisticSeries.GRID.value}/{i_vtype}/{i_metric}'] for i_run in l_runs],
+                                        l_output,
+                                        f'{i_scenario}/{i_aadt}/{i_ordering}/{i_vtype}/{i_metric}'
+                                    ).attrs['runs'] = l_runs
+                                    continue
                                 l_output.create_dataset(
                                     f'{i_scenario}/{i_aadt}/{i_ordering}/{i_vtype}/{i_metric}',
                                     data=numpy.array([i_input[f'{i_scenario}/{i_aadt}/{i_ordering}/{i_run}/{StatisticSeries.GRID.value}/{i_vtype}/{i_metric}'] for i_run in l_runs]),
-                                    compression='gzip',
-                                    compression_opts=9,
-                                    fletcher32=True,
-                                    shuffle=True,
-                                    chunks=True,
-                                    track_times=True
+                                    **_DATASET_OPTIONS
                                     )
 
+    if args.materialize:
+        print(f'materializing virtual datasets in {args.output_file} ...')
+        with h5py.File(args.output_file, 'a', libver='latest') as f_output:
+            print(f'{colmto.common.io.Writer.materialize_hdf5_virtual(f_output, **_DATASET_OPTIONS)} datasets copied')
+
+
 if __name__ == '__main__':
     l_parser = argparse.ArgumentParser(
         prog='merge_runs_in_hdf5.py',
@@ -104,6 +118,20 @@ if __name__ == '__main__':
         type=str,
         required=True
     )
+    l_parser.add_argument(
+        '--virtual',
+        dest='virtual',
+        action='store_true',
+        default=False,
+        help='Merge into virtual datasets mapping onto the input files instead of copying data.'
+    )
+    l_parser.add_argument(
+        '--materialize',
+        dest='materialize',
+        action='store_true',
+        default=False,
+        help='Copy the data of all virtual datasets in the output file, e.g. to ship it without its input files.'
+    )
     l_parser.add_argument(
         '--root',
         dest='root',
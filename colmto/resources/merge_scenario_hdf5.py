@@ -24,23 +24,49 @@
 '''Configuration super class.'''
 
 
-
-import sys
+import argparse
 import h5py
+import colmto.common.io
 
 
-def main(argv):
+def main(args):
     '''
     main
-    :param argv: cmdline args
+    :param args: cmdline args
     '''
-    if len(sys.argv) != 3:
-        print('Usage: merge_scenario_hdf5.py hdf5-input-file hdf5-output-file')
-        return
 
-    with h5py.File(argv[1], 'r') as f_src, h5py.File(argv[2], 'a', libver='latest') as f_dest:
+    with h5py.File(args.input_file, 'r') as f_src, h5py.File(args.output_file, 'a', libver='latest') as f_dest:
         for i_key in f_src:
-            f_src.copy(source=i_key, dest=f_dest)
+            if args.virtual:
+                colmto.common.io.Writer.link_hdf5_virtual(f_src[i_key], f_dest, i_key)
+            else:
+                f_src.copy(source=i_key, dest=f_dest)
+
+    if args.materialize:
+        with h5py.File(args.output_file, 'a', libver='latest') as f_dest:
+            colmto.common.io.Writer.materialize_hdf5_virtual(f_dest, **colmto.common.io.HDF5_DATASET_OPTIONS)
 
 if __name__ == '__main__':
-    main(sys.argv)
+    l_parser = argparse.ArgumentParser(
+        prog='merge_scenario_hdf5.py',
+        description='Merge scenarios of a CoLMTO result HDF5 into another HDF5 file.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    l_parser.add_argument('input_file', type=str, help='hdf5 input file')
+    l_parser.add_argument('output_file', type=str, help='hdf5 output file')
+    l_parser.add_argument(
+        '--virtual',
+        dest='virtual',
+        action='store_true',
+        default=False,
+        help='Link scenarios as virtual datasets mapping onto the input file instead of copying data.'
+    )
+    l_parser.add_argument(
+        '--materialize',
+        dest='materialize',
+        action='store_true',
+        default=False,
+        help='Copy the data of all virtual datasets in the output file, e.g. to ship it without its input file.'
+    )
+
+    main(l_parser.parse_args())
@@ -29,10 +29,15 @@ import subprocess
 import sys
 import typing
 
+import numpy
+
 from colmto.environment.vehicle import SUMOVehicle
+from colmto.environment.vehicle import VehicleStore
 
 import colmto.common.io
 import colmto.common.log
+import colmto.common.statistics
+import colmto.common.timing
 import colmto.cse.cse
 import colmto.cse.rule
 
@@ -54,6 +59,36 @@ class Runtime(object):
         self._sumo_binary = sumo_binary
         self._log = colmto.common.log.logger(__name__, args.loglevel, args.quiet, args.logfile)
 
+    def backend(self):
+        '''
+        Resolve the module implementing the TraCI API as configured by `sumo.backend` in the run configuration.
+
+        `traci` talks to a SUMO process via a TCP socket, `libsumo` runs SUMO in-process with the same API and
+        therefore avoids serialisation and socket latency of each command and subscription fetch.
+        As libsumo can not drive sumo-gui, GUI runs fall back to traci.
+
+        :return: traci or libsumo module
+        '''
+
+        l_backend = self._sumo_config.sumo_run_config.get('backend', 'traci')
+
+        if l_backend == 'traci':
+            return traci
+
+        if l_backend != 'libsumo':
+            raise ValueError(f'Unknown SUMO backend {l_backend}, choose one of traci, libsumo.')
+
+        if not self._sumo_config.sumo_run_config.get('headless'):
+            self._log.warning('libsumo does not support running with GUI, falling back to traci')
+            return traci
+
+        try:
+            import libsumo  # pylint: disable=import-outside-toplevel
+        except ImportError:  # pragma: no cover
+            raise ImportError('libsumo backend requested, but libsumo is not available in $SUMO_HOME/tools')
+
+        return libsumo
+
     def run_standalone(self, run_config: dict):
         '''
         Run provided scenario in one shot.
@@ -85,7 +120,9 @@ class Runtime(object):
             l_sumoprocess.decode('utf8').replace('\n', '')
         )
 
-    def run_traci(self, run_config: dict, cse: colmto.cse.cse.SumoCSE) -> typing.Dict[str, SUMOVehicle]:
+    def run_traci(self, run_config: dict, cse: colmto.cse.cse.SumoCSE, label: str = 'default',  # pylint: disable=too-many-arguments
+                  port: typing.Optional[int] = None, timer: typing.Optional[colmto.common.timing.PhaseTimer] = None
+                  ) -> colmto.common.statistics.VehicleSeriesAccumulator:
         '''
         Run provided scenario with TraCI by providing a ref to an optimisation entity and execute the CSE protocol.
 
@@ -97,60 +134,70 @@ class Runtime(object):
 
         :param run_config: run configuration
         :param cse: central optimisation entity instance of colmto.cse.cse.SumoCSE
+        :param label: TraCI connection label, distinct for concurrently running simulations
+        :param port: TraCI port, None to pick a free one
+        :param timer: timer of the phases of each time step (see `colmto.common.timing.STEP_PHASES`), None disables
+            timing
 
-        :return: list of vehicles, containing travel stats
+        :return: accumulator of grid-based series of all departed vehicles (see `Statistics.merge_vehicle_series`)
         '''
 
         if not isinstance(cse, colmto.cse.cse.SumoCSE):
             raise AttributeError('Provided CSE object is not of type SumoCSE.')
 
-        self._log.debug('starting sumo process')
+        l_traci = self.backend()
+        l_timer = timer if timer is not None else colmto.common.timing.NULL_TIMER
+
+        self._log.debug('starting sumo process (%s)', l_traci.__name__)
         self._log.debug('CSE %s with rules %s', cse, cse.rules)
-        l_traci_start = traci.start(
+        # libsumo only accepts a list of str as command line
+        l_traci.start(
             [
-                self._sumo_binary,
-                '-c', run_config.get('configfile'),
-                '--gui-settings-file', run_config.get('settingsfile'),
+                str(self._sumo_binary),
+                '-c', str(run_config.get('configfile')),
+                '--gui-settings-file', str(run_config.get('settingsfile')),
                 '--time-to-teleport', '-1',
                 '--no-step-log'
-            ]
+            ],
+            port=port,
+            label=label
         )
 
         self._log.debug('subscribing to TraCI')
 
         # subscribe to global simulation vars
-        traci.simulation.subscribe(
+        l_traci.simulation.subscribe(
             (
-                traci.constants.VAR_TIME_STEP,
-                traci.constants.VAR_DEPARTED_VEHICLES_IDS,
-                traci.constants.VAR_ARRIVED_VEHICLES_IDS,
-                traci.constants.VAR_MIN_EXPECTED_VEHICLES,
+                l_traci.constants.VAR_TIME_STEP,
+                l_traci.constants.VAR_DEPARTED_VEHICLES_IDS,
+                l_traci.constants.VAR_ARRIVED_VEHICLES_IDS,
+                l_traci.constants.VAR_MIN_EXPECTED_VEHICLES,
             )
         )
 
         # subscribe to lane stats to allow CSE to 'observe' traffic
-        traci.lane.subscribe(
+        l_traci.lane.subscribe(
             '21edge_0',
             (
-                traci.constants.LAST_STEP_OCCUPANCY,
+                l_traci.constants.LAST_STEP_OCCUPANCY,
             )
         )
-        traci.lane.subscribe(
+        l_traci.lane.subscribe(
             '21edge_1',
             (
-                traci.constants.LAST_STEP_OCCUPANCY,
+                l_traci.constants.LAST_STEP_OCCUPANCY,
             )
         )
 
-        # provide CSE with traci reference
-        cse.traci(traci)
+        # provide CSE with traci reference, cosmetic commands are only sent if running with GUI
+        cse.traci(l_traci, cosmetic=not self._sumo_config.sumo_run_config.get('headless'))
 
-        # add polygon of otl denied positions if --gui enabled
+        # add polygon of otl denied positions if running with GUI
         # and cse contains instance objects of colmto.cse.rule.SUMOPositionRule
-        if self._args.gui:
+        if not self._sumo_config.sumo_run_config.get('headless'):
             for i_rule in cse.rules:
                 if isinstance(i_rule, colmto.cse.rule.SUMOPositionRule):
-                    traci.polygon.add(
+                    l_traci.polygon.add(
                         polygonID=str(i_rule),
                         shape=(
                             (i_rule.bounding_box.p1.x, 2 * (i_rule.bounding_box.p1.y) + 10),
@@ -162,68 +209,104 @@ class Runtime(object):
                         fill=True,
                     )
 
+        # vehicles of a run share one columnar store, see SumoConfig._create_vehicle_distribution
+        l_vehicle_store = VehicleStore.of(run_config.get('vehicles').values())
+        # series of arrived vehicles, vehicles which never departed are not collected
+        l_accumulator = colmto.common.statistics.VehicleSeriesAccumulator()
+        l_departed_vehicle_ids = set()
+
         # initial fetch of subscription results
-        l_simulation_subscription_results = traci.simulation.getSubscriptionResults()
+        l_simulation_subscription_results = l_traci.simulation.getSubscriptionResults()
+        l_timer.lap()
 
         # main loop through traci driven simulation runs
-        while l_simulation_subscription_results.get(traci.constants.VAR_MIN_EXPECTED_VEHICLES) > 0:
+        while l_simulation_subscription_results.get(l_traci.constants.VAR_MIN_EXPECTED_VEHICLES) > 0:
+
+            # collect and release vehicles arrived in previous time step
+            self._collect_vehicles(
+                run_config.get('vehicles'),
+                l_simulation_subscription_results.get(l_traci.constants.VAR_ARRIVED_VEHICLES_IDS),
+                l_vehicle_store,
+                l_accumulator
+            )
+            l_departed_vehicle_ids.difference_update(
+                l_simulation_subscription_results.get(l_traci.constants.VAR_ARRIVED_VEHICLES_IDS)
+            )
+            l_timer.lap('collect')
 
             # set initial attribute start_time of newly entering vehicles
             # and subscribe to parameters
-            for i_vehicle_id in l_simulation_subscription_results.get(traci.constants.VAR_DEPARTED_VEHICLES_IDS):
+            l_departed_vehicle_ids.update(
+                l_simulation_subscription_results.get(l_traci.constants.VAR_DEPARTED_VEHICLES_IDS)
+            )
+            for i_vehicle_id in l_simulation_subscription_results.get(l_traci.constants.VAR_DEPARTED_VEHICLES_IDS):
                 # set TraCI -> vehicle.start_time
-                run_config.get('vehicles').get(i_vehicle_id).start_time = l_simulation_subscription_results.get(traci.constants.VAR_TIME_STEP)/1000.
+                run_config.get('vehicles').get(i_vehicle_id).start_time = l_simulation_subscription_results.get(l_traci.constants.VAR_TIME_STEP)/1000.
                 # subscribe to parameters
-                traci.vehicle.subscribe(
+                l_traci.vehicle.subscribe(
                     i_vehicle_id, (
-                        traci.constants.VAR_POSITION,
-                        traci.constants.VAR_LANE_INDEX,
-                        traci.constants.VAR_VEHICLECLASS,
-                        traci.constants.VAR_MAXSPEED,
-                        traci.constants.VAR_SPEED
+                        l_traci.constants.VAR_POSITION,
+                        l_traci.constants.VAR_LANE_INDEX,
+                        l_traci.constants.VAR_VEHICLECLASS,
+                        l_traci.constants.VAR_MAXSPEED,
+                        l_traci.constants.VAR_SPEED
                     )
                 )
                 # set TraCI -> vehicle.start_position
-                run_config.get('vehicles').get(i_vehicle_id).start_position = traci.vehicle.getSubscriptionResults(i_vehicle_id).get(traci.constants.VAR_POSITION)
-
+                run_config.get('vehicles').get(i_vehicle_id).start_position = l_traci.vehicle.getSubscriptionResults(i_vehicle_id).get(l_traci.constants.VAR_POSITION)
+            l_timer.lap('departures')
 
             # retrieve vehicle subscription results
-            l_vehicle_subscription_results = traci.vehicle.getSubscriptionResults()
-
-            # retrieve results and update vehicle objects
-            for i_vehicle_id, i_results in l_vehicle_subscription_results.items():
-                # update vehicle position, speed and pass timestep to let vehicle calculate statistics
-                run_config.get('vehicles').get(i_vehicle_id).update(
-                    i_results.get(traci.constants.VAR_POSITION),
-                    i_results.get(traci.constants.VAR_LANE_INDEX),
-                    i_results.get(traci.constants.VAR_SPEED),
-                    l_simulation_subscription_results.get(traci.constants.VAR_TIME_STEP)/1000.
-                )
+            l_vehicle_subscription_results = l_traci.vehicle.getAllSubscriptionResults()
+            l_timer.lap('subscriptions')
+
+            # update position, lane, speed of all vehicles at once and pass time step to let them calculate statistics
+            l_vehicle_store.update_all(
+                tuple(l_vehicle_subscription_results),
+                [i_results.get(l_traci.constants.VAR_POSITION) for i_results in l_vehicle_subscription_results.values()],
+                [i_results.get(l_traci.constants.VAR_LANE_INDEX) for i_results in l_vehicle_subscription_results.values()],
+                [i_results.get(l_traci.constants.VAR_SPEED) for i_results in l_vehicle_subscription_results.values()],
+                l_simulation_subscription_results.get(l_traci.constants.VAR_TIME_STEP)/1000.
+            )
+
+            # vehicles present in current time step
+            l_vehicles = [run_config.get('vehicles').get(i_vehicle_id) for i_vehicle_id in l_vehicle_subscription_results]
+            l_timer.lap('update')
 
             # BEGIN CSE protocol
             # 1. CSE observes traffic
             cse.observe_traffic(
-                traci.lane.getSubscriptionResults(),
+                l_traci.lane.getAllSubscriptionResults(),
                 l_vehicle_subscription_results,
                 run_config.get('vehicles')
             )
+            l_timer.lap('observe')
             # 2. apply active policy, i.e. rules on vehicles:
             # Tell CSE to tell vehicles whether they are allowed to use OTL or not
-            for i_vehicle_id in l_vehicle_subscription_results:
-                cse.apply_one(run_config.get('vehicles').get(i_vehicle_id))
+            cse.apply(l_vehicles)
             # END CSE protocol
+            l_timer.lap('apply')
 
-            traci.simulationStep()
+            l_traci.simulationStep()
+            l_timer.lap('sumo')
 
             # fetch new results for next simulation step/cycle
-            l_simulation_subscription_results = traci.simulation.getSubscriptionResults()
+            l_simulation_subscription_results = l_traci.simulation.getSubscriptionResults()
+            l_timer.lap('simulation').step()
+
+        l_traci.close()
 
-        traci.close()
+        # vehicles arrived in last time step or still on the road
+        self._collect_vehicles(run_config.get('vehicles'), l_departed_vehicle_ids, l_vehicle_store, l_accumulator)
 
         self._log.info(
             'TraCI run of scenario %s, run %d completed.',
             run_config.get('scenarioname'), run_config.get('runnumber')
         )
+        self._log.info(
+            'TraCI commands sent to vehicles: %d, suppressed: %d',
+            cse.commands.get('sent'), cse.commands.get('suppressed')
+        )
         if self._args is not None and self._args.writefulloccupancies:
             self._log.info(
                 'Writing occupancy stats to %s',
@@ -234,6 +317,26 @@ class Runtime(object):
                 self._sumo_config.resultsdir/f'occupancy-{run_config.get("runnumber")}-{run_config.get("initialsorting")}.json'
             )
 
-        return run_config.get('vehicles')
+        return l_accumulator
+
+    @staticmethod
+    def _collect_vehicles(vehicles: typing.Dict[str, SUMOVehicle], vehicle_ids: typing.Iterable[str],
+                          store: VehicleStore, accumulator: colmto.common.statistics.VehicleSeriesAccumulator):
+        '''
+        Fold series of finished, i.e. arrived vehicles into accumulator and release their state, i.e. their rows of
+        grid-based series in the store and their vehicle objects. SUMO drops subscriptions of arrived vehicles itself.
+
+        :param vehicles: named dictionary of vehicles of run, finished vehicles get removed
+        :param vehicle_ids: ids of finished vehicles
+        :param store: store of vehicles
+        :param accumulator: accumulator of run
+        '''
+
+        l_vehicles = {i_vehicle_id: vehicles.pop(i_vehicle_id) for i_vehicle_id in vehicle_ids if i_vehicle_id in vehicles}
+        if l_vehicles:
+            accumulator.add(l_vehicles)
+            store.release(
+                numpy.fromiter((i_vehicle.slot for i_vehicle in l_vehicles.values()), dtype=int, count=len(l_vehicles))
+            )
 
     # pylint: enable=too-few-public-methods
@@ -25,7 +25,10 @@
 # pylint: disable=no-member
 
 import copy
+import itertools
+import os
 from pathlib import Path
+import shutil
 import subprocess
 from types import MappingProxyType
 import typing
@@ -42,6 +45,8 @@ except ImportError:
 from colmto.common.helper import Colour
 from colmto.common.helper import Distribution
 from colmto.common.helper import InitialSorting
+from colmto.common.helper import VehicleDisposition
+import colmto.common.cache
 import colmto.common.configuration
 import colmto.common.io
 import colmto.common.log
@@ -66,6 +71,9 @@ class SumoConfig(colmto.common.configuration.Configuration):
             'netconvert': netconvertbinary,
             'duarouter': duarouterbinary
         }
+        self._netconvert_version = None
+        self._routes = {}  # map net file -> single path route, see single_path_route
+        self._scenarios = {}  # map scenario name -> scenario runs, i.e. scenarios are built once per sweep
 
         self.sumo_config_dir.mkdir(parents=True, exist_ok=True)
         self.runsdir.mkdir(parents=True, exist_ok=True)
@@ -108,7 +116,19 @@ class SumoConfig(colmto.common.configuration.Configuration):
         )
 
     def generate_scenario(self, scenarioname):
-        '''generate SUMO scenario based on scenario name'''
+        '''
+        Generate SUMO scenario based on scenario name once per sweep, i.e. later calls return the same scenario.
+
+        Node, edge and settings files are generated into the runs directory. The net file is taken from the
+        scenario cache (see `scenario_cache`) by a key of these files and the netconvert version, and only built
+        with netconvert if missing or with `--force-rebuild-scenarios`.
+
+        :param scenarioname: scenario name
+        :return: scenario runs, i.e. scenario name and files
+        '''
+
+        if scenarioname in self._scenarios:
+            return self._scenarios.get(scenarioname)
 
         self._log.debug('Generating scenario %s', scenarioname)
 
@@ -128,21 +148,72 @@ class SumoConfig(colmto.common.configuration.Configuration):
         l_settingsfile = l_scenarioruns['settingsfile'] = l_destinationdir \
                                                           / f'{scenarioname}.settings.xml'
 
+        l_cache = self.scenario_cache()
+        # inputs of the cache key are generated anyway, they are cheap compared to netconvert
+        l_forcerebuildscenarios = self._args.forcerebuildscenarios or l_cache is not None
+
         self._generate_node_xml(
-            l_scenarioconfig, l_nodefile, self._args.forcerebuildscenarios
+            l_scenarioconfig, l_nodefile, l_forcerebuildscenarios
         )
         self._generate_edge_xml(
-            scenarioname, l_scenarioconfig, l_edgefile, self._args.forcerebuildscenarios
+            scenarioname, l_scenarioconfig, l_edgefile, l_forcerebuildscenarios
         )
         self._generate_settings_xml(
-            self.run_config, l_settingsfile, self._args.forcerebuildscenarios
-        )
-        self._generate_net_xml(
-            l_nodefile, l_edgefile, l_netfile, self._args.forcerebuildscenarios
+            self.run_config, l_settingsfile, l_forcerebuildscenarios
         )
 
+        if l_cache is None:
+            self._generate_net_xml(
+                l_nodefile, l_edgefile, l_netfile, self._args.forcerebuildscenarios
+            )
+        else:
+            l_files = (l_nodefile, l_edgefile, l_settingsfile)
+            l_key = l_cache.key(*(i_file.read_bytes() for i_file in l_files), self.netconvert_version())
+            l_entry = l_cache.get(l_key, (l_netfile.name,)) if not self._args.forcerebuildscenarios else None
+
+            if l_entry is None:
+                def _build(staging: Path):
+                    for i_file in l_files:
+                        shutil.copyfile(i_file, staging / i_file.name)
+                    self._generate_net_xml(
+                        staging / l_nodefile.name, staging / l_edgefile.name, staging / l_netfile.name, True
+                    )
+                l_entry = l_cache.put(l_key, _build)
+
+            _link_or_copy(l_entry / l_netfile.name, l_netfile)
+
+        self._scenarios[scenarioname] = l_scenarioruns
         return l_scenarioruns
 
+    def scenario_cache(self) -> typing.Optional[colmto.common.cache.ArtifactCache]:
+        '''
+        :return: cache of scenario files as configured by `scenariocache` in run config, None if disabled
+        '''
+
+        l_config = self.run_config.get('scenariocache', {'enabled': False})
+        if not l_config.get('enabled'):
+            return None
+
+        return colmto.common.cache.ArtifactCache(
+            l_config.get('directory', '~/.colmto/cache'),
+            l_config.get('maxbytes', 2**28),
+            self._args
+        )
+
+    def netconvert_version(self) -> str:
+        '''
+        :return: version line of netconvert binary, part of the keys of cached scenarios
+        '''
+
+        if self._netconvert_version is None:
+            self._netconvert_version = subprocess.check_output(
+                [self._binaries.get('netconvert'), '--version'],
+                stderr=subprocess.STDOUT,
+                close_fds=True
+            ).decode('utf8').strip().split('\n')[0]
+
+        return self._netconvert_version
+
     def generate_run(
             self,
             scenario_run_config: dict,
@@ -174,11 +245,14 @@ class SumoConfig(colmto.common.configuration.Configuration):
             l_scenarioname, initial_sorting.name, run_number
         )
 
+        # SUMO reads gzipped trip and route files natively, but not gzipped configuration files
+        l_xmlsuffix = '.xml.gz' if self.run_config.get('compressxml') else '.xml'
+
         l_tripfile = l_destinationdir / initial_sorting.name.lower() / str(run_number) \
-                     / f'{l_scenarioname}.trip.xml'
+                     / f'{l_scenarioname}.trip{l_xmlsuffix}'
 
         l_routefile = l_destinationdir / initial_sorting.name.lower() / str(run_number) \
-                      / f'{l_scenarioname}.rou.xml'
+                      / f'{l_scenarioname}.rou{l_xmlsuffix}'
 
         l_configfile = l_destinationdir / initial_sorting.name.lower() / str(run_number) \
                        / f'{l_scenarioname}.sumo.cfg'
@@ -191,12 +265,14 @@ class SumoConfig(colmto.common.configuration.Configuration):
 
         l_runcfgfiles = [l_tripfile, l_routefile, l_configfile]
 
+        # rebuild files of this run only, i.e. don't force later runs (and scenarios) to be rebuilt
+        l_forcerebuildscenarios = self._args.forcerebuildscenarios
         if [i_fname for i_fname in l_runcfgfiles if not i_fname.exists()]:
             self._log.debug(
                 'Incomplete/non-existing SUMO run configuration for %s, %s, %d -> (re)building',
                 l_scenarioname, initial_sorting.name, run_number
             )
-            self._args.forcerebuildscenarios = True
+            l_forcerebuildscenarios = True
 
         self._generate_config_xml(
             {
@@ -205,18 +281,25 @@ class SumoConfig(colmto.common.configuration.Configuration):
                 'routefile': l_routefile,
                 'settingsfile': scenario_run_config.get('settingsfile')
             },
-            self.run_config.get('simtimeinterval'), self._args.forcerebuildscenarios
+            self.run_config.get('simtimeinterval'), l_forcerebuildscenarios
         )
 
         l_vehicles = self._generate_trip_xml(
             scenario_run_config, initial_sorting, vtype_list, l_tripfile,
-            self._args.forcerebuildscenarios
+            l_forcerebuildscenarios
         )
 
-        self._generate_route_xml(
-            scenario_run_config.get('netfile'), l_tripfile, l_routefile,
-            self._args.forcerebuildscenarios
-        )
+        # route trips directly if the network has a single path from entry to exit, e.g. not with duarouter, and
+        # all vehicle type attributes are known to the direct writer
+        l_route = self.single_path_route(scenario_run_config.get('netfile')) \
+            if self.run_config.get('routes', 'direct') == 'direct' and self._direct_vtypes(l_vehicles) else None
+        if l_route is not None and l_vehicles:
+            self._write_route_xml(l_vehicles, l_route, l_routefile, l_forcerebuildscenarios)
+        else:
+            self._generate_route_xml(
+                scenario_run_config.get('netfile'), l_tripfile, l_routefile,
+                l_forcerebuildscenarios
+            )
 
         return {
             'scenarioname': l_scenarioname,
@@ -575,56 +658,76 @@ class SumoConfig(colmto.common.configuration.Configuration):
             'Create vehicle distribution with %s', self._run_config.get('vtypedistribution')
         )
 
-        l_vehicle_list = [
-            colmto.environment.vehicle.SUMOVehicle(
-                vehicle_type=vtype,
-                vtype_sumo_cfg=self.vtypes_config.get(vtype),
-                speed_deviation=self._run_config.get('vtypedistribution').get(vtype).get('speedDev'),
-                sigma=self._run_config.get('vtypedistribution').get(vtype).get('sigma'),
-                speed_max=min(
-                    self._prng.choice(
-                        self._run_config.get('vtypedistribution').get(vtype).get('desiredSpeeds')
-                    ),
-                    self.scenario_config.get(scenario_name).get('parameters').get('speedlimit')
-                ),
-                environment={
-                    'length': (1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length')
-                              if not self._run_config.get('onlyoneotlsegment')
-                              else (1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length') / (self.scenario_config.get(scenario_name).get('parameters').get('switches') + 1),
-                    'gridcellwidth': self._run_config.get('gridcellwidth'),
-                    'gridlength': int(round((1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length') / self._run_config.get('gridcellwidth')))
-                                  if not self._run_config.get('onlyoneotlsegment')
-                                  else int(round((1 + self._run_config.get('entrylanepercent') / 100.) * (self.scenario_config.get(scenario_name).get('parameters').get('length') / (self.scenario_config.get(scenario_name).get('parameters').get('switches')+1)) / self._run_config.get('gridcellwidth')))
-                },
-                cooperation_probability=self.run_config.get('cooperation_probability')
-            ) for vtype in vtype_list
-        ]  # type: typing.List[colmto.environment.vehicle.SUMOVehicle]
+        l_environment = {
+            'length': (1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length')
+                      if not self._run_config.get('onlyoneotlsegment')
+                      else (1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length') / (self.scenario_config.get(scenario_name).get('parameters').get('switches') + 1),
+            'gridcellwidth': self._run_config.get('gridcellwidth'),
+            'gridlength': int(round((1 + self._run_config.get('entrylanepercent') / 100.) * self.scenario_config.get(scenario_name).get('parameters').get('length') / self._run_config.get('gridcellwidth')))
+                          if not self._run_config.get('onlyoneotlsegment')
+                          else int(round((1 + self._run_config.get('entrylanepercent') / 100.) * (self.scenario_config.get(scenario_name).get('parameters').get('length') / (self.scenario_config.get(scenario_name).get('parameters').get('switches')+1)) / self._run_config.get('gridcellwidth')))
+        }
+
+        l_vtypes = [str(i_vtype) for i_vtype in vtype_list]
+        l_speedlimit = self.scenario_config.get(scenario_name).get('parameters').get('speedlimit')
+
+        # draw a desired speed for each vehicle, i.e. an index into the desired speeds of its type
+        l_desired_speeds = {
+            i_vtype: numpy.asarray(
+                self._run_config.get('vtypedistribution').get(i_vtype).get('desiredSpeeds'), dtype=float
+            ) for i_vtype in dict.fromkeys(l_vtypes)
+        }
+        l_indices = self._prng.randint(
+            0,
+            numpy.fromiter(
+                (len(l_desired_speeds.get(i_vtype)) for i_vtype in l_vtypes), dtype=int, count=len(l_vtypes)
+            )
+        ) if l_vtypes else numpy.zeros(0, dtype=int)
+        l_speeds = numpy.minimum(
+            numpy.fromiter(
+                (l_desired_speeds.get(i_vtype)[i_index] for i_vtype, i_index in zip(l_vtypes, l_indices.tolist())),
+                dtype=float, count=len(l_vtypes)
+            ),
+            l_speedlimit
+        )
+
+        l_dispositions = VehicleDisposition.choose(
+            self.run_config.get('cooperation_probability'), size=len(l_vtypes)
+        ) if self.run_config.get('cooperation_probability') \
+            else numpy.full(len(l_vtypes), VehicleDisposition.COOPERATIVE, dtype=object)
 
         # sort speeds according to initial sorting flag
-        initialsorting.order(l_vehicle_list)
-
-        # assign a new id according to sort order and starting time to each vehicle
-        l_vehicles = OrderedDict()
-        for i, i_vehicle in enumerate(l_vehicle_list):
-            # update colours depending on maximum speed of vehicles
-            i_vehicle.normal_colour = Colour.map(
-                'plasma',
-                int(self.scenario_config.get(scenario_name).get('parameters').get('speedlimit')),
-                int(i_vehicle.speed_max)
-            ) * 255.
-            # update start time
-            i_vehicle.start_time = Distribution[
-                self.run_config.get('starttimedistribution').upper()
-            ].next_timestep(
+        l_order = initialsorting.argsort(l_speeds)
+        l_speeds = l_speeds[l_order]
+
+        # all vehicles of a run keep their state in one columnar store
+        l_vehicle_list = colmto.environment.vehicle.SUMOVehicle.batch(
+            environment=l_environment,
+            vehicle_types=[l_vtypes[i_index] for i_index in l_order.tolist()],
+            templates={
+                i_vtype: {
+                    'vtype_sumo_cfg': self.vtypes_config.get(i_vtype),
+                    'speed_deviation': self._run_config.get('vtypedistribution').get(i_vtype).get('speedDev'),
+                    'sigma': self._run_config.get('vtypedistribution').get(i_vtype).get('sigma')
+                } for i_vtype in l_desired_speeds
+            },
+            speed_max=l_speeds,
+            # start times according to sort order
+            start_time=Distribution[self.run_config.get('starttimedistribution').upper()].timesteps(
                 aadt / (24 * 60 * 60)
                 if not self._run_config.get('vehiclespersecond').get('enabled')
                 else self._run_config.get('vehiclespersecond').get('value'),
-                l_vehicle_list[i - 1].start_time if i > 0 else 0
-            )
-            i_vehicle.sumo_id = f'vehicle_{i:0>4}'
-            l_vehicles[f'vehicle_{i:0>4}'] = i_vehicle
-
-        return l_vehicles
+                len(l_vtypes)
+            ),
+            # colours depending on maximum speed of vehicles
+            normal_colour=Colour.lut('plasma', int(l_speedlimit))[
+                numpy.clip(l_speeds.astype(int), 0, int(l_speedlimit) - 1)
+            ] * 255.,
+            cooperation_disposition=l_dispositions[l_order],
+            sumo_ids=[f'vehicle_{i:0>4}' for i in range(len(l_vtypes))]
+        )  # type: typing.List[colmto.environment.vehicle.SUMOVehicle]
+
+        return OrderedDict((i_vehicle.sumo_id, i_vehicle) for i_vehicle in l_vehicle_list)
 
     def aadt(self, scenario_runs):
         '''
@@ -674,62 +777,70 @@ class SumoConfig(colmto.common.configuration.Configuration):
             scenario_runs.get('scenarioname')
         )
 
-        # xml
-        l_trips = etree.Element('trips')
-
-        # create a sumo vehicle_type for each vehicle
-        for i_vid, i_vehicle in l_vehicles.items():
+        # stream a sumo vehicle_type for each vehicle, then a trip for each vehicle
+        self._writer.write_xml(
+            'trips',
+            itertools.chain(
+                (
+                    etree.Element('vType', attrib=self._vtype_attributes(i_vid, i_vehicle))
+                    for i_vid, i_vehicle in l_vehicles.items()
+                ),
+                (
+                    etree.Element('trip', attrib={
+                        'id': i_vid,
+                        'depart': str(i_vehicle.start_time),
+                        'from': 'enter_21start',
+                        'to': '21end_exit',
+                        'type': i_vid,
+                        'departSpeed': 'max',
+                    }) for i_vid, i_vehicle in l_vehicles.items()
+                )
+            ),
+            tripfile
+        )
 
-            # filter for relevant attributes and transform to string
-            l_vattr = {k: str(v) for k, v in i_vehicle.properties.items()}
-            l_vattr.update({
-                'id': str(i_vid),
-                'colour': f'{i_vehicle.colour.red/255.},'
-                          f'{i_vehicle.colour.green/255.},'
-                          f'{i_vehicle.colour.blue/255.},'
-                          f'{i_vehicle.colour.alpha/255.}'
-            })
+        return l_vehicles
 
-            # override parameters speedDev, desiredSpeed, and length if defined in run config
-            if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('speedDev') is not None:
-                l_vattr['speedDev'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('speedDev'))
+    def _vtype_attributes(self, vehicle_id: str, vehicle: colmto.environment.vehicle.SUMOVehicle) -> dict:
+        '''
+        Attributes of a vehicle's SUMO vehicle type, i.e. its properties with parameters speedDev, sigma and length
+        overridden if defined in run config.
 
-            if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('sigma') is not None:
-                l_vattr['sigma'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('sigma'))
+        :param vehicle_id: vehicle id, i.e. id of its vehicle type
+        :param vehicle: vehicle
+        :return: attributes as strings
+        '''
 
-            if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('length') is not None:
-                l_vattr['length'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('length'))
+        # filter for relevant attributes and transform to string
+        l_vattr = {k: str(v) for k, v in vehicle.properties.items()}
+        l_vattr.update({
+            'id': str(vehicle_id),
+            'colour': f'{vehicle.colour.red/255.},'
+                      f'{vehicle.colour.green/255.},'
+                      f'{vehicle.colour.blue/255.},'
+                      f'{vehicle.colour.alpha/255.}'
+        })
 
-            l_vattr['speedlimit'] = str(i_vehicle.speed_max)
-            l_vattr['maxSpeed'] = str(i_vehicle.speed_max)
+        # override parameters speedDev, desiredSpeed, and length if defined in run config
+        if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('speedDev') is not None:
+            l_vattr['speedDev'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('speedDev'))
 
-            # fix tractor vType to trailer
-            if l_vattr['vType'] == 'tractor':
-                l_vattr['vType'] = 'trailer'
+        if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('sigma') is not None:
+            l_vattr['sigma'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('sigma'))
 
-            l_vattr['type'] = l_vattr.get('vType')
+        if self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('length') is not None:
+            l_vattr['length'] = str(self.run_config.get('vtypedistribution').get(l_vattr.get('vType')).get('length'))
 
-            etree.SubElement(l_trips, 'vType', attrib=l_vattr)
+        l_vattr['speedlimit'] = str(vehicle.speed_max)
+        l_vattr['maxSpeed'] = str(vehicle.speed_max)
 
-        # add trip for each vehicle
-        for i_vid, i_vehicle in l_vehicles.items():
-            etree.SubElement(l_trips, 'trip', attrib={
-                'id': i_vid,
-                'depart': str(i_vehicle.start_time),
-                'from': 'enter_21start',
-                'to': '21end_exit',
-                'type': i_vid,
-                'departSpeed': 'max',
-            })
+        # fix tractor vType to trailer
+        if l_vattr['vType'] == 'tractor':
+            l_vattr['vType'] = 'trailer'
 
-        with open(tripfile, 'w') as f_tripxml:
-            f_tripxml.write(
-                defusedxml.lxml.tostring(
-                    l_trips, pretty_print=True, encoding='unicode'
-                )
-            )
+        l_vattr['type'] = l_vattr.get('vType')
 
-        return l_vehicles
+        return l_vattr
 
     # create net xml using netconvert
     def _generate_net_xml(
@@ -763,6 +874,90 @@ class SumoConfig(colmto.common.configuration.Configuration):
             l_netconvertprocess.decode('utf8').replace('\n', '')
         )
 
+    def single_path_route(self, netfile: Path) -> typing.Optional[typing.Tuple[str, ...]]:
+        '''
+        Route of trips from `enter_21start` to `21end_exit` if it is the only path in the net file, i.e. every edge
+        on the way connects to exactly one next edge. Routes are looked up once per net file.
+
+        :param netfile: net file
+        :return: edges of route, None if the network needs routing, i.e. with duarouter
+        '''
+
+        if netfile not in self._routes:
+            # successors of each (non-internal) edge by its connections
+            l_successors = {}
+            for _, i_element in etree.iterparse(str(netfile), events=('end',)):
+                if i_element.tag == 'connection' and not i_element.get('from').startswith(':') \
+                        and not i_element.get('to').startswith(':'):
+                    l_successors.setdefault(i_element.get('from'), set()).add(i_element.get('to'))
+
+            l_route = ['enter_21start']
+            while l_route[-1] != '21end_exit' and len(l_successors.get(l_route[-1], ())) == 1 \
+                    and len(l_route) <= len(l_successors):
+                l_route.extend(l_successors.get(l_route[-1]))
+
+            self._routes[netfile] = tuple(l_route) if l_route[-1] == '21end_exit' else None
+            self._log.debug('single path route of %s: %s', netfile, self._routes.get(netfile))
+
+        return self._routes.get(netfile)
+
+    def _direct_vtypes(self, vehicles: typing.Dict[str, colmto.environment.vehicle.SUMOVehicle]) -> bool:
+        '''
+        Check whether vehicle types of vehicles only have attributes the direct route writer knows how duarouter
+        writes them, i.e. `_SUMO_VTYPE_ATTRIBUTES`, besides colmto's own properties. Other SUMO vehicle type
+        attributes, e.g. tau, carFollowModel or lcStrategic, need duarouter.
+
+        :param vehicles: vehicles of trip xml
+        :return: True if routes can be written directly
+        '''
+
+        l_unknown = set().union(*(i_vehicle.properties.keys() for i_vehicle in vehicles.values())) \
+            - set(_SUMO_VTYPE_ATTRIBUTES) - set(_COLMTO_VEHICLE_PROPERTIES)
+        if l_unknown:
+            self._log.debug(
+                'vehicle type attributes %s not known to direct route writer -> routing with duarouter',
+                ', '.join(sorted(l_unknown))
+            )
+        return not l_unknown
+
+    def _write_route_xml(self, vehicles: typing.Dict[str, colmto.environment.vehicle.SUMOVehicle],
+                         route: typing.Sequence[str], routefile: Path, forcerebuildscenarios=False):
+        '''
+        Write SUMO's route xml directly, i.e. a vehicle type and a vehicle on given route for each vehicle ordered by
+        departure, instead of routing trips with duarouter.
+        Vehicle types keep the attributes of `_SUMO_VTYPE_ATTRIBUTES` only (see `_direct_vtypes`), values and
+        departures are rounded as duarouter does, so simulations are the same as with routes written by duarouter
+        (compared in tests/sumo/test_sumosim.py).
+
+        :param vehicles: vehicles of trip xml
+        :param route: edges of route
+        :param routefile: route file
+        :param forcerebuildscenarios: Rebuild scenarios, even if they already exist for current run
+        '''
+
+        if Path(routefile).exists() and not forcerebuildscenarios:
+            return
+
+        def _elements():
+            for i_vid, i_vehicle in sorted(vehicles.items(), key=lambda i_item: i_item[1].start_time):
+                yield etree.Element(
+                    'vType', attrib={
+                        k: f'{float(v):.2f}' if k in _SUMO_VTYPE_ROUNDED_ATTRIBUTES else v
+                        for k, v in self._vtype_attributes(i_vid, i_vehicle).items() if k in _SUMO_VTYPE_ATTRIBUTES
+                    }
+                )
+                l_vehicle = etree.Element('vehicle', attrib={
+                    'id': i_vid,
+                    'type': i_vid,
+                    'depart': _sumo_time(i_vehicle.start_time),
+                    'departSpeed': 'max',
+                })
+                etree.SubElement(l_vehicle, 'route', attrib={'edges': l_edges})
+                yield l_vehicle
+
+        l_edges = ' '.join(route)
+        self._writer.write_xml('routes', _elements(), routefile)
+
     def _generate_route_xml(
             self, netfile: Path, tripfile: Path, routefile: Path, forcerebuildscenarios=False):
         '''
@@ -793,3 +988,47 @@ class SumoConfig(colmto.common.configuration.Configuration):
             self._binaries.get('duarouter'),
             l_duarouterprocess.decode('utf8').replace('\n', '')
         )
+
+
+# vehicle type attributes written to route files by the direct route writer, formatted as duarouter does
+_SUMO_VTYPE_ATTRIBUTES = (
+    'id', 'accel', 'decel', 'length', 'minGap', 'maxSpeed', 'speedFactor', 'speedDev', 'sigma', 'vClass', 'width',
+    'height'
+)
+
+# vehicle type attributes duarouter writes with two decimals
+_SUMO_VTYPE_ROUNDED_ATTRIBUTES = ('length', 'minGap', 'maxSpeed', 'width', 'height')
+
+# properties of colmto's vehicles, i.e. no SUMO vehicle type attributes, dropped by duarouter and the direct writer
+_COLMTO_VEHICLE_PROPERTIES = (
+    'position', 'speed', 'colour', 'normal_colour', 'start_time', 'start_position', 'grid_position', 'lane_index',
+    'time_step', 'travel_time', 'dissatisfaction', 'cooperation_disposition', 'dsat_threshold', 'sumo_id',
+    'speedlimit', 'vType', 'type'
+)
+
+
+def _sumo_time(seconds: float) -> str:
+    '''
+    Format time like duarouter does, i.e. as SUMO time steps (ms) rounded to two decimals.
+
+    :param seconds: time in seconds
+    :return: formatted time
+    '''
+    l_centiseconds = (int(float(seconds) * 1000. + .5) + 5) // 10
+    return f'{l_centiseconds // 100}.{l_centiseconds % 100:02d}'
+
+
+def _link_or_copy(source: Path, destination: Path):
+    '''
+    Hard link a file to destination, e.g. from a cache into the runs directory, or copy it if the file system
+    doesn't support hard links. Hard links keep the file if its cache entry gets evicted.
+
+    :param source: source file
+    :param destination: destination file, replaced if it exists
+    '''
+
+    Path(destination).unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
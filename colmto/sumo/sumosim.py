@@ -24,8 +24,17 @@
 '''Main module to run/initialise SUMO scenarios.'''
 # pylint: disable=no-member
 
+import concurrent.futures
+import contextlib
+import functools
+import multiprocessing
 import os
+from pathlib import Path
+import queue
 import sys
+import threading
+import time
+import typing
 import numpy
 
 try:
@@ -38,6 +47,8 @@ except ImportError:  # pragma: no cover
 import colmto.common.io
 import colmto.common.statistics
 import colmto.common.log
+import colmto.common.profiling
+import colmto.common.timing
 import colmto.cse.cse
 from colmto.sumo.sumocfg import SumoConfig
 from colmto.sumo.sumocfg import InitialSorting
@@ -64,6 +75,10 @@ class SumoSim(object):  # pylint: disable=too-many-instance-attributes
         self._writer = colmto.common.io.Writer(args)
         self._statistics = colmto.common.statistics.Statistics(args)
         self._allscenarioruns = {}  # map scenarios -> runid -> files
+        self._session = None  # open HDF5 writer session of current sweep
+        self._sketches = {}  # map (scenario, sorting) -> quantile sketches of runs (see Statistics.update_sketches)
+        self._timings = {}  # map scenario -> aadt -> sorting -> run -> timing summary (see PhaseTimer.summary)
+        self._timings_lock = threading.Lock()  # timings of runs are recorded by the writer thread of the session
         self._runtime = colmto.sumo.runtime.Runtime(
             args,
             self._sumocfg,
@@ -114,76 +129,341 @@ class SumoSim(object):  # pylint: disable=too-many-instance-attributes
         else:
             self._log.debug('Using pre-configured vtype_list')
 
-        for i_initial_sorting in self._sumocfg.run_config.get('initialsortings'):
+        l_runs = (
+            (
+                i_initial_sorting,
+                i_run,
+                self._sumocfg.generate_run(
+                    l_scenario,
+                    InitialSorting[i_initial_sorting.upper()],
+                    i_run,
+                    l_vtype_list.get(scenario_name)
+                )
+            )
+            for i_initial_sorting in self._sumocfg.run_config.get('initialsortings')
+            for i_run in range(self._sumocfg.run_config.get('runs'))
+        )
+
+        # generate the next runs on a background thread while the current ones simulate
+        l_runs = _prefetch(l_runs, self._sumocfg.run_config.get('pregenerate', 2))
+
+        with self._results_session():
+            if self._sumocfg.run_config.get('jobs', 1) > 1:
+                self._run_parallel(scenario_name, l_runs)
+            else:
+                self._run_sequential(scenario_name, l_runs)
+
+        if self._sumocfg.run_config.get('sketches', {}).get('enabled'):
+            self._write_sketches(scenario_name)
 
-            for i_run in range(self._sumocfg.run_config.get('runs')):
+    def _run_sequential(self, scenario_name: str, runs: typing.Iterable[typing.Tuple[str, int, dict]]):
+        '''
+        Run given runs of a scenario one after another in this process.
+
+        :param scenario_name: scenario name
+        :param runs: iterable of (initial sorting, run number, run configuration) tuples
+        '''
+
+        for i_initial_sorting, i_run, i_run_config in runs:
 
+            l_profile = self._profile_prefix(scenario_name, i_initial_sorting, i_run)
+            with _profiler(l_profile, self._sumocfg.run_config.get('profiling', {}).get('interval', 0.001)):
                 if self._sumocfg.run_config.get('cse-enabled'):
                     # cse mode: apply cse rules to vehicles and run with TraCI
-
-                    self._writer.write_hdf5(
-                        self._statistics.global_stats(
-                            self._statistics.merge_vehicle_series(
-                                i_run,
-                                self._runtime.run_traci(
-                                    self._sumocfg.generate_run(
-                                        l_scenario,
-                                        InitialSorting[i_initial_sorting.upper()],
-                                        i_run,
-                                        l_vtype_list.get(scenario_name)
-                                    ),
-                                    colmto.cse.cse.SumoCSE(
-                                        self._args
-                                    ).add_rules_from_cfg(
-                                        self._sumocfg.run_config.get('rules')
-                                    )
-                                )
-                            )
-                        ),
-                        hdf5_file=self._args.results_hdf5_file
-                        if self._args.results_hdf5_file
-                        else self._sumocfg.resultsdir / f'{self._sumocfg.run_prefix}.hdf5',
-                        hdf5_base_path=os.path.join(
-                            scenario_name,
-                            str(self._sumocfg.aadt(self._sumocfg.generate_scenario(scenario_name))),
-                            i_initial_sorting,
-                            str(i_run)
+                    l_timer = colmto.common.timing.PhaseTimer() if self._sumocfg.run_config.get('timing') \
+                        else colmto.common.timing.NULL_TIMER
+                    l_accumulator = self._runtime.run_traci(
+                        i_run_config,
+                        colmto.cse.cse.SumoCSE(
+                            self._args,
+                            observation_window=self._sumocfg.run_config.get('observationwindow', 60)
+                        ).add_rules_from_cfg(
+                            self._sumocfg.run_config.get('rules')
                         ),
-                        compression='gzip',
-                        compression_opts=9,
-                        fletcher32=True
+                        timer=l_timer
+                    )
+                    l_start = time.perf_counter()
+                    l_results = self._statistics.global_stats(
+                        self._statistics.merge_vehicle_series(i_run, l_accumulator)
+                    )
+                    l_timer.add('statistics', time.perf_counter() - l_start)
+                    self._write_run_results(
+                        scenario_name,
+                        i_initial_sorting,
+                        i_run,
+                        l_results,
+                        l_timer.summary() if l_timer else None
                     )
                 else:
-                    self._runtime.run_standalone(
-                        self._sumocfg.generate_run(
-                            l_scenario,
-                            InitialSorting[i_initial_sorting.upper()],
-                            i_run,
-                            l_vtype_list.get(scenario_name)
+                    self._runtime.run_standalone(i_run_config)
+
+            self._log_finished_run(scenario_name, i_initial_sorting, i_run, l_profile)
+
+    def _run_parallel(self, scenario_name: str, runs: typing.Iterable[typing.Tuple[str, int, dict]]):
+        '''
+        Run given runs of a scenario in a pool of worker processes.
+
+        Run configurations are generated lazily in this process, i.e. in the same order as in sequential mode, and
+        at most twice as many runs as there are workers are in flight at any time. Each worker owns its own SUMO
+        instance with a distinct TraCI label/port. Results are sent back and written by this process only, so the
+        HDF5 layout stays `scenario/aadt/sorting/run`.
+
+        :param scenario_name: scenario name
+        :param runs: iterable of (initial sorting, run number, run configuration) tuples
+        '''
+
+        l_jobs = self._sumocfg.run_config.get('jobs')
+        self._log.info('Running scenario %s with %d worker processes', scenario_name, l_jobs)
+
+        # spawn workers instead of forking them, as the run generator and the results writer threads are running
+        l_context = multiprocessing.get_context('spawn')
+        l_slots = l_context.Queue()
+        for i_slot in range(l_jobs):
+            l_slots.put(i_slot)
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=l_jobs,
+                mp_context=l_context,
+                initializer=_init_worker,
+                initargs=(self._args, self._sumocfg, self._runtime, l_slots)
+        ) as f_executor:
+            l_pending = {}
+            l_runs = iter(runs)
+            l_exhausted = False
+
+            while l_pending or not l_exhausted:
+
+                # keep the pool busy, but bound the number of generated runs in flight
+                while not l_exhausted and len(l_pending) < 2 * l_jobs:
+                    try:
+                        l_initial_sorting, l_run, l_run_config = next(l_runs)
+                    except StopIteration:
+                        l_exhausted = True
+                        break
+                    l_profile = self._profile_prefix(scenario_name, l_initial_sorting, l_run)
+                    l_pending[
+                        f_executor.submit(
+                            _run_worker,
+                            l_run_config,
+                            self._sumocfg.run_config.get('cse-enabled'),
+                            self._sumocfg.run_config.get('timing'),
+                            l_profile
                         )
-                    )
+                    ] = (l_initial_sorting, l_run, l_profile)
+
+                l_done, _ = concurrent.futures.wait(l_pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for i_future in l_done:
+                    l_initial_sorting, l_run, l_profile = l_pending.pop(i_future)
+                    l_results, l_timing = i_future.result()
+                    if l_results is not None:
+                        self._write_run_results(scenario_name, l_initial_sorting, l_run, l_results, l_timing)
+                    self._log_finished_run(scenario_name, l_initial_sorting, l_run, l_profile)
+
+    def _write_run_results(self, scenario_name: str, initial_sorting: str, run: int, results: dict,  # pylint: disable=too-many-arguments
+                           timing: typing.Optional[typing.Dict[str, dict]] = None):
+        '''
+        Write results of one run to HDF5 file at `scenario/aadt/sorting/run`, or with `resultslayout: runaxis` at
+        index `run` of the run-axis datasets at `scenario/aadt/sorting/vtype/...` (see `Statistics.stack_series`).
+
+        :param scenario_name: scenario name
+        :param initial_sorting: initial sorting
+        :param run: run number
+        :param results: statistics of run
+        :param timing: timing summary of run (see `PhaseTimer.summary`), completed once the results are written (see
+            `_record_timing`), or None if timing is disabled
+        '''
+
+        l_start = time.perf_counter()
+
+        l_aadt = str(self._sumocfg.aadt({'scenarioname': scenario_name}))
+        l_hdf5_base_path = os.path.join(scenario_name, l_aadt, initial_sorting)
+
+        if self._sumocfg.run_config.get('sketches', {}).get('enabled'):
+            self._statistics.update_sketches(
+                self._sketches.setdefault((scenario_name, initial_sorting), {}),
+                results,
+                self._sumocfg.run_config.get('sketches').get('epsilon', 0.01),
+                self._sumocfg.run_config.get('sketches').get('seed', 0)
+            )
+
+        if self._sumocfg.run_config.get('resultslayout', 'groups') == 'runaxis':
+            l_results, l_run = self._statistics.stack_series(results), run
+        else:
+            l_results, l_run, l_hdf5_base_path = results, None, os.path.join(l_hdf5_base_path, str(run))
+
+        # time spent preparing results, plus time spent writing them, which the session measures on its writer thread
+        l_record = None if timing is None else functools.partial(
+            self._record_timing, (scenario_name, l_aadt, initial_sorting, run), timing, time.perf_counter() - l_start
+        )
+
+        if self._session is not None:
+            self._session.write(l_results, hdf5_base_path=l_hdf5_base_path, run=l_run, written=l_record)
+            return
+
+        l_start = time.perf_counter()
+        if l_run is not None:
+            self._writer.write_hdf5_run(
+                l_results,
+                hdf5_file=self._results_hdf5_file(),
+                hdf5_base_path=l_hdf5_base_path,
+                run=l_run,
+                **colmto.common.io.HDF5_DATASET_OPTIONS
+            )
+        else:
+            self._writer.write_hdf5(
+                l_results,
+                hdf5_file=self._results_hdf5_file(),
+                hdf5_base_path=l_hdf5_base_path,
+                **colmto.common.io.HDF5_DATASET_OPTIONS
+            )
+        if l_record is not None:
+            l_record(time.perf_counter() - l_start)
+
+    def _record_timing(self, run: typing.Tuple[str, str, str, int], timing: typing.Dict[str, dict], *seconds: float):
+        '''
+        Complete the timing summary of a written run by the time spent writing its results, log and keep it for
+        `_write_timings`. Called by the writer thread if results are written by a `HDF5WriterSession`.
+
+        :param run: scenario name, aadt, initial sorting and number of run
+        :param timing: timing summary of run (see `PhaseTimer.summary`)
+        :param seconds: times spent writing the results of the run
+        '''
+
+        l_scenario_name, l_aadt, l_initial_sorting, l_run = run
+        timing['write'] = {'total': sum(seconds)}
+        self._log.info(
+            'Timing of %s, %s, run %d: %s',
+            l_scenario_name, l_initial_sorting, l_run, colmto.common.timing.PhaseTimer.format_summary(timing)
+        )
+        with self._timings_lock:
+            self._timings.setdefault(l_scenario_name, {}).setdefault(l_aadt, {}).setdefault(
+                l_initial_sorting, {}
+            )[str(l_run)] = timing
+
+    def _write_timings(self):
+        '''
+        Write timing summaries of runs (see `PhaseTimer.summary`) to a JSON file next to the results file, i.e.
+        `<results>.timing.json`, with phases of time steps and bin edges of their histograms.
+        Called once the results session is closed, i.e. all runs are written and their timing is recorded.
+        '''
+
+        with self._timings_lock:
+            self._writer.write_json(
+                {
+                    'phases': colmto.common.timing.STEP_PHASES + colmto.common.timing.RUN_PHASES,
+                    'histogram_bin_edges': colmto.common.timing.HISTOGRAM_BIN_EDGES.tolist(),
+                    'runs': self._timings
+                },
+                self._results_hdf5_file().with_suffix('.timing.json')
+            )
+
+    def _write_sketches(self, scenario_name: str):
+        '''
+        Write approximate quartiles of the quantile sketches of all runs of a scenario (see
+        `Statistics.sketch_summaries`) to `scenario/aadt/sorting` of the sketches HDF5 file next to the results file.
+        Sketches are released afterwards.
+
+        :param scenario_name: scenario name
+        '''
 
-                l_aadt = self._sumocfg.scenario_config.get(scenario_name).get(
-                    'parameters'
-                ).get('aadt') if not self._sumocfg.run_config.get('aadt').get('enabled') \
-                    else self._sumocfg.run_config.get('aadt').get('value')
-                self._log.info(
-                    'Scenario %s, AADT %d (%d vph), sorting %s: Finished run %d/%d',
-                    scenario_name,
-                    l_aadt,
-                    int(l_aadt / 24),
-                    i_initial_sorting,
-                    i_run + 1,
-                    self._sumocfg.run_config.get('runs')
+        l_aadt = str(self._sumocfg.aadt({'scenarioname': scenario_name}))
+        for i_initial_sorting in self._sumocfg.run_config.get('initialsortings'):
+            l_sketches = self._sketches.pop((scenario_name, i_initial_sorting), None)
+            if l_sketches:
+                self._writer.write_hdf5(
+                    self._statistics.sketch_summaries(l_sketches),
+                    hdf5_file=self._results_hdf5_file().with_suffix('.sketches.hdf5'),
+                    hdf5_base_path=os.path.join(scenario_name, l_aadt, i_initial_sorting),
+                    **colmto.common.io.HDF5_DATASET_OPTIONS
                 )
 
+    def _results_hdf5_file(self):
+        '''
+        :return: HDF5 file results of all runs are written to
+        '''
+        return self._args.results_hdf5_file \
+            if self._args.results_hdf5_file \
+            else self._sumocfg.resultsdir / f'{self._sumocfg.run_prefix}.hdf5'
+
+    @contextlib.contextmanager
+    def _results_session(self):
+        '''
+        Context of an HDF5 writer session for results, which keeps the results file open and writes results on a
+        background thread while the next runs simulate. Nested contexts share the outermost session, i.e. one
+        session per sweep. Pending results get written when the context is left, also on SIGINT/SIGTERM.
+        Timings of runs are written once the outermost session is closed (see `_write_timings`).
+        Without CSE no results are written and no session is opened.
+
+        :return: context yielding the writer session or None
+        '''
+
+        if self._session is not None or not self._sumocfg.run_config.get('cse-enabled'):
+            yield self._session
+            return
+
+        with self._writer.session(
+                self._results_hdf5_file(),
+                maxsize=self._sumocfg.run_config.get('writerqueue', 4),
+                **colmto.common.io.HDF5_DATASET_OPTIONS
+        ) as self._session:
+            try:
+                yield self._session
+            finally:
+                self._session = None
+
+        if self._timings:
+            self._write_timings()
+
+    def _log_finished_run(self, scenario_name: str, initial_sorting: str, run: int,
+                          profile: typing.Optional[Path] = None):
+        '''
+        Log completion of a run.
+
+        :param scenario_name: scenario name
+        :param initial_sorting: initial sorting
+        :param run: run number
+        :param profile: path prefix of profile files of run, None if run was not profiled
+        '''
+
+        l_aadt = self._sumocfg.scenario_config.get(scenario_name).get(
+            'parameters'
+        ).get('aadt') if not self._sumocfg.run_config.get('aadt').get('enabled') \
+            else self._sumocfg.run_config.get('aadt').get('value')
+        self._log.info(
+            'Scenario %s, AADT %d (%d vph), sorting %s: Finished run %d/%d',
+            scenario_name,
+            l_aadt,
+            int(l_aadt / 24),
+            initial_sorting,
+            run + 1,
+            self._sumocfg.run_config.get('runs')
+        )
+        if profile is not None:
+            self._log.info('Profile of run %d written to %s.prof and %s.collapsed', run, profile, profile)
+
+    def _profile_prefix(self, scenario_name: str, initial_sorting: str, run: int) -> typing.Optional[Path]:
+        '''
+        :param scenario_name: scenario name
+        :param initial_sorting: initial sorting
+        :param run: run number
+        :return: path prefix of profile files of run in results dir, i.e. `profile-<scenario>-<sorting>-<run>`,
+            if run is to be profiled (see `colmto.common.profiling.selected`), otherwise None
+        '''
+
+        l_profiling = self._sumocfg.run_config.get('profiling', {})
+        if not colmto.common.profiling.selected(run, l_profiling.get('runs', ()), l_profiling.get('ratio', 0.)):
+            return None
+        return self._sumocfg.resultsdir / f'profile-{scenario_name}-{initial_sorting}-{run}'
+
     def run_scenarios(self):
         '''
         Run all scenarios defined by cfgs/commandline.
         '''
 
-        for i_scenarioname in self._sumocfg.run_config.get('scenarios'):
-            self.run_scenario(i_scenarioname)
+        with self._results_session():
+            for i_scenarioname in self._sumocfg.run_config.get('scenarios'):
+                self.run_scenario(i_scenarioname)
 
         # convert vtype_lists from numpy arrays to plain lists
         for i_scenarioname in self._sumocfg.run_config.get('vtype_list').keys():
@@ -204,3 +484,129 @@ class SumoSim(object):  # pylint: disable=too-many-instance-attributes
             },
             self._sumocfg.sumo_config_dir / self._sumocfg.run_prefix / 'configuration.yaml'
         )
+
+
+def _prefetch(iterable: typing.Iterable, depth: int) -> typing.Iterator:
+    '''
+    Iterate over items of an iterable produced ahead on a background thread, e.g. run configurations generated
+    while previous runs simulate. Items keep their order. The producer blocks while `depth` items are queued
+    (back-pressure), i.e. at most `depth` + 1 items exist ahead of the consumer. Errors of the producer are raised
+    to the consumer; if the consumer stops early, the producer stops after its current item.
+
+    :param iterable: iterable
+    :param depth: number of items queued ahead, 0 to iterate in the calling thread
+    :return: iterator over items
+    '''
+
+    if depth < 1:
+        yield from iterable
+        return
+
+    l_queue = queue.Queue(maxsize=depth)
+    l_stop = threading.Event()
+    l_done = object()
+
+    def _put(item) -> bool:
+        while not l_stop.is_set():
+            try:
+                l_queue.put(item, timeout=.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for i_item in iterable:
+                if not _put((i_item, None)):
+                    return
+            _put((l_done, None))
+        except BaseException as l_error:  # pylint: disable=broad-except
+            _put((l_done, l_error))
+
+    l_producer = threading.Thread(target=_produce, name='colmto-prefetch', daemon=True)
+    l_producer.start()
+    try:
+        while True:
+            l_item, l_error = l_queue.get()
+            if l_item is l_done:
+                if l_error is not None:
+                    raise l_error
+                return
+            yield l_item
+    finally:
+        l_stop.set()
+        l_producer.join()
+
+
+# state of a worker process, set up once per process by _init_worker
+_WORKER = {}
+
+
+def _init_worker(args, sumo_config: SumoConfig, runtime: colmto.sumo.runtime.Runtime, slots: multiprocessing.Queue):
+    '''
+    Initialise a worker process of the run pool.
+
+    Each worker claims a slot number, which determines its TraCI label and port offset.
+
+    :param args: argparse configuration
+    :param sumo_config: SUMO configuration
+    :param runtime: runtime to run simulations with
+    :param slots: queue of free slot numbers
+    '''
+
+    _WORKER['args'] = args
+    _WORKER['sumo_config'] = sumo_config
+    _WORKER['runtime'] = runtime
+    _WORKER['statistics'] = colmto.common.statistics.Statistics(args)
+    _WORKER['slot'] = slots.get()
+
+
+def _profiler(prefix: typing.Optional[Path], interval: float) -> typing.ContextManager:
+    '''
+    :param prefix: path prefix of profile files, None to not profile
+    :param interval: sampling interval of collapsed stacks in seconds
+    :return: context profiling its body to files at prefix (see `RunProfiler`), doing nothing if prefix is None
+    '''
+    if prefix is None:
+        return contextlib.nullcontext()
+    return colmto.common.profiling.RunProfiler(prefix, interval)
+
+
+def _run_worker(run_config: dict, cse_enabled: bool, timing: bool = False, profile: typing.Optional[Path] = None
+                ) -> typing.Tuple[typing.Optional[dict], typing.Optional[typing.Dict[str, dict]]]:
+    '''
+    Run one simulation run inside a worker process.
+
+    :param run_config: run configuration as generated by SumoConfig.generate_run
+    :param cse_enabled: run with TraCI and CSE
+    :param timing: time phases of the run (see `PhaseTimer`)
+    :param profile: path prefix of profile files of run, None to not profile it
+    :return: statistics of run if CSE is enabled, otherwise None, and timing summary of run if timing is enabled,
+        otherwise None
+    '''
+
+    with _profiler(profile, _WORKER.get('sumo_config').run_config.get('profiling', {}).get('interval', 0.001)):
+        if not cse_enabled:
+            _WORKER.get('runtime').run_standalone(run_config)
+            return None, None
+
+        l_timer = colmto.common.timing.PhaseTimer() if timing else colmto.common.timing.NULL_TIMER
+        l_accumulator = _WORKER.get('runtime').run_traci(
+            run_config,
+            colmto.cse.cse.SumoCSE(
+                _WORKER.get('args'),
+                observation_window=_WORKER.get('sumo_config').run_config.get('observationwindow', 60)
+            ).add_rules_from_cfg(
+                _WORKER.get('sumo_config').run_config.get('rules')
+            ),
+            label=f'worker{_WORKER.get("slot")}',
+            port=run_config.get('sumoport') + _WORKER.get('slot'),
+            timer=l_timer
+        )
+        l_start = time.perf_counter()
+        l_results = _WORKER.get('statistics').global_stats(
+            _WORKER.get('statistics').merge_vehicle_series(run_config.get('runnumber'), l_accumulator)
+        )
+        l_timer.add('statistics', time.perf_counter() - l_start)
+        return l_results, l_timer.summary() if l_timer else None
@@ -61,7 +61,7 @@ setup(
     author_email='masc@tu-clausthal.de',
     url='https://gitlab.com/ascm/colmto',
     license='LGPL',
-    packages=find_packages(exclude=['examples', 'tests', 'sumo']),
+    packages=find_packages(exclude=['examples', 'tests', 'benchmarks', 'sumo']),
     include_package_data=True,
     zip_safe=False,
     tests_require=['pytest'],
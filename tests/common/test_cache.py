@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# @package tests.common
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Test module for common.cache.
+'''
+
+
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+import colmto.common.cache
+
+
+class TestArtifactCache(unittest.TestCase):
+    '''
+    Test cases for ArtifactCache
+    '''
+
+    def test_key(self):
+        '''Test keys of entries'''
+        self.assertEqual(
+            colmto.common.cache.ArtifactCache.key('foo', b'bar'), colmto.common.cache.ArtifactCache.key(b'foo', 'bar')
+        )
+        self.assertNotEqual(
+            colmto.common.cache.ArtifactCache.key('foo', 'bar'), colmto.common.cache.ArtifactCache.key('foob', 'ar')
+        )
+        self.assertEqual(len(colmto.common.cache.ArtifactCache.key()), 64)
+
+    def test_put_get_evict(self):
+        '''Test publishing, looking up and LRU eviction of entries'''
+
+        def _build(name: str, size: int):
+            return lambda staging: (staging / name).write_bytes(b'x' * size)
+
+        with tempfile.TemporaryDirectory() as f_tmpdir:
+            l_cache = colmto.common.cache.ArtifactCache(Path(f_tmpdir) / 'cache', max_bytes=240)
+            self.assertIsNone(l_cache.get('foo', ('net.xml',)))
+            self.assertListEqual(l_cache.evict(), [])
+
+            l_entry = l_cache.put('foo', _build('net.xml', 100))
+            self.assertEqual(l_cache.get('foo', ('net.xml',)), l_entry)
+            self.assertIsNone(l_cache.get('foo', ('net.xml', 'settings.xml')))
+            self.assertEqual((l_entry / 'net.xml').read_bytes(), b'x' * 100)
+
+            # rebuilding keeps a complete entry, i.e. files readers may have linked stay in place
+            l_inode = (l_entry / 'net.xml').stat().st_ino
+            self.assertEqual(l_cache.put('foo', _build('net.xml', 50)), l_entry)
+            self.assertEqual((l_entry / 'net.xml').stat().st_ino, l_inode)
+            self.assertEqual((l_entry / 'net.xml').stat().st_size, 100)
+
+            # incomplete entries get replaced, without leaving staged or replaced directories behind
+            (l_entry / 'net.xml').unlink()
+            l_cache.put('foo', _build('net.xml', 50))
+            self.assertEqual((l_entry / 'net.xml').stat().st_size, 50)
+            self.assertListEqual([i_entry.name for i_entry in l_cache.directory.iterdir()], ['foo'])
+
+            l_cache.put('bar', _build('net.xml', 100))
+            os.utime(l_cache.directory / 'foo', (0, 0))
+            os.utime(l_cache.directory / 'bar', (1, 1))
+            # baz exceeds bound, least recently used foo gets evicted first
+            l_cache.put('baz', _build('net.xml', 100))
+            self.assertIsNone(l_cache.get('foo', ('net.xml',)))
+            self.assertIsNotNone(l_cache.get('bar', ('net.xml',)))
+            self.assertIsNotNone(l_cache.get('baz', ('net.xml',)))
+
+            # get marks entries as recently used, i.e. bar now is the least recently used one
+            os.utime(l_cache.directory / 'bar', (0, 0))
+            l_cache.get('baz', ('net.xml',))
+            l_cache.put('qux', _build('net.xml', 100))
+            self.assertListEqual(sorted(i_entry.name for i_entry in l_cache.directory.iterdir()), ['baz', 'qux'])
+
+            # a just published entry is kept even if it exceeds the bound on its own
+            l_cache.put('big', _build('net.xml', 1000))
+            self.assertListEqual(sorted(i_entry.name for i_entry in l_cache.directory.iterdir()), ['big'])
+
+            # failing builds leave no entries behind
+            with self.assertRaises(ZeroDivisionError):
+                l_cache.put('fail', lambda staging: 1/0)
+            self.assertListEqual(sorted(i_entry.name for i_entry in l_cache.directory.iterdir()), ['big'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,7 @@ colmto: Test module for common.helper.
 
 import random
 import unittest
+import matplotlib.pyplot as plt
 import numpy
 
 import colmto.common.helper as helper
@@ -71,6 +72,15 @@ class HelperTests(unittest.TestCase):
             helper.Colour.map('plasma', 255, 127),
             helper.Colour(red=0.798216, green=0.280197, blue=0.469538, alpha=1.0)
         )
+        l_lut = helper.Colour.lut('plasma', 30)
+        self.assertEqual(l_lut.shape, (30, 4))
+        self.assertIs(helper.Colour.lut('plasma', 30), l_lut)
+        for i_value in range(-1, 32):
+            with self.subTest(pattern=i_value):
+                self.assertEqual(
+                    helper.Colour.map('plasma', 30, i_value),
+                    helper.Colour(*plt.get_cmap(name='plasma', lut=30)(i_value))
+                )
 
     def test_range(self):
         '''
@@ -159,6 +169,19 @@ class HelperTests(unittest.TestCase):
         l_data = [helper.Distribution.LINEAR.next_timestep(lamb=1/3, prev_start_time=2.13) for _ in range(10**6)]
         self.assertAlmostEqual(numpy.mean(l_data)-2.13, 3, 1)
 
+        # consecutive time steps at once equal chained calls of next_timestep
+        for i_distribution in (helper.Distribution.POISSON, helper.Distribution.LINEAR):
+            with self.subTest(pattern=i_distribution):
+                helper.Distribution._prng.value.seed(42)  # pylint: disable=protected-access
+                l_timesteps = [2.13]
+                for _ in range(1000):
+                    l_timesteps.append(i_distribution.next_timestep(lamb=1/3, prev_start_time=l_timesteps[-1]))
+                helper.Distribution._prng.value.seed(42)  # pylint: disable=protected-access
+                numpy.testing.assert_array_equal(
+                    i_distribution.timesteps(lamb=1/3, size=1000, prev_start_time=2.13), l_timesteps[1:]
+                )
+        self.assertEqual(len(helper.Distribution.POISSON.timesteps(lamb=1/3, size=0)), 0)
+
     def test_initialsorting_best(self):
         '''
         Test InitialSorting BEST case
@@ -186,6 +209,20 @@ class HelperTests(unittest.TestCase):
 
         helper.InitialSorting.RANDOM.order(self.vehicles)
 
+    def test_initialsorting_argsort(self):
+        '''
+        Test InitialSorting argsort, i.e. stable sorting of speeds
+        '''
+
+        l_speeds = numpy.array((20., 30., 20., 10., 30.))
+        numpy.testing.assert_array_equal(helper.InitialSorting.BEST.argsort(l_speeds), (1, 4, 0, 2, 3))
+        numpy.testing.assert_array_equal(helper.InitialSorting.WORST.argsort(l_speeds), (3, 0, 2, 1, 4))
+        numpy.testing.assert_array_equal(
+            numpy.sort(helper.InitialSorting.RANDOM.argsort(l_speeds)), numpy.arange(len(l_speeds))
+        )
+        with self.assertRaises(KeyError):
+            helper.InitialSorting._prng.argsort(l_speeds)    # pylint: disable=protected-access
+
     def test_initialsorting_prng(self):
         '''
         Test InitialSorting prng error case
@@ -280,6 +317,12 @@ class HelperTests(unittest.TestCase):
             l_distribution.count(helper.VehicleDisposition.UNCOOPERATIVE)/0.9/100000,
             1
         )
+        l_distribution = list(helper.VehicleDisposition.choose(0.1, size=100000))
+        self.assertAlmostEqual(
+            l_distribution.count(helper.VehicleDisposition.COOPERATIVE)/0.1/100000,
+            l_distribution.count(helper.VehicleDisposition.UNCOOPERATIVE)/0.9/100000,
+            1
+        )
 
     def test_statisticvalue(self):
         '''
@@ -29,8 +29,11 @@ import json
 import tempfile
 import logging
 import gzip
+import threading
 import unittest
 import h5py
+import lxml.etree
+import numpy
 import yaml
 try:
     from yaml import CSafeDumper as SafeDumper
@@ -396,6 +399,30 @@ class TestIO(unittest.TestCase):
 
         f_temp_test.close()
 
+    def test_write_xml(self):
+        '''test write_xml, i.e. streamed elements in plain and gzipped files'''
+
+        l_elements = [lxml.etree.Element('trip', attrib={'id': f'vehicle_{i}', 'depart': str(i / 2)}) for i in range(3)]
+        l_vehicle = lxml.etree.Element('vehicle', attrib={'id': 'vehicle_3'})
+        lxml.etree.SubElement(l_vehicle, 'route', attrib={'edges': 'a b'})
+        l_elements.append(l_vehicle)
+
+        with tempfile.TemporaryDirectory() as f_tmpdir:
+            for i_suffix, i_open in (('.xml', open), ('.xml.gz', gzip.open)):
+                with self.subTest(pattern=i_suffix):
+                    l_filename = f'{f_tmpdir}/trips{i_suffix}'
+                    colmto.common.io.Writer(None).write_xml('trips', iter(l_elements), l_filename)
+                    with i_open(l_filename, 'rb') as f_xml:
+                        l_root = lxml.etree.parse(f_xml).getroot()
+                    self.assertEqual(l_root.tag, 'trips')
+                    self.assertListEqual(
+                        [(i_element.tag, dict(i_element.attrib)) for i_element in l_root],
+                        [(i_element.tag, dict(i_element.attrib)) for i_element in l_elements]
+                    )
+                    self.assertEqual(l_root.find('vehicle/route').get('edges'), 'a b')
+
+            colmto.common.io.Writer(None).write_xml('routes', (), f'{f_tmpdir}/empty.xml')
+            self.assertEqual(len(lxml.etree.parse(f'{f_tmpdir}/empty.xml').getroot()), 0)
 
     def test_write_hdf5(self):
         '''test write_hdf5'''
@@ -488,6 +515,109 @@ class TestIO(unittest.TestCase):
                 hdf5_base_path='root'
             )
 
+    def test_hdf5_writer_session(self):
+        '''test HDF5WriterSession'''
+
+        f_temp_test = tempfile.NamedTemporaryFile(suffix='.hdf5')
+
+        with colmto.common.io.Writer(None).session(
+                f_temp_test.name, maxsize=2, compression='gzip', compression_opts=9, fletcher32=True
+        ) as l_session:
+            for i_run in range(10):
+                l_session.write(
+                    {
+                        'foo/baz': {'value': [i_run] * 100, 'attr': {'info': 'meh'}},
+                        'bar': {'value': i_run, 'attr': 'bar'}
+                    },
+                    hdf5_base_path=f'root/{i_run}'
+                )
+            # overwrite previous object
+            l_session.write({'bar': {'value': 23, 'attr': 'bar'}}, hdf5_base_path='root/0')
+
+            with self.assertRaises(TypeError):
+                l_session.write('foo', hdf5_base_path='root')
+
+        with self.assertRaises(RuntimeError):
+            l_session.write({'bar': {'value': 42, 'attr': 'bar'}}, hdf5_base_path='root/0')
+
+        with h5py.File(f_temp_test.name, 'r') as f_hdf5:
+            self.assertEqual(sorted(f_hdf5['root'].keys(), key=int), [str(i_run) for i_run in range(10)])
+            for i_run in range(10):
+                self.assertListEqual(f_hdf5[f'root/{i_run}/foo/baz'][()].tolist(), [i_run] * 100)
+                self.assertEqual(f_hdf5[f'root/{i_run}/foo/baz'].compression, 'gzip')
+                self.assertEqual(f_hdf5[f'root/{i_run}/foo/baz'].attrs.get('info'), 'meh')
+            self.assertEqual(f_hdf5['root/0/bar'][()], 23)
+            self.assertEqual(f_hdf5['root/1/bar'][()], 1)
+
+        # run-axis datasets, written out of order and with growing data axes
+        l_written = []
+        with colmto.common.io.Writer(None).session(f_temp_test.name, compression='gzip') as l_session:
+            l_session.write(
+                {'foo': {'value': [[1., 2.]], 'attr': {'info': 'meh'}}}, hdf5_base_path='runs', run=2,
+                written=lambda seconds: l_written.append((threading.current_thread(), seconds))
+            )
+            l_session.write({'foo': {'value': [[3.], [4.]], 'attr': {'info': 'meh'}}}, hdf5_base_path='runs', run=0)
+
+        # time spent writing is reported by the writer thread
+        self.assertEqual(len(l_written), 1)
+        self.assertIsNot(l_written[0][0], threading.current_thread())
+        self.assertGreater(l_written[0][1], 0.)
+
+        with h5py.File(f_temp_test.name, 'r') as f_hdf5:
+            self.assertEqual(f_hdf5['runs/foo'].shape, (3, 2, 2))
+            self.assertEqual(f_hdf5['runs/foo'].maxshape, (None, None, None))
+            self.assertEqual(f_hdf5['runs/foo'].attrs.get('info'), 'meh')
+            numpy.testing.assert_equal(
+                f_hdf5['runs/foo'][()],
+                [[[3., numpy.nan], [4., numpy.nan]], [[numpy.nan] * 2] * 2, [[1., 2.], [numpy.nan] * 2]]
+            )
+
+        with self.assertRaises(ValueError):
+            colmto.common.io.Writer(None).write_hdf5_run(
+                {'foo': {'value': [1.], 'attr': {}}}, f_temp_test.name, hdf5_base_path='runs', run=1
+            )
+
+        # virtual datasets
+        with h5py.File(f_temp_test.name, 'a') as f_hdf5:
+            f_hdf5.create_dataset('short', data=numpy.arange(50.))
+
+        with tempfile.NamedTemporaryFile(suffix='.hdf5') as f_temp_vds:
+            with h5py.File(f_temp_test.name, 'r') as f_source, \
+                    h5py.File(f_temp_vds.name, 'w', libver='latest') as f_vds:
+                colmto.common.io.Writer.stack_hdf5_virtual(
+                    [f_source[f'root/{i_run}/foo/baz'] for i_run in range(10)], f_vds, 'stacked/foo/baz'
+                )
+                colmto.common.io.Writer.link_hdf5_virtual(f_source['root'], f_vds, 'linked')
+                colmto.common.io.Writer.stack_hdf5_virtual(
+                    [f_source['short'], f_source['root/1/foo/baz']], f_vds, 'padded'
+                )
+
+            with h5py.File(f_temp_vds.name, 'r') as f_vds:
+                self.assertTrue(f_vds['stacked/foo/baz'].is_virtual)
+                self.assertTrue(f_vds['linked/3/foo/baz'].is_virtual)
+                self.assertEqual(f_vds['linked/3/foo/baz'].attrs.get('info'), 'meh')
+                self.assertEqual(f_vds['linked/3/bar'][()], 3)
+                numpy.testing.assert_equal(f_vds['stacked/foo/baz'][()], [[i_run] * 100 for i_run in range(10)])
+                numpy.testing.assert_equal(f_vds['linked/7/foo/baz'][()], [7] * 100)
+                numpy.testing.assert_equal(f_vds['padded'][()], [list(range(50)) + [numpy.nan] * 50, [1] * 100])
+
+            with h5py.File(f_temp_vds.name, 'a') as f_vds:
+                self.assertEqual(colmto.common.io.Writer.materialize_hdf5_virtual(f_vds, compression='gzip'), 12)
+                self.assertFalse(f_vds['stacked/foo/baz'].is_virtual)
+                self.assertEqual(f_vds['linked/3/foo/baz'].attrs.get('info'), 'meh')
+                numpy.testing.assert_equal(f_vds['stacked/foo/baz'][()], [[i_run] * 100 for i_run in range(10)])
+                numpy.testing.assert_equal(f_vds['padded'][()], [list(range(50)) + [numpy.nan] * 50, [1] * 100])
+                self.assertEqual(f_vds['linked/3/bar'][()], 3)
+                self.assertEqual(f_vds['padded'].compression, 'gzip')
+
+        # errors of the writer thread are raised in the calling thread
+        with self.assertRaises(RuntimeError):
+            with colmto.common.io.Writer(None).session(f_temp_test.name) as l_session:
+                l_session.write(
+                    {'foo/baz/raise/object/error': {'value': lambda x: x, 'attr': {'info': 'meh'}}},
+                    hdf5_base_path='root'
+                )
+
 
 if __name__ == '__main__':
     unittest.main()
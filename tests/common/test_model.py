@@ -133,6 +133,59 @@ class ModelTest(unittest.TestCase):
             166.5
         )
 
+    def test_nanquantile(self):
+        '''Test sort-based nanquantile against numpy.nanquantile.'''
+
+        l_prng = numpy.random.RandomState(42)
+        l_values = l_prng.random_sample((31, 4, 20)) * 100
+        l_values[l_prng.random_sample(l_values.shape) < 0.4] = numpy.nan
+        l_values[:, 0, 0] = numpy.nan
+        l_values[1:, 1, 1] = numpy.nan
+        for i_axis in (0, 2):
+            with numpy.errstate(all='ignore'), numpy.testing.suppress_warnings() as f_warnings:
+                f_warnings.filter(RuntimeWarning)
+                numpy.testing.assert_allclose(
+                    colmto.common.model.nanquantile(l_values, (0., .25, .5, .75, 1.), axis=i_axis),
+                    numpy.nanquantile(l_values, (0., .25, .5, .75, 1.), axis=i_axis)
+                )
+        numpy.testing.assert_equal(colmto.common.model.nanquantile([numpy.nan, 1., 3.], (.5,)), [2.])
+        self.assertTrue(numpy.isnan(colmto.common.model.nanquantile(numpy.empty((0, 2)), (.5,))).all())
+
+    def test_array_models(self):
+        '''
+        Test array-level unfairness and inefficiency against the scalar reference implementations
+        '''
+
+        l_prng = numpy.random.RandomState(42)
+        for i_shape in ((1, 1), (5, 3), (17, 40), (200, 50)):
+            with self.subTest(shape=i_shape):
+                l_data = l_prng.random_sample(i_shape) * 100
+                l_data[l_prng.random_sample(i_shape) < 0.3] = numpy.nan
+                l_data[:, 0] = numpy.nan
+                l_data[:min(3, i_shape[0]), -1] = numpy.nan
+                numpy.testing.assert_allclose(
+                    colmto.common.model.unfairness_array(l_data),
+                    [colmto.common.model.unfairness(pandas.Series(i_column)) for i_column in l_data.T]
+                )
+                numpy.testing.assert_allclose(
+                    colmto.common.model.unfairness_array(l_data.T, axis=1),
+                    [colmto.common.model.unfairness(pandas.Series(i_column)) for i_column in l_data.T]
+                )
+                numpy.testing.assert_allclose(
+                    colmto.common.model.inefficiency_array(l_data),
+                    [colmto.common.model.inefficiency(pandas.Series(i_column)) for i_column in l_data.T]
+                )
+
+        self.assertEqual(
+            colmto.common.model.unfairness_array(
+                [[150, 250, 688, 795, 795, 795, 895, 895, 895, 1099, 1166, 1333, 1499, 1693, 1699, 1775, 1895]],
+                axis=1
+            )[0],
+            704
+        )
+        numpy.testing.assert_equal(colmto.common.model.unfairness_array(numpy.empty((0, 3))), [0., 0., 0.])
+        numpy.testing.assert_equal(colmto.common.model.inefficiency_array(numpy.empty((0, 3))), [0., 0., 0.])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# @package tests.common
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Test module for common.profiling.
+'''
+
+from pathlib import Path
+import pstats
+import tempfile
+import time
+import unittest
+
+import colmto.common.profiling
+
+
+def _busy(seconds: float):
+    '''Keep the interpreter busy for given time.'''
+    l_end = time.perf_counter() + seconds
+    while time.perf_counter() < l_end:
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+    '''
+    Test cases for profiling of runs
+    '''
+
+    def test_selected(self):
+        '''Test selection of runs to profile'''
+
+        self.assertListEqual(
+            [i_run for i_run in range(1000) if colmto.common.profiling.selected(i_run, (0, 17, 500))], [0, 17, 500]
+        )
+        self.assertListEqual(
+            [i_run for i_run in range(10) if colmto.common.profiling.selected(i_run, ratio=.25)], [0, 4, 8]
+        )
+        self.assertListEqual(
+            [i_run for i_run in range(10) if colmto.common.profiling.selected(i_run, (3,), ratio=.5)],
+            [0, 2, 3, 4, 6, 8]
+        )
+        self.assertEqual(sum(colmto.common.profiling.selected(i_run, ratio=1.) for i_run in range(10)), 10)
+        self.assertFalse(any(colmto.common.profiling.selected(i_run) for i_run in range(10)))
+
+    def test_run_profiler(self):
+        '''Test profiler writes cProfile stats and collapsed stacks of its body'''
+
+        with tempfile.TemporaryDirectory() as f_tmpdir:
+            with colmto.common.profiling.RunProfiler(Path(f_tmpdir) / 'profile-foo-0', interval=0.001) as f_profiler:
+                _busy(.1)
+
+            l_profile_file, l_collapsed_file = f_profiler.files
+            self.assertEqual(l_profile_file, Path(f_tmpdir) / 'profile-foo-0.prof')
+            self.assertEqual(l_collapsed_file, Path(f_tmpdir) / 'profile-foo-0.collapsed')
+
+            self.assertIn('_busy', [i_function for _, _, i_function in pstats.Stats(str(l_profile_file)).stats])
+
+            with open(l_collapsed_file) as f_collapsed:
+                l_stacks = [i_line.rsplit(' ', 1) for i_line in f_collapsed.read().splitlines()]
+            self.assertTrue(l_stacks)
+            for i_stack, i_count in l_stacks:
+                self.assertGreater(int(i_count), 0)
+            # stacks from root to leaf, i.e. the busy loop inside this test
+            self.assertTrue(
+                any('test_run_profiler (test_profiling.py:' in i_stack and i_stack.split(';')[-1].startswith('_busy')
+                    for i_stack, _ in l_stacks)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,8 +27,13 @@ colmto: Test module for common.statistics.
 
 import unittest
 
+import numpy
+import pandas
+
 import colmto.common.statistics
 import colmto.common.io
+import colmto.common.helper
+from colmto.common.helper import Metric, StatisticSeries
 
 try:
     import colmto.environment
@@ -66,6 +71,202 @@ class TestStatistics(unittest.TestCase):
         with self.assertRaises(AttributeError):
             colmto.common.statistics.Statistics('foo')
 
+    def test_sliding_window(self):
+        '''Test SlidingWindow against numpy's nan-aware statistics.'''
+
+        with self.assertRaises(ValueError):
+            colmto.common.statistics.SlidingWindow(0)
+
+        l_window = colmto.common.statistics.SlidingWindow(5)
+        self.assertEqual(len(l_window), 5)
+        self.assertTrue(numpy.isnan(l_window).all())
+        self.assertTrue(numpy.isnan(l_window.nanmedian()).all())
+        numpy.testing.assert_equal(l_window.nan_count(), [5])
+
+        with self.assertRaises(ValueError):
+            l_window.append((1., 2.))
+
+        for i_value in (1., None, 3., 2.):
+            l_window.append(i_value)
+        numpy.testing.assert_equal(numpy.asarray(l_window)[:, 0], [numpy.nan, 1., numpy.nan, 3., 2.])
+        numpy.testing.assert_equal(l_window.nan_count(), [2])
+        self.assertEqual(l_window.nanmedian()[0], 2.)
+
+        l_prng = numpy.random.RandomState(42)
+        for i_length, i_fields in ((1, 1), (7, 1), (60, 4), (600, 2)):
+            with self.subTest(pattern=(i_length, i_fields)):
+                l_window = colmto.common.statistics.SlidingWindow(i_length, fields=i_fields)
+                l_values = l_prng.randint(0, 10, size=(3 * i_length, i_fields)).astype(float)
+                l_values[l_prng.random_sample(l_values.shape) < 0.3] = numpy.nan
+                for i_step, i_value in enumerate(l_values):
+                    l_window.append(i_value)
+                    l_expected = numpy.vstack(
+                        (numpy.full((max(0, i_length - i_step - 1), i_fields), numpy.nan), l_values[:i_step + 1])
+                    )[-i_length:]
+                    numpy.testing.assert_equal(numpy.asarray(l_window), l_expected)
+                    numpy.testing.assert_equal(l_window.nan_count(), numpy.isnan(l_expected).sum(axis=0))
+                    with numpy.errstate(all='ignore'), numpy.testing.suppress_warnings() as f_warnings:
+                        f_warnings.filter(RuntimeWarning)
+                        numpy.testing.assert_equal(l_window.nanmedian(), numpy.nanmedian(l_expected, axis=0))
+
+    def test_interpolate_nan(self):
+        '''Test vectorised NaN interpolation against pandas.Series.interpolate.'''
+
+        numpy.testing.assert_equal(
+            colmto.common.statistics.interpolate_nan([numpy.nan, 1., numpy.nan, numpy.nan, 4., numpy.nan]),
+            [numpy.nan, 1., 2., 3., 4., 4.]
+        )
+
+        l_prng = numpy.random.RandomState(42)
+        l_values = l_prng.random_sample((20, 3, 50)) * 100
+        l_values[l_prng.random_sample(l_values.shape) < 0.6] = numpy.nan
+        l_values[0] = numpy.nan
+        l_values[1, :, :10] = numpy.nan
+        l_values[2, :, 40:] = numpy.nan
+        numpy.testing.assert_array_equal(
+            colmto.common.statistics.interpolate_nan(l_values),
+            numpy.array([[pandas.Series(i_row).interpolate().values for i_row in i_rows] for i_rows in l_values])
+        )
+
+    def test_quantile_sketch(self):
+        '''Test rank error of merged and restored quantile sketches against exact values.'''
+
+        with self.assertRaises(ValueError):
+            colmto.common.statistics.QuantileSketch(3, epsilon=0.)
+
+        l_sketch = colmto.common.statistics.QuantileSketch(2)
+        self.assertTrue(numpy.isnan(l_sketch.median()).all())
+        l_sketch.update([[1., numpy.nan], [2., numpy.nan], [3., numpy.nan]])
+        numpy.testing.assert_equal(l_sketch.count(), [3, 0])
+        numpy.testing.assert_equal(l_sketch.median(), [2., numpy.nan])
+        with self.assertRaises(ValueError):
+            l_sketch.merge(colmto.common.statistics.QuantileSketch(3))
+
+        l_prng = numpy.random.RandomState(42)
+        l_quantiles = (0., .1, .25, .5, .75, .9, 1.)
+        for i_epsilon in (.05, .01):
+            with self.subTest(epsilon=i_epsilon):
+                # runs of vehicles x cells, one sketch for all runs and one per worker merged afterwards
+                l_values = l_prng.lognormal(size=(200, 100, 20))
+                l_values[l_prng.random_sample(l_values.shape) < 0.3] = numpy.nan
+                l_values[:, :, 0] = numpy.nan
+                l_sketch = colmto.common.statistics.QuantileSketch(20, i_epsilon, seed=42)
+                l_workers = [colmto.common.statistics.QuantileSketch(20, i_epsilon, seed=i_seed) for i_seed in range(4)]
+                for i_run, i_values in enumerate(l_values):
+                    l_sketch.update(i_values)
+                    l_workers[i_run % 4].update(i_values)
+                for i_worker in l_workers[1:]:
+                    l_workers[0].merge(i_worker)
+                l_restored = colmto.common.statistics.QuantileSketch.from_state(
+                    [i_level.get('value') for i_level in l_workers[0].state().values()], i_epsilon
+                )
+
+                l_values = l_values.reshape(-1, 20)
+                l_count = numpy.count_nonzero(~numpy.isnan(l_values), axis=0)
+                for i_merged in (l_sketch, l_workers[0], l_restored):
+                    numpy.testing.assert_equal(i_merged.count(), l_count)
+                    self.assertLess(sum(i_level.shape[1] for i_level in i_merged.levels), l_values.shape[0] / 10)
+                    l_estimates = i_merged.quantiles(l_quantiles)
+                    self.assertTrue(numpy.isnan(l_estimates[:, 0]).all())
+                    for i_quantile, i_estimate in zip(l_quantiles, l_estimates[:, 1:]):
+                        l_ranks = numpy.sum(l_values[:, 1:] <= i_estimate, axis=0) / l_count[1:]
+                        l_lower_ranks = numpy.sum(l_values[:, 1:] < i_estimate, axis=0) / l_count[1:]
+                        self.assertTrue((l_ranks >= i_quantile - i_epsilon).all())
+                        self.assertTrue((l_lower_ranks <= i_quantile + i_epsilon).all())
+                    numpy.testing.assert_array_equal(
+                        i_merged.h_spread(), numpy.subtract(*i_merged.quantiles((.75, .25)))
+                    )
+
+    def test_merge_vehicle_series(self):
+        '''Test merged series of a shared store against per vehicle series'''
+
+        l_store = colmto.environment.vehicle.VehicleStore({'gridlength': 20, 'gridcellwidth': 4})
+        l_vehicles = {
+            f'vehicle_{i_vid}': colmto.environment.vehicle.SUMOVehicle(
+                environment={'gridlength': 20, 'gridcellwidth': 4},
+                vtype_sumo_cfg={'dsat_threshold': 0.2},
+                vehicle_type=('passenger', 'truck', 'tractor')[i_vid % 3],
+                speed_max=20.,
+                store=l_store
+            ) for i_vid in range(7)
+        }
+        for i_vid, i_vehicle in enumerate(l_vehicles.values()):
+            i_vehicle.sumo_id = f'vehicle_{i_vid}'
+        for i_time_step in range(1, 8):
+            l_store.update_all(
+                list(l_vehicles.keys()),
+                [(i_time_step * (10. + i_vid), 0.) for i_vid in range(7)],
+                [i_vid % 2 for i_vid in range(7)],
+                [10. + i_vid for i_vid in range(7)],
+                i_time_step
+            )
+
+        l_merged = colmto.common.statistics.Statistics().merge_vehicle_series(1, l_vehicles)
+
+        # vehicles folded into an accumulator in batches, e.g. as they arrive, merge to the same series
+        l_accumulator = colmto.common.statistics.VehicleSeriesAccumulator()
+        for i_vids in (('vehicle_5', 'vehicle_1'), ('vehicle_0',), (), ('vehicle_6', 'vehicle_2', 'vehicle_4', 'vehicle_3')):
+            l_accumulator.add({i_vid: l_vehicles[i_vid] for i_vid in i_vids})
+        self.assertEqual(len(l_accumulator), 7)
+        l_accumulated = colmto.common.statistics.Statistics().merge_vehicle_series(1, l_accumulator)
+        for i_vtype, i_metrics in l_merged['grid_based_series'].items():
+            for i_metric, i_frame in i_metrics.items():
+                pandas.testing.assert_frame_equal(
+                    l_accumulated['grid_based_series'][i_vtype][i_metric]['value'], i_frame['value']
+                )
+        self.assertEqual(
+            colmto.common.statistics.Statistics().merge_vehicle_series(
+                1, colmto.common.statistics.VehicleSeriesAccumulator()
+            )['grid_based_series']['all'],
+            {}
+        )
+
+        l_sketches = colmto.common.statistics.Statistics.update_sketches({}, l_merged, epsilon=.05)
+        colmto.common.statistics.Statistics.update_sketches(l_sketches, l_merged)
+        l_summaries = colmto.common.statistics.Statistics.sketch_summaries(l_sketches)
+        self.assertNotIn('heavytransport', l_summaries)
+        l_summary = l_summaries['passenger'][StatisticSeries.GRID.value][Metric.TRAVEL_TIME.value]
+        l_frame = l_merged['grid_based_series']['passenger'][Metric.TRAVEL_TIME.value]['value']
+        numpy.testing.assert_equal(l_summary['count']['value'], 2 * l_frame.count().values)
+        with numpy.errstate(all='ignore'), numpy.testing.suppress_warnings() as f_warnings:
+            f_warnings.filter(RuntimeWarning)
+            numpy.testing.assert_equal(
+                l_summary['median']['value'],
+                numpy.nanquantile(numpy.vstack((l_frame.values,) * 2), .5, axis=0, method='inverted_cdf')
+            )
+        self.assertEqual(l_summary['median']['attr']['epsilon'], .05)
+
+        # sketches of the same seed keep the same values, i.e. estimates are reproducible
+        l_prng = numpy.random.RandomState(42)
+        l_runs = [
+            {'grid_based_series': {'all': {Metric.TRAVEL_TIME.value: {'value': l_prng.random_sample((100, 3))}}}}
+            for _ in range(20)
+        ]
+        l_seeded = [{}, {}, {}]
+        for i_run in l_runs:
+            for i_sketches, i_seed in zip(l_seeded, (7, 7, 8)):
+                colmto.common.statistics.Statistics.update_sketches(i_sketches, i_run, epsilon=.1, seed=i_seed)
+        l_levels = [
+            [i_level.get('value') for i_level in i_sketches[('grid_based_series', 'all', Metric.TRAVEL_TIME.value)].state().values()]
+            for i_sketches in l_seeded
+        ]
+        for i_level, i_other in zip(l_levels[0], l_levels[1]):
+            numpy.testing.assert_equal(i_level, i_other)
+        self.assertFalse(all(numpy.array_equal(i_level, i_other) for i_level, i_other in zip(l_levels[0], l_levels[2])))
+
+        self.assertEqual(l_merged['grid_based_series']['heavytransport'], {})
+        for i_vtype, i_vids in (('all', range(7)), ('passenger', (0, 3, 6)), ('truck', (1, 4)), ('tractor', (2, 5))):
+            for i_metric in colmto.common.helper.StatisticSeries.metrics():
+                l_frame = l_merged['grid_based_series'][i_vtype][i_metric.value]['value']
+                self.assertListEqual(list(l_frame.index), [f'vehicle_{i_vid}' for i_vid in i_vids])
+                numpy.testing.assert_array_equal(
+                    l_frame.values,
+                    numpy.array([
+                        l_vehicles[f'vehicle_{i_vid}'].statistic_series_grid(interpolate=True)[i_metric.value].values
+                        for i_vid in i_vids
+                    ])
+                )
+
     @staticmethod
     def test_aggregate_hdf5():
         '''
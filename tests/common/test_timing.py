@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# @package tests.common
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Test module for common.timing.
+'''
+
+import unittest
+
+import colmto.common.timing
+
+
+class TestPhaseTimer(unittest.TestCase):
+    '''
+    Test cases for PhaseTimer
+    '''
+
+    def test_summary(self):
+        '''Test times of phases are attributed to steps and aggregated'''
+
+        l_timer = colmto.common.timing.PhaseTimer(('foo', 'bar'))
+        self.assertTupleEqual(l_timer.phases, ('foo', 'bar'))
+        self.assertTrue(l_timer)
+
+        for _ in range(10):
+            l_timer.lap()
+            l_timer.lap('foo').lap('bar').lap('foo').step()
+        l_timer.add('write', .5).add('write', .25)
+
+        l_summary = l_timer.summary()
+        self.assertCountEqual(l_summary, ('foo', 'bar', 'write'))
+        self.assertDictEqual(l_summary.get('write'), {'total': .75})
+        for i_phase in ('foo', 'bar'):
+            with self.subTest(pattern=i_phase):
+                self.assertEqual(l_summary.get(i_phase).get('steps'), 10)
+                self.assertEqual(sum(l_summary.get(i_phase).get('histogram')), 10)
+                self.assertEqual(
+                    len(l_summary.get(i_phase).get('histogram')), len(colmto.common.timing.HISTOGRAM_BIN_EDGES) - 1
+                )
+                self.assertLessEqual(l_summary.get(i_phase).get('median'), l_summary.get(i_phase).get('max'))
+                self.assertAlmostEqual(
+                    l_summary.get(i_phase).get('total'), 10 * l_summary.get(i_phase).get('mean')
+                )
+
+        self.assertIn('write 0.75 s', colmto.common.timing.PhaseTimer.format_summary(l_summary))
+
+        with self.assertRaises(KeyError):
+            l_timer.lap('baz')
+
+    def test_summary_empty(self):
+        '''Test summary of a timer without steps'''
+
+        l_summary = colmto.common.timing.PhaseTimer().summary()
+        self.assertCountEqual(l_summary, colmto.common.timing.STEP_PHASES)
+        self.assertEqual(l_summary.get('sumo').get('steps'), 0)
+        self.assertEqual(l_summary.get('sumo').get('total'), 0.)
+        self.assertEqual(colmto.common.timing.PhaseTimer.format_summary({}), '')
+
+    def test_null_timer(self):
+        '''Test disabled timer does nothing'''
+
+        self.assertFalse(colmto.common.timing.NULL_TIMER)
+        self.assertIs(
+            colmto.common.timing.NULL_TIMER.lap().lap('foo').step().add('bar', 1.), colmto.common.timing.NULL_TIMER
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,7 @@ import colmto.environment.vehicle
 from colmto.common.helper import VehicleType
 from colmto.common.helper import StatisticValue
 from colmto.common.helper import Position
+from colmto.common.helper import VehicleDisposition
 
 
 class TestCSE(unittest.TestCase):
@@ -108,6 +109,14 @@ class TestCSE(unittest.TestCase):
         for i_vehicle in l_vehicles:
             i_vehicle._properties['position'] = Position(numpy.random.randint(0, 120), numpy.random.randint(0, 1)) # pylint: disable=protected-access
 
+        self.assertListEqual(
+            l_sumo_cse.deny_mask(l_sumo_cse.vehicle_columns(l_vehicles)).tolist(),
+            [
+                any(i_rule.applies_to(i_vehicle) for i_rule in l_sumo_cse.rules)
+                for i_vehicle in l_vehicles
+            ]
+        )
+
         l_sumo_cse.apply(l_vehicles)
 
         for i_vehicle in l_vehicles:
@@ -274,8 +283,108 @@ class TestCSE(unittest.TestCase):
             )
         for i_vtype in VehicleType:
             for _ in range(50):
-                l_cse._dissatisfaction.get(i_vtype).appendleft(StatisticValue.nanof((2, 3, 4, 5, 2)))
+                l_cse._dissatisfaction.get(i_vtype).append(StatisticValue.nanof((2, 3, 4, 5, 2)))
             self.assertTupleEqual(l_cse._median_dissatisfaction().get(i_vtype), (2.0, 3.0, 3.2, 5.0))
 
+    def test_actuation(self):
+        '''
+        Test change-only actuation of vehicles via TraCI and command counters
+        '''
+
+        for i_cosmetic in (True, False):
+            with self.subTest(pattern=i_cosmetic):
+                l_commands = []
+                l_traci = SimpleNamespace(
+                    vehicle=SimpleNamespace(
+                        setColor=lambda *args: l_commands.append(('setColor',) + args),
+                        changeLane=lambda *args: l_commands.append(('changeLane',) + args),
+                        setVehicleClass=lambda *args: l_commands.append(('setVehicleClass',) + args)
+                    )
+                )
+                l_cse = colmto.cse.cse.SumoCSE().add_rule(colmto.cse.rule.SUMOMinimalSpeedRule(80.))
+                l_cse.traci(l_traci, cosmetic=i_cosmetic)
+
+                l_vehicles = [
+                    colmto.environment.vehicle.SUMOVehicle(
+                        environment={'gridlength': 200, 'gridcellwidth': 4},
+                        speed_max=i_speed_max
+                    ) for i_speed_max in (50., 50., 100.)
+                ]
+                for i_id, i_vehicle in enumerate(l_vehicles):
+                    i_vehicle.sumo_id = str(i_id)
+                l_vehicles[1]._properties['cooperation_disposition'] = VehicleDisposition.UNCOOPERATIVE  # pylint: disable=protected-access
+
+                # first actuation: all vehicles transition
+                l_cse.apply(l_vehicles)
+                self.assertEqual(len([i_c for i_c in l_commands if i_c[0] == 'setVehicleClass']), 3)
+                self.assertEqual(len([i_c for i_c in l_commands if i_c[0] == 'setColor']), 3 if i_cosmetic else 0)
+                # cooperative vehicles keep right until allowed, instead of a 1 s lane change each step
+                self.assertListEqual(
+                    [i_c for i_c in l_commands if i_c[0] == 'changeLane'],
+                    [('changeLane', '0', 0, 86400.)]
+                )
+                # float seconds, traci warns about integer durations >= 1000
+                self.assertIsInstance([i_c for i_c in l_commands if i_c[0] == 'changeLane'][0][-1], float)
+                self.assertEqual(l_cse.commands.get('sent'), len(l_commands))
+                self.assertEqual(l_cse.commands.get('suppressed'), 0 if i_cosmetic else 3)
+
+                # no transitions: nothing is sent
+                del l_commands[:]
+                l_cse.apply(l_vehicles)
+                self.assertListEqual(l_commands, [])
+                self.assertEqual(l_cse.commands.get('suppressed'), (0 if i_cosmetic else 3) + 7)
+
+                # cooperative vehicle transitions to allowed, releasing the right lane
+                l_vehicles[0]._properties['maxSpeed'] = 90.  # pylint: disable=protected-access
+                l_vehicles[0]._properties['lane_index'] = 1  # pylint: disable=protected-access
+                l_cse.apply(l_vehicles)
+                self.assertListEqual(
+                    [i_c[0] for i_c in l_commands],
+                    (['setColor'] if i_cosmetic else []) + ['changeLane', 'setVehicleClass']
+                )
+                # stay on the current lane, i.e. end the keep right lane change
+                self.assertIn(('changeLane', '0', 1, 0), l_commands)
+                self.assertEqual(l_vehicles[0].vehicle_class, colmto.cse.rule.SUMORule.allowed_class_name())
+                self.assertEqual(l_cse.commands.get('sent'), (7 if i_cosmetic else 4) + len(l_commands))
+
+    def test_observation(self):
+        '''
+        Test versioned observation snapshots and memoization of their aggregates
+        '''
+
+        l_calls = []
+        l_observation = colmto.cse.cse.Observation(
+            3,
+            occupancy=lambda: l_calls.append(1) or {'21edge_0': 0.5}
+        )
+        self.assertEqual(l_observation.version, 3)
+        self.assertEqual(l_observation.occupancy.get('21edge_0'), 0.5)
+        self.assertIs(l_observation.occupancy, l_observation.occupancy)
+        self.assertEqual(len(l_calls), 1)
+        with self.assertRaises(AttributeError):
+            l_observation.foo  # pylint: disable=pointless-statement
+
+        l_cse = colmto.cse.cse.SumoCSE()
+        l_cse.traci(SimpleNamespace(constants=SimpleNamespace(LAST_STEP_OCCUPANCY=13)))
+        self.assertEqual(l_cse.observation.version, 0)
+        self.assertTrue(numpy.isnan(l_cse.observation.occupancy.get('21edge_0')))
+
+        for i_step, i_occupancy in enumerate((0.2, 0.4, 0.6)):
+            l_previous = l_cse.observation
+            l_cse.observe_traffic({'21edge_0': {13: i_occupancy}}, {}, {})
+            self.assertIsNot(l_cse.observation, l_previous)
+            self.assertEqual(l_cse.observation.version, i_step + 1)
+            numpy.testing.assert_equal(dict(l_cse.observation.occupancy), l_cse._median_occupancy())  # pylint: disable=protected-access
+            numpy.testing.assert_equal(dict(l_cse.observation.dissatisfaction), l_cse._median_dissatisfaction())  # pylint: disable=protected-access
+
+        self.assertEqual(l_cse.observation.occupancy.get('21edge_0'), 0.4)
+
+        l_cse = colmto.cse.cse.SumoCSE(observation_window=2)
+        l_cse.traci(SimpleNamespace(constants=SimpleNamespace(LAST_STEP_OCCUPANCY=13)))
+        for i_occupancy in (0.2, 0.4, 0.6):
+            l_cse.observe_traffic({'21edge_0': {13: i_occupancy}}, {}, {})
+        self.assertEqual(len(l_cse._occupancy_window.get('21edge_0')), 2)  # pylint: disable=protected-access
+        self.assertAlmostEqual(l_cse.observation.occupancy.get('21edge_0'), 0.5)
+
 if __name__ == '__main__':
     unittest.main()
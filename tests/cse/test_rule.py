@@ -26,6 +26,7 @@ colmto: Test module for environment.rule.
 '''
 import random
 import typing   # pylint: disable=unused-import
+from types import SimpleNamespace
 import unittest
 
 import colmto.cse.cse
@@ -627,9 +628,118 @@ class TestRule(unittest.TestCase):
                     self.assertFalse(l_occupancy_rule.applies_to(l_vehicle, occupancy={'21edge_0': i_occupancy/10}))
 
         self.assertFalse(l_occupancy_rule.applies_to(l_vehicle))
+        self.assertTrue(
+            l_occupancy_rule.applies_to(
+                l_vehicle, observation=SimpleNamespace(occupancy={'21edge_0': 0.5})
+            )
+        )
+        self.assertFalse(
+            l_occupancy_rule.applies_to(
+                l_vehicle, observation=SimpleNamespace(occupancy={'21edge_0': 0.9})
+            )
+        )
         with self.assertRaises(AssertionError):
             colmto.cse.rule.SUMOOccupancyRule(occupancy_range=(0, 1.1))
             colmto.cse.rule.SUMOOccupancyRule(occupancy_range=(-1, 0.8))
 
+    def test_applies_to_vehicles(self):
+        '''
+        Test vectorised rule evaluation against per-vehicle evaluation
+        '''
+
+        l_vtypes = [i_vtype for i_vtype in colmto.common.helper.VehicleType]
+        l_vehicles = []
+        for _ in range(500):
+            l_vehicle = colmto.environment.vehicle.SUMOVehicle(
+                environment={'gridlength': 200, 'gridcellwidth': 4},
+                vehicle_type=random.choice(l_vtypes[:-1]).value,
+                speed_max=random.randrange(0, 250)
+            )
+            l_vehicle._properties['position'] = colmto.common.helper.Position(  # pylint: disable=protected-access
+                random.uniform(-10, 150), random.randint(-1, 2)
+            )
+            l_vehicle._properties['dissatisfaction'] = random.random()  # pylint: disable=protected-access
+            l_vehicles.append(l_vehicle)
+
+        l_observation = SimpleNamespace(
+            occupancy={'21edge_0': 0.3, '21edge_1': float('nan')},
+            dissatisfaction={
+                i_vtype: colmto.common.helper.StatisticValue(0.1, 0.2 * i_code, 0.4, 0.9)
+                for i_code, i_vtype in enumerate(l_vtypes)
+            }
+        )
+
+        l_rules = [
+            colmto.cse.rule.SUMOUniversalRule(),
+            colmto.cse.rule.SUMONullRule(),
+            colmto.cse.rule.SUMOVTypeRule('truck'),
+            colmto.cse.rule.SUMOMinimalSpeedRule(80.),
+            colmto.cse.rule.SUMOPositionRule(bounding_box=((0., 0), (64.0, 1))),
+            colmto.cse.rule.SUMOPositionRule(bounding_box=((0., 0), (64.0, 1)), outside=True),
+            colmto.cse.rule.SUMOVehicleDissatisfactionRule((0.25, 0.75)),
+            colmto.cse.rule.SUMOVehicleDissatisfactionRule((0.25, 0.75), outside=True),
+            colmto.cse.rule.SUMOGlobalDissatisfactionRule((0.3, 0.7)),
+            colmto.cse.rule.SUMOOccupancyRule((0.2, 0.4)),
+            colmto.cse.rule.SUMOOccupancyRule((0.2, 0.4), lane_id='21edge_1'),
+            colmto.cse.rule.ExtendableSUMOVTypeRule('passenger'),
+        ]
+        for i_operator in colmto.common.helper.RuleOperator:
+            l_rules.extend(
+                (
+                    colmto.cse.rule.ExtendableSUMOPositionRule(
+                        bounding_box=((20., -1), (100.0, 1)),
+                        subrules=[colmto.cse.rule.SUMOMinimalSpeedRule(120.), colmto.cse.rule.SUMOVTypeRule('tractor')],
+                        subrule_operator=i_operator
+                    ),
+                    colmto.cse.rule.ExtendableSUMOVTypeRule(
+                        'passenger',
+                        subrules=[colmto.cse.rule.SUMOVehicleDissatisfactionRule((0., 0.5)),
+                                  colmto.cse.rule.SUMOOccupancyRule((0.2, 0.4))],
+                        subrule_operator=i_operator
+                    ),
+                    colmto.cse.rule.ExtendableSUMOMinimalSpeedRule(
+                        100.,
+                        subrules=[colmto.cse.rule.SUMOPositionRule(bounding_box=((0., 0), (64.0, 1)), outside=True)],
+                        subrule_operator=i_operator
+                    ),
+                    colmto.cse.rule.ExtendableSUMOVehicleDissatisfactionRule(
+                        (0.5, 1.),
+                        subrules=[colmto.cse.rule.SUMOGlobalDissatisfactionRule((0.5, 1.))],
+                        subrule_operator=i_operator
+                    ),
+                )
+            )
+
+        l_columns = colmto.cse.cse.SumoCSE.vehicle_columns(l_vehicles)
+
+        for i_rule in l_rules:
+            with self.subTest(pattern=str(i_rule)):
+                self.assertListEqual(
+                    i_rule.applies_to_vehicles(l_columns, observation=l_observation).tolist(),
+                    [i_rule.applies_to(i_vehicle, observation=l_observation) for i_vehicle in l_vehicles]
+                )
+
+        # rules without vectorised implementation fall back to evaluating each vehicle
+        class PerVehicleRule(colmto.cse.rule.SUMOVehicleRule):
+            '''Rule without vectorised implementation'''
+
+            def applies_to(self, vehicle, **kwargs):
+                return vehicle.speed_max < 100.
+
+        for i_rule in (
+                PerVehicleRule(),
+                colmto.cse.rule.ExtendableSUMOVTypeRule('passenger', subrules=[PerVehicleRule()])):
+            with self.subTest(pattern=str(i_rule)):
+                self.assertListEqual(
+                    i_rule.applies_to_vehicles(l_columns, observation=l_observation).tolist(),
+                    [i_rule.applies_to(i_vehicle, observation=l_observation) for i_vehicle in l_vehicles]
+                )
+
+        self.assertListEqual(
+            colmto.cse.rule.SUMORule.applies_to_vehicles(colmto.cse.rule.SUMOUniversalRule(), l_columns).tolist(),
+            [True] * len(l_vehicles)
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
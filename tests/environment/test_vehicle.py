@@ -25,6 +25,7 @@
 colmto: Test module for environment.vehicle.
 '''
 import unittest
+import numpy
 import colmto.environment.vehicle
 from colmto.common.helper import Behaviour
 from colmto.common.helper import Colour
@@ -32,6 +33,8 @@ from colmto.common.helper import VehicleType
 from colmto.common.helper import VehicleDisposition
 from colmto.common.helper import Position
 from colmto.common.helper import GridPosition
+from colmto.common.helper import Metric
+from colmto.common.helper import StatisticSeries
 
 class TestVehicle(unittest.TestCase):
     '''
@@ -185,6 +188,195 @@ class TestVehicle(unittest.TestCase):
 
         self.assertAlmostEqual(l_sumovehicle.dissatisfaction, .5, places=4)
 
+    def test_vehicle_store(self):
+        '''Test VehicleStore, i.e. batched updates are equal to updating vehicles one by one'''
+        l_environment = {'gridlength': 200, 'gridcellwidth': 4}
+        l_store = colmto.environment.vehicle.VehicleStore(l_environment, capacity=2)
+        l_vehicles = [
+            colmto.environment.vehicle.SUMOVehicle(
+                environment=l_environment,
+                speed_max=i_speed_max,
+                vehicle_type=i_vtype,
+                vtype_sumo_cfg={'dsat_threshold': 0.2},
+                store=l_store
+            ) for i_speed_max, i_vtype in ((15., 'passenger'), (20., 'truck'), (25., 'tractor'))
+        ]
+        l_single_vehicles = [
+            colmto.environment.vehicle.SUMOVehicle(
+                environment=l_environment,
+                speed_max=i_vehicle.speed_max,
+                vehicle_type=i_vehicle.properties.get('vType'),
+                vtype_sumo_cfg={'dsat_threshold': 0.2}
+            ) for i_vehicle in l_vehicles
+        ]
+
+        # capacity grows beyond initially allocated slots
+        self.assertEqual(len(l_store), 3)
+        self.assertListEqual([i_vehicle.slot for i_vehicle in l_vehicles], [0, 1, 2])
+        self.assertIs(colmto.environment.vehicle.VehicleStore.of(l_vehicles), l_store)
+        with self.assertRaises(ValueError):
+            colmto.environment.vehicle.VehicleStore.of(l_vehicles + l_single_vehicles)
+        self.assertEqual(len(colmto.environment.vehicle.VehicleStore.of([])), 0)
+
+        for i_index, (i_vehicle, i_single_vehicle) in enumerate(zip(l_vehicles, l_single_vehicles)):
+            i_vehicle.sumo_id = f'vehicle_{i_index}'
+            i_vehicle.start_time = i_single_vehicle.start_time = i_index
+            i_vehicle.start_position = i_single_vehicle.start_position = Position(i_index, 0.)
+
+        numpy.testing.assert_array_equal(
+            l_store['vehicle_type'],
+            [VehicleType.PASSENGER.code, VehicleType.TRUCK.code, VehicleType.TRACTOR.code]
+        )
+
+        for i_time_step, i_positions, i_lanes, i_speeds in (
+                (3, ((40.2, 0.), (20.1, 0.)), (0, 1), (14., 19.9)),
+                (10, ((141.5, 1.), (160.7, 0.), (150.05, 0.)), (1, 0, 0), (15., 20., 24.5))
+        ):
+            l_ids = tuple(f'vehicle_{i_index}' for i_index in range(len(i_positions)))
+            numpy.testing.assert_array_equal(
+                l_store.update_all(l_ids, i_positions, i_lanes, i_speeds, i_time_step),
+                range(len(i_positions))
+            )
+            for i_single_vehicle, i_position, i_lane, i_speed in zip(l_single_vehicles, i_positions, i_lanes, i_speeds):
+                i_single_vehicle.update(Position(*i_position), i_lane, i_speed, i_time_step)
+
+        for i_vehicle, i_single_vehicle in zip(l_vehicles, l_single_vehicles):
+            self.assertEqual(i_vehicle.position, i_single_vehicle.position)
+            self.assertEqual(i_vehicle.grid_position, i_single_vehicle.grid_position)
+            self.assertEqual(i_vehicle.lane, i_single_vehicle.lane)
+            self.assertEqual(i_vehicle.speed, i_single_vehicle.speed)
+            self.assertEqual(i_vehicle.travel_time, i_single_vehicle.travel_time)
+            self.assertEqual(i_vehicle.dissatisfaction, i_single_vehicle.dissatisfaction)
+            self.assertIsInstance(i_vehicle.properties.get('position'), Position)
+            self.assertIsInstance(i_vehicle.properties.get('speed'), float)
+            self.assertIsInstance(i_vehicle.properties.get('lane_index'), int)
+            numpy.testing.assert_equal(
+                i_vehicle.statistic_series_grid().to_dict(),
+                i_single_vehicle.statistic_series_grid().to_dict()
+            )
+
+        numpy.testing.assert_array_equal(l_store['speed'], (15., 20., 24.5))
+        numpy.testing.assert_array_equal(
+            l_store.columns(numpy.array((2, 0)), ('position_x', 'lane_index')).get('position_x'),
+            (150.05, 141.5)
+        )
+
+        with self.assertRaises(KeyError):
+            l_store.update_all(('vehicle_23',), ((0., 0.),), (0,), (0.,), 10)
+
+        # released rows read as NaN and get reused by vehicles updated later, the array does not grow
+        l_grid_series = l_store.grid_series(numpy.arange(3))
+        l_rows = len(l_store._grid_series)  # pylint: disable=protected-access
+        l_store.release(numpy.array((0, 1)))
+        self.assertTrue(numpy.isnan(l_vehicles[0].grid_series()).all())
+        numpy.testing.assert_equal(l_store.grid_series(numpy.arange(3))[2], l_grid_series[2])
+        l_next_vehicles = [
+            colmto.environment.vehicle.SUMOVehicle(
+                environment=l_environment,
+                speed_max=20.,
+                vtype_sumo_cfg={'dsat_threshold': 0.2},
+                store=l_store
+            ) for _ in range(2)
+        ]
+        for i_index, i_vehicle in enumerate(l_next_vehicles):
+            i_vehicle.sumo_id = f'vehicle_{3 + i_index}'
+            i_vehicle.start_time = 10
+            i_vehicle.start_position = Position(0., 0.)
+        l_store.update_all(('vehicle_3', 'vehicle_4'), ((8., 0.), (12., 0.)), (0, 0), (20., 20.), 11)
+        self.assertEqual(len(l_store._grid_series), l_rows)  # pylint: disable=protected-access
+        self.assertEqual(
+            numpy.count_nonzero(~numpy.isnan(l_store.grid_series(numpy.arange(5))[3:, 0])), 2
+        )
+        numpy.testing.assert_equal(l_store.grid_series(numpy.arange(5))[2], l_grid_series[2])
+
+    def test_batch(self):
+        '''Test SUMOVehicle.batch, i.e. vehicles created at once are equal to vehicles created one by one'''
+        l_environment = {'gridlength': 200, 'gridcellwidth': 4}
+        l_templates = {
+            'passenger': {'vtype_sumo_cfg': {'dsat_threshold': 0.2, 'length': 4.}, 'sigma': 0.5},
+            'truck': {'vtype_sumo_cfg': {'dsat_threshold': 0.3}, 'speed_deviation': 0.1}
+        }
+        l_vtypes = ('truck', 'passenger', 'truck')
+        l_vehicles = colmto.environment.vehicle.SUMOVehicle.batch(
+            environment=l_environment,
+            vehicle_types=l_vtypes,
+            templates=l_templates,
+            speed_max=numpy.array((20., 25., 22.5)),
+            start_time=numpy.array((1., 2.5, 4.)),
+            normal_colour=numpy.array(((255., 0., 0., 255.), (0., 255., 0., 255.), (0., 0., 255., 255.))),
+            cooperation_disposition=(
+                VehicleDisposition.COOPERATIVE, VehicleDisposition.UNCOOPERATIVE, VehicleDisposition.COOPERATIVE
+            ),
+            sumo_ids=('vehicle_0', 'vehicle_1', 'vehicle_2')
+        )
+
+        l_store = colmto.environment.vehicle.VehicleStore.of(l_vehicles)
+        self.assertEqual(len(l_store), 3)
+        numpy.testing.assert_array_equal(l_store.slots(('vehicle_2', 'vehicle_0')), (2, 0))
+        numpy.testing.assert_array_equal(
+            l_store['vehicle_type'], [VehicleType.TRUCK.code, VehicleType.PASSENGER.code, VehicleType.TRUCK.code]
+        )
+        numpy.testing.assert_array_equal(l_store['dsat_threshold'], (0.3, 0.2, 0.3))
+        numpy.testing.assert_array_equal(l_store['speed_max'], (20., 25., 22.5))
+        numpy.testing.assert_array_equal(l_store['start_time'], (1., 2.5, 4.))
+
+        for i_index, (i_vehicle, i_vtype) in enumerate(zip(l_vehicles, l_vtypes)):
+            l_single_vehicle = colmto.environment.vehicle.SUMOVehicle(
+                environment=l_environment,
+                vehicle_type=i_vtype,
+                speed_max=i_vehicle.speed_max,
+                **l_templates.get(i_vtype)
+            )
+            l_single_vehicle.normal_colour = i_vehicle.normal_colour
+            l_single_vehicle.start_time = i_vehicle.start_time
+            l_single_vehicle.sumo_id = f'vehicle_{i_index}'
+            l_single_vehicle._properties['cooperation_disposition'] = i_vehicle.cooperation_disposition  # pylint: disable=protected-access
+            self.assertDictEqual(dict(i_vehicle.properties), dict(l_single_vehicle.properties))
+            self.assertListEqual(list(i_vehicle.properties), list(l_single_vehicle.properties))
+            self.assertEqual(i_vehicle.vehicle_type, l_single_vehicle.vehicle_type)
+
+        self.assertEqual(l_vehicles[1].normal_colour, Colour(0., 255., 0., 255.))
+        self.assertIs(l_vehicles[1].cooperation_disposition, VehicleDisposition.UNCOOPERATIVE)
+
+        # vehicles of a batch are updated in their store
+        l_store.update_all(('vehicle_0', 'vehicle_2'), ((8., 0.), (12., 0.)), (0, 1), (20., 20.), 5)
+        self.assertEqual(l_vehicles[2].lane, 1)
+        self.assertEqual(l_vehicles[0].position, Position(8., 0.))
+
+        self.assertListEqual(
+            colmto.environment.vehicle.SUMOVehicle.batch(
+                l_environment, (), l_templates, numpy.zeros(0), numpy.zeros(0), numpy.zeros((0, 4)), (), ()
+            ),
+            []
+        )
+
+    def test_grid_series(self):
+        '''Test grid-based series recorded in place and interpolated'''
+        l_sumovehicle = colmto.environment.vehicle.SUMOVehicle(
+            environment={'gridlength': 10, 'gridcellwidth': 4},
+            speed_max=20,
+            vtype_sumo_cfg={'dsat_threshold': 0.2}
+        )
+        self.assertEqual(l_sumovehicle.grid_series().shape, (len(StatisticSeries.GRID.metrics()), 10))
+        self.assertTrue(numpy.isnan(l_sumovehicle.grid_series()).all())
+
+        # cells 1 and 4, positions outside of grid are not recorded
+        for i_time_step, i_position_x in ((1, 8.), (2, 20.), (3, 48.)):
+            l_sumovehicle.update(Position(i_position_x, 0.), 0, 10., i_time_step)
+
+        l_time_steps = l_sumovehicle.grid_series()[StatisticSeries.GRID.metrics().index(Metric.TIME_STEP)]
+        numpy.testing.assert_equal(l_time_steps, [numpy.nan, 1., numpy.nan, numpy.nan, 2.] + [numpy.nan] * 5)
+        numpy.testing.assert_allclose(
+            l_sumovehicle.grid_series(interpolate=True)[StatisticSeries.GRID.metrics().index(Metric.TIME_STEP)],
+            [numpy.nan, 1., 4/3, 5/3, 2., 2., 2., 2., 2., 2.]
+        )
+        # grid_series returns copies
+        l_time_steps[0] = 23.
+        self.assertTrue(numpy.isnan(l_sumovehicle.grid_series()[0, 0]))
+        self.assertAlmostEqual(
+            l_sumovehicle.statistic_series_grid(interpolate=True)[(Metric.TIME_STEP.value, 2)], 4/3
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
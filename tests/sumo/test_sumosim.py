@@ -25,13 +25,26 @@
 colmto: Test module for common.sumo.
 '''
 
+import copy
+import gzip
+import json
 import unittest
+import unittest.mock
 import tempfile
 from pathlib import Path
 import os
+import pstats
 import sys
+import time
 
+import h5py
+import numpy
+
+import colmto.common.io
+import colmto.cse.cse
 import colmto.sumo.runtime
+from colmto.common.helper import StatisticSeries
+from colmto.common.helper import Metric
 try:
     sys.path.append(os.path.join('sumo', 'tools'))
     sys.path.append(os.path.join(os.environ.get('SUMO_HOME', os.path.join('..', '..')), 'tools'))
@@ -219,6 +232,506 @@ class TestSumoSim(unittest.TestCase):
                 )
             ).run_scenarios()
 
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_sumosim_runscenarios_cse_jobs(self):
+        '''
+        Test SumoSim.runscenarios() with CSE and a pool of worker processes
+        '''
+        with tempfile.NamedTemporaryFile() as f_tmp, tempfile.NamedTemporaryFile() as f_tmp_hdf5:
+            colmto.sumo.sumosim.SumoSim(
+                Namespace(
+                    loglevel='DEBUG',
+                    quiet=False,
+                    logfile=f_tmp.name,
+                    output_dir=Path(f_tmp.name).parent,
+                    runconfigfile=Path(f_tmp.name),
+                    scenarioconfigfile=Path(f_tmp.name),
+                    vtypesconfigfile=Path(f_tmp.name),
+                    freshconfigs=True,
+                    headless=True,
+                    gui=False,
+                    onlyoneotlsegment=True,
+                    cse_enabled=True,
+                    runs=2,
+                    jobs=2,
+                    profile_runs=[1],
+                    scenarios=['NI-B210'],
+                    run_prefix='foo',
+                    forcerebuildscenarios=True,
+                    results_hdf5_file=Path(f_tmp_hdf5.name),
+                    initialsortings=['random'],
+                    cooperation_probability=0.5,
+                    writefulloccupancies=False
+                )
+            ).run_scenarios()
+
+            with h5py.File(f_tmp_hdf5.name, 'r') as f_hdf5:
+                l_aadt = tuple(f_hdf5['NI-B210'].keys())[0]
+                self.assertListEqual(
+                    sorted(f_hdf5['NI-B210'][l_aadt]['random'].keys()),
+                    ['0', '1']
+                )
+
+            # only the selected run profiled, inside its worker process
+            l_results_dir = Path(f_tmp.name).parent / 'SUMO' / 'foo' / 'results'
+            self.assertListEqual(
+                sorted(i_file.name for i_file in l_results_dir.glob('profile-NI-B210-random-*')),
+                ['profile-NI-B210-random-1.collapsed', 'profile-NI-B210-random-1.prof']
+            )
+            for i_file in l_results_dir.glob('profile-NI-B210-random-*'):
+                i_file.unlink()
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_sumosim_runscenarios_cse_runaxis(self):
+        '''
+        Test SumoSim.runscenarios() with CSE writing results into run-axis datasets
+        '''
+        with tempfile.NamedTemporaryFile() as f_tmp, tempfile.NamedTemporaryFile() as f_tmp_hdf5:
+            colmto.sumo.sumosim.SumoSim(
+                Namespace(
+                    loglevel='DEBUG',
+                    quiet=False,
+                    logfile=f_tmp.name,
+                    output_dir=Path(f_tmp.name).parent,
+                    runconfigfile=Path(f_tmp.name),
+                    scenarioconfigfile=Path(f_tmp.name),
+                    vtypesconfigfile=Path(f_tmp.name),
+                    freshconfigs=True,
+                    headless=True,
+                    gui=False,
+                    onlyoneotlsegment=True,
+                    cse_enabled=True,
+                    runs=3,
+                    resultslayout='runaxis',
+                    sketch_epsilon=0.05,
+                    timing=True,
+                    profile_ratio=.5,
+                    scenarios=['NI-B210'],
+                    run_prefix='foo',
+                    forcerebuildscenarios=True,
+                    results_hdf5_file=Path(f_tmp_hdf5.name),
+                    initialsortings=['random'],
+                    cooperation_probability=0.5,
+                    writefulloccupancies=False
+                )
+            ).run_scenarios()
+
+            with h5py.File(f_tmp_hdf5.name, 'r') as f_hdf5:
+                l_aadt = tuple(f_hdf5['NI-B210'].keys())[0]
+                l_series = f_hdf5['NI-B210'][l_aadt]['random']['all']['grid_based_series']
+                self.assertEqual(l_series.shape[:2], (3, len(StatisticSeries.metrics())))
+                self.assertListEqual(
+                    list(l_series.attrs['metrics']), [i_metric.value for i_metric in StatisticSeries.metrics()]
+                )
+                # relative time loss of all runs as one slice
+                self.assertFalse(
+                    numpy.isnan(l_series[:, StatisticSeries.metrics().index(Metric.RELATIVE_TIME_LOSS), :, -1]).all(
+                        axis=1
+                    ).any()
+                )
+                l_global_stats = f_hdf5['NI-B210'][l_aadt]['random']['all']['global_stats']
+                self.assertEqual(l_global_stats.shape, (3, 2, l_series.shape[3]))
+                self.assertListEqual(list(l_global_stats.attrs['metrics']), ['unfairness', 'inefficiency'])
+
+                # approximate median of relative time loss of all runs within rank error bound
+                l_relative_time_loss = l_series[:, StatisticSeries.metrics().index(Metric.RELATIVE_TIME_LOSS)]
+                l_relative_time_loss = l_relative_time_loss.reshape(-1, l_relative_time_loss.shape[-1])
+
+            l_sketches_file = Path(f_tmp_hdf5.name).with_suffix('.sketches.hdf5')
+            try:
+                with h5py.File(l_sketches_file, 'r') as f_hdf5:
+                    l_sketch = f_hdf5['NI-B210'][l_aadt]['random']['all'][StatisticSeries.GRID.value][
+                        Metric.RELATIVE_TIME_LOSS.value
+                    ]
+                    l_count = numpy.count_nonzero(~numpy.isnan(l_relative_time_loss), axis=0)
+                    numpy.testing.assert_equal(l_sketch['count'][()], l_count)
+                    l_median = l_sketch['median'][()]
+                    with numpy.errstate(invalid='ignore'):
+                        l_ranks = numpy.sum(l_relative_time_loss <= l_median, axis=0) / l_count
+                        l_lower_ranks = numpy.sum(l_relative_time_loss < l_median, axis=0) / l_count
+                    self.assertTrue((l_ranks[l_count > 0] >= .5 - .05).all())
+                    self.assertTrue((l_lower_ranks[l_count > 0] <= .5 + .05).all())
+            finally:
+                l_sketches_file.unlink()
+
+            # all phases of each run timed
+            l_timing_file = Path(f_tmp_hdf5.name).with_suffix('.timing.json')
+            try:
+                with open(l_timing_file) as f_json:
+                    l_timing = json.load(f_json)
+                self.assertCountEqual(l_timing.get('runs').get('NI-B210').get(l_aadt).get('random'), ('0', '1', '2'))
+                for i_run in l_timing.get('runs').get('NI-B210').get(l_aadt).get('random').values():
+                    self.assertCountEqual(i_run, l_timing.get('phases'))
+                    self.assertEqual(
+                        sum(i_run.get('sumo').get('histogram')), i_run.get('sumo').get('steps')
+                    )
+            finally:
+                l_timing_file.unlink()
+
+            # every second run profiled
+            l_results_dir = Path(f_tmp.name).parent / 'SUMO' / 'foo' / 'results'
+            try:
+                self.assertIn(
+                    'run_traci',
+                    [i_function for _, _, i_function in pstats.Stats(
+                        str(l_results_dir / 'profile-NI-B210-random-2.prof')
+                    ).stats]
+                )
+                self.assertFalse((l_results_dir / 'profile-NI-B210-random-1.prof').exists())
+            finally:
+                for i_file in l_results_dir.glob('profile-NI-B210-random-*'):
+                    i_file.unlink()
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_sumosim_runscenarios_timing_slow_writer(self):
+        '''
+        Test timings of all runs are written, although results of the last runs are still queued for a slow writer
+        '''
+
+        l_write_hdf5_run = colmto.common.io.Writer._write_hdf5_run  # pylint: disable=protected-access
+
+        def slow_write_hdf5_run(*args, **kwargs):
+            time.sleep(1.)
+            return l_write_hdf5_run(*args, **kwargs)
+
+        with tempfile.NamedTemporaryFile() as f_tmp, tempfile.NamedTemporaryFile() as f_tmp_hdf5, \
+                unittest.mock.patch.object(colmto.common.io.Writer, '_write_hdf5_run', slow_write_hdf5_run):
+            colmto.sumo.sumosim.SumoSim(
+                Namespace(
+                    loglevel='DEBUG',
+                    quiet=False,
+                    logfile=f_tmp.name,
+                    output_dir=Path(f_tmp.name).parent,
+                    runconfigfile=Path(f_tmp.name),
+                    scenarioconfigfile=Path(f_tmp.name),
+                    vtypesconfigfile=Path(f_tmp.name),
+                    freshconfigs=True,
+                    headless=True,
+                    gui=False,
+                    onlyoneotlsegment=True,
+                    cse_enabled=True,
+                    runs=3,
+                    resultslayout='runaxis',
+                    timing=True,
+                    scenarios=['NI-B210'],
+                    run_prefix='foo',
+                    forcerebuildscenarios=True,
+                    results_hdf5_file=Path(f_tmp_hdf5.name),
+                    initialsortings=['random'],
+                    cooperation_probability=0.5,
+                    writefulloccupancies=False
+                )
+            ).run_scenarios()
+
+            l_timing_file = Path(f_tmp_hdf5.name).with_suffix('.timing.json')
+            try:
+                with open(l_timing_file) as f_json:
+                    l_runs = json.load(f_json).get('runs').get('NI-B210')
+                self.assertCountEqual(tuple(l_runs.values())[0].get('random'), ('0', '1', '2'))
+                for i_run in tuple(l_runs.values())[0].get('random').values():
+                    self.assertGreaterEqual(i_run.get('write').get('total'), 1.)
+            finally:
+                l_timing_file.unlink()
+
+    def test_prefetch(self):
+        '''
+        Test run configurations generated ahead on a background thread
+        '''
+        l_generated = []
+
+        def _generate(count, fail_at=None):
+            for i_run in range(count):
+                if i_run == fail_at:
+                    raise ValueError(f'run {i_run}')
+                l_generated.append(i_run)
+                yield i_run
+
+        for i_depth in (0, 1, 3):
+            with self.subTest(depth=i_depth):
+                l_generated.clear()
+                self.assertListEqual(list(colmto.sumo.sumosim._prefetch(_generate(10), i_depth)), list(range(10)))
+
+                # back-pressure: the producer stays at most depth + 1 items ahead of the consumer
+                l_generated.clear()
+                l_prefetch = colmto.sumo.sumosim._prefetch(_generate(10), i_depth)
+                self.assertEqual(next(l_prefetch), 0)
+                time.sleep(.3)
+                self.assertLessEqual(len(l_generated), i_depth + 2)
+                l_prefetch.close()
+                l_stopped = len(l_generated)
+                time.sleep(.2)
+                self.assertEqual(len(l_generated), l_stopped)
+
+                l_consumed = []
+                with self.assertRaisesRegex(ValueError, 'run 4'):
+                    for i_run in colmto.sumo.sumosim._prefetch(_generate(10, fail_at=4), i_depth):
+                        l_consumed.append(i_run)
+                self.assertListEqual(l_consumed, list(range(4)))
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_scenario_cache(self):
+        '''
+        Test scenarios built once per sweep and shared across run prefixes via the scenario cache
+        '''
+        with tempfile.TemporaryDirectory() as f_tmpdir, tempfile.NamedTemporaryFile() as f_tmp:
+            l_sumo_configs = {}
+            for i_run_prefix in ('foo', 'bar'):
+                l_sumo_configs[i_run_prefix] = colmto.sumo.sumosim.SumoConfig(
+                    Namespace(
+                        loglevel='DEBUG',
+                        quiet=False,
+                        logfile=f_tmp.name,
+                        output_dir=Path(f_tmpdir),
+                        runconfigfile=Path(f_tmpdir) / 'runconfig.yaml',
+                        scenarioconfigfile=Path(f_tmpdir) / 'scenarioconfig.yaml',
+                        vtypesconfigfile=Path(f_tmpdir) / 'vtypesconfig.yaml',
+                        freshconfigs=True,
+                        headless=True,
+                        gui=False,
+                        onlyoneotlsegment=True,
+                        cse_enabled=True,
+                        runs=1,
+                        scenarios=['NI-B210'],
+                        run_prefix=i_run_prefix,
+                        forcerebuildscenarios=False,
+                        initialsortings=['random'],
+                        cooperation_probability=0.5,
+                        writefulloccupancies=False
+                    ),
+                    sumolib.checkBinary('netconvert'),
+                    sumolib.checkBinary('duarouter')
+                )
+                l_sumo_configs[i_run_prefix]._run_config['scenariocache'] = {  # pylint: disable=protected-access
+                    'enabled': True,
+                    'directory': str(Path(f_tmpdir) / 'cache')
+                }
+
+            l_scenario = l_sumo_configs['foo'].generate_scenario('NI-B210')
+            self.assertIs(l_sumo_configs['foo'].generate_scenario('NI-B210'), l_scenario)
+            l_entries = list((Path(f_tmpdir) / 'cache').iterdir())
+            self.assertEqual(len(l_entries), 1)
+            self.assertTrue((l_entries[0] / 'NI-B210.net.xml').is_file())
+
+            # other run prefix: cache hit, i.e. same net file without building it again
+            l_mtime = (l_entries[0] / 'NI-B210.net.xml').stat().st_mtime_ns
+            l_other_scenario = l_sumo_configs['bar'].generate_scenario('NI-B210')
+            self.assertNotEqual(l_other_scenario.get('netfile'), l_scenario.get('netfile'))
+            self.assertEqual(l_other_scenario.get('netfile').read_bytes(), l_scenario.get('netfile').read_bytes())
+            self.assertEqual(list((Path(f_tmpdir) / 'cache').iterdir()), l_entries)
+            self.assertEqual((l_entries[0] / 'NI-B210.net.xml').stat().st_mtime_ns, l_mtime)
+
+            # generating a run does not force later runs to be rebuilt
+            l_sumo_configs['foo'].generate_run(
+                l_scenario, colmto.sumo.sumosim.InitialSorting.RANDOM, 0, ['passenger', 'truck']
+            )
+            self.assertFalse(l_sumo_configs['foo']._args.forcerebuildscenarios)  # pylint: disable=protected-access
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_direct_routes(self):
+        '''
+        Test routes written directly for single path networks against the ones of duarouter
+        '''
+        with tempfile.TemporaryDirectory() as f_tmpdir, tempfile.NamedTemporaryFile() as f_tmp:
+            l_sumo_config = colmto.sumo.sumosim.SumoConfig(
+                Namespace(
+                    loglevel='DEBUG',
+                    quiet=False,
+                    logfile=f_tmp.name,
+                    output_dir=Path(f_tmpdir),
+                    runconfigfile=Path(f_tmpdir) / 'runconfig.yaml',
+                    scenarioconfigfile=Path(f_tmpdir) / 'scenarioconfig.yaml',
+                    vtypesconfigfile=Path(f_tmpdir) / 'vtypesconfig.yaml',
+                    freshconfigs=True,
+                    headless=True,
+                    gui=False,
+                    onlyoneotlsegment=False,
+                    cse_enabled=True,
+                    runs=1,
+                    scenarios=['NI-B210'],
+                    run_prefix='foo',
+                    forcerebuildscenarios=False,
+                    initialsortings=['random'],
+                    cooperation_probability=0.5,
+                    writefulloccupancies=False
+                ),
+                sumolib.checkBinary('netconvert'),
+                sumolib.checkBinary('duarouter')
+            )
+            l_scenario = l_sumo_config.generate_scenario('NI-B210')
+            l_route = l_sumo_config.single_path_route(l_scenario.get('netfile'))
+            self.assertEqual(l_route[0], 'enter_21start')
+            self.assertEqual(l_route[-1], '21end_exit')
+            self.assertGreater(len(l_route), 3)
+
+            l_run_config = l_sumo_config.generate_run(
+                l_scenario, colmto.sumo.sumosim.InitialSorting.RANDOM, 0,
+                numpy.random.RandomState(42).choice(['passenger', 'truck', 'tractor'], size=20)
+            )
+            l_sumo_config._generate_route_xml(  # pylint: disable=protected-access
+                l_scenario.get('netfile'), l_run_config.get('tripfile'), Path(f_tmpdir) / 'duarouter.rou.xml'
+            )
+
+            l_routes = {}
+            l_vtypes = {}
+            for i_name, i_routefile in (
+                    ('direct', l_run_config.get('routefile')), ('duarouter', Path(f_tmpdir) / 'duarouter.rou.xml')
+            ):
+                l_routes[i_name] = []
+                l_vtypes[i_name] = {}
+                for _, i_element in colmto.sumo.sumocfg.etree.iterparse(str(i_routefile)):
+                    if i_element.tag == 'vehicle':
+                        l_routes[i_name].append(
+                            (i_element.get('id'), i_element.get('depart'), i_element.find('route').get('edges'))
+                        )
+                    elif i_element.tag == 'vType':
+                        l_vtypes[i_name][i_element.get('id')] = dict(i_element.attrib)
+
+            self.assertListEqual(l_routes['direct'], l_routes['duarouter'])
+            self.assertTrue(all(i_edges == ' '.join(l_route) for _, _, i_edges in l_routes['direct']))
+            # same vehicle types written the same, except for speedFactor and speedDev duarouter writes as distribution
+            self.assertListEqual(sorted(l_vtypes['direct']), sorted(l_vtypes['duarouter']))
+            for i_vtype, i_attributes in l_vtypes['duarouter'].items():
+                self.assertSetEqual(set(l_vtypes['direct'][i_vtype]) - {'speedDev'}, set(i_attributes))
+                for i_key, i_value in i_attributes.items():
+                    if i_key != 'speedFactor':
+                        self.assertEqual(l_vtypes['direct'][i_vtype][i_key], i_value)
+
+            # vehicle type attributes unknown to the direct writer, e.g. of the car following model, routed by duarouter
+            l_sumo_config._vtypes_config['passenger'] = dict(  # pylint: disable=protected-access
+                l_sumo_config.vtypes_config.get('passenger'), tau=1.25, carFollowModel='IDM'
+            )
+            l_run_config = l_sumo_config.generate_run(
+                l_scenario, colmto.sumo.sumosim.InitialSorting.RANDOM, 2, ['passenger'] * 5
+            )
+            l_vtypes = [
+                i_element.attrib for _, i_element in colmto.sumo.sumocfg.etree.iterparse(
+                    str(l_run_config.get('routefile'))
+                ) if i_element.tag == 'vType'
+            ]
+            self.assertEqual(len(l_vtypes), 5)
+            for i_vtype in l_vtypes:
+                self.assertEqual(i_vtype.get('tau'), '1.25')
+                self.assertEqual(i_vtype.get('carFollowModel'), 'IDM')
+
+            # gzipped trip and route files with the same content
+            l_sumo_config._run_config['compressxml'] = True  # pylint: disable=protected-access
+            l_run_config = l_sumo_config.generate_run(
+                l_scenario, colmto.sumo.sumosim.InitialSorting.RANDOM, 1,
+                numpy.random.RandomState(42).choice(['passenger', 'truck', 'tractor'], size=20)
+            )
+            self.assertEqual(l_run_config.get('tripfile').suffixes[-2:], ['.xml', '.gz'])
+            self.assertEqual(l_run_config.get('routefile').suffixes[-2:], ['.xml', '.gz'])
+            self.assertEqual(
+                [
+                    i_element.get('id') for _, i_element in colmto.sumo.sumocfg.etree.iterparse(
+                        gzip.open(l_run_config.get('routefile'))
+                    ) if i_element.tag == 'vehicle'
+                ],
+                [i_vid for i_vid, _, _ in l_routes['direct']]
+            )
+
+            # networks without a single path from entry to exit need routing
+            l_netfile = Path(f_tmpdir) / 'detour.net.xml'
+            l_netfile.write_text(
+                '<net>'
+                '<connection from="enter_21start" to="a"/><connection from="enter_21start" to="b"/>'
+                '<connection from="a" to="21end_exit"/><connection from="b" to="21end_exit"/>'
+                '</net>'
+            )
+            self.assertIsNone(l_sumo_config.single_path_route(l_netfile))
+            l_netfile = Path(f_tmpdir) / 'loop.net.xml'
+            l_netfile.write_text('<net><connection from="enter_21start" to="a"/><connection from="a" to="enter_21start"/></net>')
+            self.assertIsNone(l_sumo_config.single_path_route(l_netfile))
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/sumolib").is_dir(),
+        f"can't find sumolib at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_runtime_backends(self):
+        '''
+        Test whether the traci and libsumo backends produce identical results for the same run
+        '''
+        try:
+            import libsumo  # pylint: disable=import-outside-toplevel,unused-import
+        except ImportError:  # pragma: no cover
+            self.skipTest('libsumo not available')
+
+        with tempfile.TemporaryDirectory() as f_tmpdir, tempfile.NamedTemporaryFile() as f_tmp:
+            l_sumosim = colmto.sumo.sumosim.SumoSim(
+                Namespace(
+                    loglevel='DEBUG',
+                    quiet=False,
+                    logfile=f_tmp.name,
+                    output_dir=Path(f_tmpdir),
+                    runconfigfile=Path(f_tmpdir) / 'runconfig.yaml',
+                    scenarioconfigfile=Path(f_tmpdir) / 'scenarioconfig.yaml',
+                    vtypesconfigfile=Path(f_tmpdir) / 'vtypesconfig.yaml',
+                    freshconfigs=True,
+                    headless=True,
+                    gui=False,
+                    onlyoneotlsegment=True,
+                    cse_enabled=True,
+                    runs=1,
+                    scenarios=['NI-B210'],
+                    run_prefix='foo',
+                    forcerebuildscenarios=True,
+                    results_hdf5_file=None,
+                    initialsortings=['random'],
+                    cooperation_probability=0.5,
+                    writefulloccupancies=False
+                )
+            )
+            l_sumocfg = l_sumosim._sumocfg  # pylint: disable=protected-access
+            l_sumocfg.run_config.get('nbvehicles')['enabled'] = True
+            l_sumocfg.run_config.get('nbvehicles')['value'] = 30
+
+            l_run_config = l_sumocfg.generate_run(
+                l_sumocfg.generate_scenario('NI-B210'),
+                colmto.sumo.sumosim.InitialSorting.RANDOM,
+                0,
+                numpy.random.RandomState(42).choice(['passenger', 'truck', 'tractor'], size=30)
+            )
+
+            for i_backend in ('traci', 'libsumo'):
+                l_sumocfg.run_config.get('sumo')['backend'] = i_backend
+                self.assertEqual(l_sumosim._runtime.backend().__name__, i_backend)  # pylint: disable=protected-access
+                l_sumosim._writer.write_hdf5(  # pylint: disable=protected-access
+                    l_sumosim._statistics.global_stats(  # pylint: disable=protected-access
+                        l_sumosim._statistics.merge_vehicle_series(  # pylint: disable=protected-access
+                            0,
+                            l_sumosim._runtime.run_traci(  # pylint: disable=protected-access
+                                copy.deepcopy(l_run_config),
+                                colmto.cse.cse.SumoCSE().add_rules_from_cfg(l_sumocfg.run_config.get('rules'))
+                            )
+                        )
+                    ),
+                    hdf5_file=Path(f_tmpdir) / f'{i_backend}.hdf5',
+                    hdf5_base_path='NI-B210'
+                )
+
+            with h5py.File(Path(f_tmpdir) / 'traci.hdf5', 'r') as f_traci, \
+                    h5py.File(Path(f_tmpdir) / 'libsumo.hdf5', 'r') as f_libsumo:
+                l_datasets = []
+                f_traci.visititems(
+                    lambda name, obj: l_datasets.append(name) if isinstance(obj, h5py.Dataset) else None
+                )
+                f_libsumo.visititems(
+                    lambda name, obj: l_datasets.remove(name) if isinstance(obj, h5py.Dataset) else None
+                )
+                self.assertListEqual(l_datasets, [])
+                f_traci.visititems(
+                    lambda name, obj: numpy.testing.assert_equal(obj[()], f_libsumo[name][()])
+                    if isinstance(obj, h5py.Dataset) else None
+                )
 
     def test_runtime(self):
         '''
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# @package tests
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Test module for benchmarks and their TraCI stand-in.
+'''
+
+import os
+from pathlib import Path
+import sys
+import unittest
+
+import colmto.common.timing
+
+from benchmarks import faketraci
+from benchmarks import suite
+
+
+class TestBenchmarks(unittest.TestCase):
+    '''
+    Test cases for benchmarks
+    '''
+
+    @unittest.skipUnless(
+        Path(f"{os.environ.get('SUMO_HOME','sumo')}/tools/traci").is_dir(),
+        f"can't find traci at {os.environ.get('SUMO_HOME','sumo')}/tools/")
+    def test_constants(self):
+        '''Test stand-in serves the subscription variables of TraCI'''
+
+        sys.path.append(os.path.join(os.environ.get('SUMO_HOME'), 'tools'))
+        import traci.constants  # pylint: disable=import-outside-toplevel
+
+        for i_name, i_value in vars(faketraci.constants).items():
+            with self.subTest(pattern=i_name):
+                self.assertEqual(i_value, getattr(traci.constants, i_name))
+
+    def test_faketraci(self):
+        '''Test stand-in moves vehicles along the road, overtaking on the OTL, until all arrived'''
+
+        l_constants = faketraci.constants
+        l_traci = faketraci.FakeTraCI(
+            ((f'vehicle_{i}', 2. * i, (34., 8.)[i % 2], 5.) for i in range(20)), length=1000., otl_start=50.
+        )
+        l_traci.start(['sumo'])
+        l_traci.simulation.subscribe(
+            (
+                l_constants.VAR_TIME_STEP,
+                l_constants.VAR_DEPARTED_VEHICLES_IDS,
+                l_constants.VAR_ARRIVED_VEHICLES_IDS,
+                l_constants.VAR_MIN_EXPECTED_VEHICLES
+            )
+        )
+        l_traci.lane.subscribe('21edge_1', (l_constants.LAST_STEP_OCCUPANCY,))
+
+        l_departed, l_arrived, l_lanes, l_occupancies = [], [], set(), []
+        l_results = l_traci.simulation.getSubscriptionResults()
+        self.assertEqual(l_results.get(l_constants.VAR_MIN_EXPECTED_VEHICLES), 20)
+
+        while l_results.get(l_constants.VAR_MIN_EXPECTED_VEHICLES) > 0:
+            l_arrived.extend(l_results.get(l_constants.VAR_ARRIVED_VEHICLES_IDS))
+            for i_vehicle_id in l_results.get(l_constants.VAR_DEPARTED_VEHICLES_IDS):
+                l_departed.append(i_vehicle_id)
+                l_traci.vehicle.subscribe(i_vehicle_id, (l_constants.VAR_POSITION, l_constants.VAR_LANE_INDEX))
+                # vehicles depart with their back at the start of the road
+                self.assertEqual(
+                    l_traci.vehicle.getSubscriptionResults(i_vehicle_id).get(l_constants.VAR_POSITION), (5., 1.6)
+                )
+            for i_vehicle_id, i_vehicle_results in l_traci.vehicle.getAllSubscriptionResults().items():
+                self.assertIn(i_vehicle_id, l_departed)
+                self.assertNotIn(i_vehicle_id, l_arrived)
+                self.assertLess(i_vehicle_results.get(l_constants.VAR_POSITION)[0], 1000.)
+                l_lanes.add(i_vehicle_results.get(l_constants.VAR_LANE_INDEX))
+            l_occupancies.append(l_traci.lane.getAllSubscriptionResults().get('21edge_1').get(l_constants.LAST_STEP_OCCUPANCY))
+            l_traci.simulationStep()
+            l_results = l_traci.simulation.getSubscriptionResults()
+
+        l_arrived.extend(l_results.get(l_constants.VAR_ARRIVED_VEHICLES_IDS))
+        l_traci.close()
+
+        self.assertListEqual(l_departed, [f'vehicle_{i}' for i in range(20)])
+        self.assertCountEqual(l_arrived, l_departed)
+        self.assertSetEqual(l_lanes, {0, 1})
+        self.assertGreater(max(l_occupancies), 0.)
+        self.assertEqual(l_results.get(l_constants.VAR_TIME_STEP), 1000 * l_traci.steps)
+
+        # vehicles denied OTL access keep right, a restart drops subscriptions
+        l_traci.start(['sumo'])
+        self.assertDictEqual(l_traci.simulation.getSubscriptionResults(), {})
+        l_traci.simulation.subscribe((l_constants.VAR_DEPARTED_VEHICLES_IDS, l_constants.VAR_MIN_EXPECTED_VEHICLES))
+        for i in range(20):
+            l_traci.vehicle.setVehicleClass(f'vehicle_{i}', 'custom1')
+        while l_traci.simulation.getSubscriptionResults().get(l_constants.VAR_MIN_EXPECTED_VEHICLES) > 0:
+            for i_vehicle_id in l_traci.simulation.getSubscriptionResults().get(l_constants.VAR_DEPARTED_VEHICLES_IDS):
+                l_traci.vehicle.subscribe(i_vehicle_id, (l_constants.VAR_LANE_INDEX,))
+            for i_vehicle_results in l_traci.vehicle.getAllSubscriptionResults().values():
+                self.assertEqual(i_vehicle_results.get(l_constants.VAR_LANE_INDEX), 0)
+            l_traci.simulationStep()
+
+    def test_run_case(self):
+        '''Test benchmark case is deterministic and reports its timings'''
+
+        l_case = suite.run_case(20, 'default')
+        self.assertEqual(l_case.get('vehicles'), 20)
+        self.assertGreater(l_case.get('vehicle_steps'), l_case.get('steps'))
+        self.assertSetEqual(
+            set(l_case.get('seconds')), {'generate', 'simulate', 'standin', 'statistics', 'write'}
+        )
+        self.assertGreater(l_case.get('vehicle_steps_per_second'), l_case.get('vehicle_steps_per_second_total'))
+        self.assertCountEqual(l_case.get('phases'), colmto.common.timing.STEP_PHASES)
+        self.assertLessEqual(sum(l_case.get('phases').values()), l_case.get('seconds').get('simulate'))
+        self.assertGreaterEqual(l_case.get('peak_rss'), l_case.get('baseline_rss'))
+
+        l_repeated = suite.run_case(20, 'default')
+        for i_key in ('steps', 'vehicle_steps', 'commands'):
+            with self.subTest(pattern=i_key):
+                self.assertEqual(l_case.get(i_key), l_repeated.get(i_key))
+
+        self.assertListEqual(
+            suite.compare({'cases': [l_case]}, {'cases': [dict(l_case, vehicle_steps_per_second=1.)]}),
+            [(20, 'default', l_case.get('vehicle_steps_per_second'), l_case.get('vehicle_steps_per_second'))]
+        )
+
+        with self.assertRaises(KeyError):
+            suite.run_suite([20], ['foo'])
+
+
+if __name__ == '__main__':
+    unittest.main()
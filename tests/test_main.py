@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# @package tests
+# @cond LICENSE
+# #############################################################################
+# # LGPL License                                                              #
+# #                                                                           #
+# # This file is part of the Cooperative Lane Management and Traffic flow     #
+# # Optimisation project.                                                     #
+# # Copyright (c) 2018, Malte Aschermann (malte.aschermann@tu-clausthal.de)   #
+# # This program is free software: you can redistribute it and/or modify      #
+# # it under the terms of the GNU Lesser General Public License as            #
+# # published by the Free Software Foundation, either version 3 of the        #
+# # License, or (at your option) any later version.                           #
+# #                                                                           #
+# # This program is distributed in the hope that it will be useful,           #
+# # but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+# # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+# # GNU Lesser General Public License for more details.                       #
+# #                                                                           #
+# # You should have received a copy of the GNU Lesser General Public License  #
+# # along with this program. If not, see http://www.gnu.org/licenses/         #
+# #############################################################################
+# @endcond
+'''
+colmto: Test module for colmto's command line entry point.
+'''
+
+import argparse
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import unittest
+
+import colmto
+import colmto.__main__
+
+# modules not to be imported by `colmto --help`
+_HEAVY_MODULES = ('h5py', 'matplotlib', 'pandas', 'sh', 'sumolib', 'traci', 'lxml', 'numpy')
+
+
+class TestMain(unittest.TestCase):
+    '''
+    Test cases for colmto's command line entry point
+    '''
+
+    def test_help_startup(self):
+        '''Test `colmto --help` imports no heavy modules'''
+
+        l_process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'colmto', '--help'],
+            cwd=Path(colmto.__file__).parent.parent,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True
+        )
+        self.assertIn('usage: colmto', l_process.stdout)
+
+        # lines of `-X importtime`: "import time: <self us> | <cumulative us> | <indented module name>"
+        l_imports = [
+            i_line.split('|') for i_line in l_process.stderr.splitlines() if i_line.startswith('import time:')
+        ][1:]
+        l_modules = {i_name.strip() for _, _, i_name in l_imports}
+        self.assertIn('colmto', l_modules)
+        for i_module in _HEAVY_MODULES:
+            with self.subTest(pattern=i_module):
+                self.assertNotIn(i_module, l_modules)
+
+    def test_run_numbers(self):
+        '''Test parsing of run numbers to profile'''
+
+        self.assertListEqual(colmto.__main__._run_numbers('0,17,500'), [0, 17, 500])  # pylint: disable=protected-access
+        self.assertListEqual(colmto.__main__._run_numbers('3,'), [3])  # pylint: disable=protected-access
+        with self.assertRaises(argparse.ArgumentTypeError):
+            colmto.__main__._run_numbers('0-17')  # pylint: disable=protected-access
+
+    def test_version(self):
+        '''Test version resolved without git, i.e. from package metadata if installed'''
+
+        self.assertIn(colmto.package_version(), (None, colmto.__version__))
+        self.assertIsInstance(colmto.__version__, str)
+
+        # commit id of a source checkout, read without calling git
+        l_root = Path(colmto.__file__).parent.parent
+        if not (l_root / '.git').exists():
+            self.assertIsNone(colmto.git_commit())
+        elif shutil.which('git'):
+            self.assertEqual(
+                colmto.git_commit(),
+                subprocess.run(
+                    ['git', 'rev-parse', 'HEAD'], cwd=l_root, stdout=subprocess.PIPE, universal_newlines=True, check=True
+                ).stdout.strip()
+            )
+        with self.assertRaises(AttributeError):
+            colmto.foo  # pylint: disable=no-member,pointless-statement
+
+
+if __name__ == '__main__':
+    unittest.main()